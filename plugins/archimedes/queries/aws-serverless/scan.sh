@@ -19,25 +19,38 @@ INDEX_DB="$REPO/.archimedes/index/chunkhound.db"
 if [ ! -f "$INDEX_DB" ] || find "$REPO/.archimedes/index/" -name "chunkhound.db" -mtime +7 2>/dev/null | grep -q .; then
   mkdir -p "$REPO/.archimedes/index"
   echo "[arch-search] Building chunkhound index for $REPO..." >&2
-  chunkhound index "$REPO" --db "$INDEX_DB" \
-    --model text-embedding-3-small \
-    --api-key "${OPENAI_API_KEY:-}"
+  if [ -n "${OPENAI_API_KEY:-}" ]; then
+    chunkhound index "$REPO" --db "$INDEX_DB" \
+      --model text-embedding-3-small \
+      --api-key "$OPENAI_API_KEY"
+  else
+    # No key: chunks only; chunkhound-search.py falls back to lexical search
+    chunkhound index "$REPO" --db "$INDEX_DB" --no-embeddings
+  fi
 fi
 
 TAG_COUNT=0
+RESULTS=$(mktemp)
+trap 'rm -f "$RESULTS"' EXIT
 
-for rule in "$PACK_DIR/rules"/*.yaml; do
-  [ -f "$rule" ] || continue
-  rule_name=$(basename "$rule" .yaml)
+# One search process for the whole pack: chunkhound is imported and the index
+# opened once, then every rule's query runs (one JSON line per rule). This
+# script never starts a search server; when ARCHIMEDES_SEARCH_SOCKET names a
+# running one (run-semantic-scan.sh starts one for a fresh index), the pack
+# is sent there instead. It exits 1 when any rule failed; the other rules'
+# results are still written as tags, and this script then exits 1 too.
+rc=0
+"$PLUGIN_ROOT/tools/chunkhound-search.py" \
+  --pack "$PACK_DIR/rules" \
+  --repo "$REPO" \
+  --db "$INDEX_DB" > "$RESULTS" || rc=$?
 
-  query=$(yq '.query' "$rule")
-  top_k=$(yq '.top_k' "$rule")
+while IFS= read -r line; do
+  rule=$(jq -r '.rule' <<< "$line")
+  rule_name=$(basename "$rule" .yaml)
+  jq -c 'select(.error) | {rule_failed: .id, error: .error}' <<< "$line" >&2
 
-  written=$("$PLUGIN_ROOT/tools/chunkhound-search.py" \
-    --query "$query" \
-    --repo "$REPO" \
-    --db "$INDEX_DB" \
-    --top-k "$top_k" 2>/dev/null \
+  written=$(jq -c '.results' <<< "$line" \
   | bun "$PLUGIN_ROOT/tools/tag-store.ts" write-from-chunkhound \
       --session "$SESSION" \
       --db "$DB_PATH" \
@@ -47,6 +60,8 @@ for rule in "$PACK_DIR/rules"/*.yaml; do
 
   TAG_COUNT=$((TAG_COUNT + written))
   [ "$written" -gt 0 ] && echo "  [$rule_name] $written tags" >&2
-done
+done < "$RESULTS"
 
-echo "{\"ok\":true,\"pack\":\"$(basename $PACK_DIR)\",\"tags_written\":$TAG_COUNT}"
+OK=$([ "$rc" -eq 0 ] && echo true || echo false)
+echo "{\"ok\":$OK,\"pack\":\"$(basename $PACK_DIR)\",\"tags_written\":$TAG_COUNT}"
+exit $rc
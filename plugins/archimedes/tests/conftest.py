@@ -0,0 +1,21 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS = Path(__file__).resolve().parent.parent / "tools"
+
+# The tools are run directly, not installed; import them from tools/
+sys.path.insert(0, str(TOOLS))
+
+
+@pytest.fixture(scope="session")
+def chunkhound_search():
+    """tools/chunkhound-search.py as a module (its file name is not importable)."""
+    spec = importlib.util.spec_from_file_location(
+        "chunkhound_search", TOOLS / "chunkhound-search.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,77 @@
+import asyncio
+import itertools
+from array import array
+
+import embed_cache
+from embed_cache import CachedEmbeddingProvider, EmbeddingCache, FakeEmbeddingProvider
+
+
+def embed(provider, *texts):
+    return asyncio.run(provider.embed(list(texts)))
+
+
+def float32(vector):
+    return array("f", vector).tolist()
+
+
+def test_cold_miss_then_warm_hit(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    fake = FakeEmbeddingProvider()
+
+    cold = CachedEmbeddingProvider(fake, EmbeddingCache(path))
+    [first] = embed(cold, "event emitter")
+    assert fake.calls == 1
+    assert (cold._cache.hits, cold._cache.misses) == (0, 1)
+
+    warm = CachedEmbeddingProvider(fake, EmbeddingCache(path))
+    [second] = embed(warm, "event emitter")
+    assert fake.calls == 1
+    assert (warm._cache.hits, warm._cache.misses) == (1, 0)
+    assert first == second
+
+
+def test_miss_returns_the_stored_float32_vector():
+    fake = FakeEmbeddingProvider()
+    provider = CachedEmbeddingProvider(fake, EmbeddingCache(None))
+    [miss] = embed(provider, "event emitter")
+    [hit] = embed(provider, "event emitter")
+    assert miss == hit == float32(fake.vector("event emitter"))
+
+
+def test_whitespace_variants_share_an_entry():
+    fake = FakeEmbeddingProvider()
+    provider = CachedEmbeddingProvider(fake, EmbeddingCache(None))
+    vectors = embed(provider, "event emitter", " event  emitter\n", "event\temitter")
+    assert fake.calls == 1
+    assert vectors[0] == vectors[1] == vectors[2]
+    assert len(provider._cache) == 1
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(embed_cache.time, "time", lambda: next(clock))
+    cache = EmbeddingCache(None, max_entries=2)
+    cache.put("fake", "m", {"a": [1.0], "b": [2.0]})
+    cache.get("fake", "m", ["a"])
+    cache.put("fake", "m", {"c": [3.0]})
+    assert len(cache) == 2
+    assert cache.get("fake", "m", ["a", "b", "c"]).keys() == {"a", "c"}
+
+
+def test_entries_are_keyed_on_provider_and_model():
+    cache = EmbeddingCache(None)
+    small = FakeEmbeddingProvider(model="small")
+    large = FakeEmbeddingProvider(model="large")
+    embed(CachedEmbeddingProvider(small, cache), "event emitter")
+    embed(CachedEmbeddingProvider(large, cache), "event emitter")
+    assert (small.calls, large.calls) == (1, 1)
+
+    other = FakeEmbeddingProvider(model="small")
+    other.name = "other"
+    embed(CachedEmbeddingProvider(other, cache), "event emitter")
+    assert other.calls == 1
+
+    again = FakeEmbeddingProvider(model="small")
+    embed(CachedEmbeddingProvider(again, cache), "event emitter")
+    assert again.calls == 0
+    assert len(cache) == 3
@@ -0,0 +1,126 @@
+import os
+
+import pytest
+
+import lexical_index
+from lexical_index import LexicalIndex, open_lexical_index, sidecar_path, split_words, write
+
+CHUNKS = [
+    ("events.py", "EventEmitter", "class", 1, 12, "class EventEmitter:\n    listeners = []"),
+    ("events.py", "emit", "function", 4, 6, "def emit(self, name):\n    pass"),
+    ("retry.py", "retry_with_backoff", "function", 1, 9, "def retry_with_backoff(call):"),
+    ("docs.py", "notes", "function", 1, 3, "# an event is logged here"),
+]
+
+
+@pytest.fixture
+def index_db(tmp_path):
+    """A stand-in index file and its sidecar, written from CHUNKS."""
+    db = tmp_path / "chunkhound.db"
+    db.write_bytes(b"index")
+    write(sidecar_path(db), [CHUNKS], lexical_index._signature(db))
+    return db
+
+
+def test_split_words_splits_identifiers():
+    assert split_words("executeNVAInBatches") == [
+        "executenvainbatches",
+        "execute",
+        "nva",
+        "in",
+        "batches",
+    ]
+    assert split_words("load_config(path)") == ["load", "config", "path"]
+    assert split_words("HTTPServer v2") == ["httpserver", "http", "server", "v2"]
+
+
+def test_split_words_drops_single_characters():
+    assert split_words("a x = b1") == ["b1"]
+
+
+def test_sidecar_sits_next_to_the_index(tmp_path):
+    assert sidecar_path(tmp_path / "chunkhound.db") == tmp_path / "chunkhound.lexical.sqlite"
+
+
+def test_search_ranks_symbol_matches_first(index_db, tmp_path):
+    index = LexicalIndex(sidecar_path(index_db), tmp_path / "repo")
+    results = index.search("event emitter", 5)
+    assert [r["symbol"] for r in results] == ["EventEmitter", "notes"]
+    first = results[0]
+    assert first["file_path"] == str(tmp_path / "repo" / "events.py")
+    assert (first["start_line"], first["end_line"], first["chunk_type"]) == (1, 12, "class")
+    assert all(0 < r["similarity"] < 1 for r in results)
+    assert results[0]["similarity"] > results[1]["similarity"]
+
+
+def test_search_finds_identifier_parts(index_db, tmp_path):
+    index = LexicalIndex(sidecar_path(index_db), tmp_path)
+    assert [r["symbol"] for r in index.search("backoff", 5)] == ["retry_with_backoff"]
+
+
+def test_search_without_words_or_top_k_is_empty(index_db, tmp_path):
+    index = LexicalIndex(sidecar_path(index_db), tmp_path)
+    assert index.search("? !", 5) == []
+    assert index.search("event", 0) == []
+    assert len(index.search("event", 1)) == 1
+
+
+def test_sidecar_is_rebuilt_when_the_index_changes(index_db, tmp_path, monkeypatch):
+    built = []
+    monkeypatch.setattr(lexical_index, "build", lambda db, path: built.append(db))
+
+    open_lexical_index(index_db, tmp_path).close()
+    assert built == []
+
+    with index_db.open("ab") as f:
+        f.write(b" more chunks")
+    open_lexical_index(index_db, tmp_path).close()
+    assert built == [index_db]
+
+
+def test_unreadable_sidecar_is_rebuilt(index_db, tmp_path, monkeypatch):
+    built = []
+    monkeypatch.setattr(lexical_index, "build", lambda db, path: built.append(db))
+    sidecar_path(index_db).write_bytes(b"not sqlite")
+    open_lexical_index(index_db, tmp_path)
+    assert built == [index_db]
+
+
+@pytest.fixture
+def duckdb_index(tmp_path):
+    """A DuckDB file with chunkhound's files and chunks tables."""
+    duckdb = pytest.importorskip("duckdb")
+    db = tmp_path / "chunkhound.db"
+    con = duckdb.connect(str(db))
+    con.execute("CREATE TABLE files (id INTEGER, path VARCHAR)")
+    con.execute(
+        "CREATE TABLE chunks (id INTEGER, file_id INTEGER, symbol VARCHAR,"
+        " chunk_type VARCHAR, start_line INTEGER, end_line INTEGER, code VARCHAR)"
+    )
+    con.execute("INSERT INTO files VALUES (1, 'events.py')")
+    con.execute(
+        "INSERT INTO chunks VALUES (1, 1, 'EventEmitter', 'class', 1, 12, 'class EventEmitter:')"
+    )
+    con.close()
+    return db
+
+
+def test_build_reads_the_chunks_of_a_duckdb_index(duckdb_index, tmp_path):
+    index = open_lexical_index(duckdb_index, tmp_path)
+    assert [r["symbol"] for r in index.search("emitter", 5)] == ["EventEmitter"]
+    index.close()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_has_embeddings(duckdb_index):
+    import duckdb
+
+    assert not lexical_index.has_embeddings(duckdb_index)
+    con = duckdb.connect(str(duckdb_index))
+    con.execute("CREATE TABLE embeddings_3 (chunk_id INTEGER, embedding FLOAT[3])")
+    con.close()
+    assert not lexical_index.has_embeddings(duckdb_index)
+    con = duckdb.connect(str(duckdb_index))
+    con.execute("INSERT INTO embeddings_3 VALUES (1, [0.1, 0.2, 0.3])")
+    con.close()
+    assert lexical_index.has_embeddings(duckdb_index)
@@ -0,0 +1,111 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+QUERIES = Path(__file__).resolve().parent.parent / "queries"
+
+
+@pytest.fixture
+def without_yaml(monkeypatch):
+    """Make `import yaml` fail, as in the chunkhound venv."""
+    monkeypatch.setitem(sys.modules, "yaml", None)
+
+
+def write_rules(directory, rules):
+    directory.mkdir()
+    for name, text in rules.items():
+        (directory / name).write_text(text)
+    return directory
+
+
+def test_directory_pack_in_file_name_order(chunkhound_search, tmp_path):
+    pack = write_rules(
+        tmp_path / "rules",
+        {
+            "b-rule.yaml": "id: b\nquery: second\ntop_k: 3\n",
+            "a-rule.yaml": "id: a\nquery: first\n",
+            "notes.txt": "query: ignored\n",
+        },
+    )
+    assert chunkhound_search.load_pack(pack, 5) == [
+        {"id": "a", "rule": str(pack / "a-rule.yaml"), "query": "first", "top_k": 5},
+        {"id": "b", "rule": str(pack / "b-rule.yaml"), "query": "second", "top_k": 3},
+    ]
+
+
+def test_jsonl_pack_in_line_order(chunkhound_search, tmp_path):
+    pack = tmp_path / "rules.jsonl"
+    pack.write_text(
+        json.dumps({"id": "z", "query": "first", "top_k": 2})
+        + "\n\n"
+        + json.dumps({"query": "second"})
+        + "\n"
+    )
+    assert chunkhound_search.load_pack(pack, 7) == [
+        {"id": "z", "rule": None, "query": "first", "top_k": 2},
+        {"id": "line-3", "rule": None, "query": "second", "top_k": 7},
+    ]
+
+
+def test_id_falls_back_to_the_file_stem(chunkhound_search, tmp_path):
+    pack = write_rules(tmp_path / "rules", {"event-handler.yaml": "query: handlers\n"})
+    [rule] = chunkhound_search.load_pack(pack, 5)
+    assert rule["id"] == "event-handler"
+
+
+@pytest.mark.parametrize("text", ["id: x\n", "id: x\nquery: ''\n"])
+def test_rule_without_a_query_is_rejected(chunkhound_search, tmp_path, text):
+    pack = write_rules(tmp_path / "rules", {"empty.yaml": text})
+    with pytest.raises(ValueError, match="empty.yaml has no query"):
+        chunkhound_search.load_pack(pack, 5)
+
+
+def test_jsonl_rule_without_a_query_is_rejected(chunkhound_search, tmp_path):
+    pack = tmp_path / "rules.jsonl"
+    pack.write_text('{"query": "ok"}\n{"id": "x"}\n')
+    with pytest.raises(ValueError, match="line-2 has no query"):
+        chunkhound_search.load_pack(pack, 5)
+
+
+def test_fallback_parser_reads_top_level_scalars(chunkhound_search, tmp_path, without_yaml):
+    path = tmp_path / "rule.yaml"
+    path.write_text(
+        "# header comment\n"
+        "archimedes:\n"
+        "  kind: PATTERN\n"
+        "id: event-handler  # trailing comment\n"
+        'query: "on message # not a comment"\n'
+        "single: 'quoted value' # comment\n"
+        "top_k: 4\n"
+        "empty:\n"
+    )
+    assert chunkhound_search.read_rule_yaml(path) == {
+        "id": "event-handler",
+        "query": "on message # not a comment",
+        "single": "quoted value",
+        "top_k": "4",
+    }
+
+
+def test_fallback_pack_defaults_and_converts_top_k(chunkhound_search, tmp_path, without_yaml):
+    pack = write_rules(
+        tmp_path / "rules",
+        {"a.yaml": "query: first\ntop_k: 4\n", "b.yaml": "query: second\n"},
+    )
+    assert [(r["id"], r["top_k"]) for r in chunkhound_search.load_pack(pack, 6)] == [
+        ("a", 4),
+        ("b", 6),
+    ]
+
+
+@pytest.mark.parametrize("pack", sorted(p.parent.name for p in QUERIES.glob("*/rules")))
+def test_fallback_parser_agrees_with_pyyaml_on_shipped_packs(
+    chunkhound_search, monkeypatch, pack
+):
+    pytest.importorskip("yaml")
+    rules = QUERIES / pack / "rules"
+    expected = chunkhound_search.load_pack(rules, 5)
+    monkeypatch.setitem(sys.modules, "yaml", None)
+    assert chunkhound_search.load_pack(rules, 5) == expected
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from embed_cache import FakeEmbeddingProvider
+
+
+def hit(path, start, similarity=0.5, **fields):
+    return dict(
+        file_path=path, start_line=start, end_line=start + 5, similarity=similarity, **fields
+    )
+
+
+def test_fusion_merges_the_same_chunk_under_different_path_spellings(chunkhound_search):
+    semantic = [hit("/repo/src/a.py", 1, source="semantic"), hit("/repo/src/b.py", 1)]
+    lexical = [hit("/repo/src/./a.py", 1, source="lexical"), hit("/repo/lib/../src/c.py", 9)]
+    fused = chunkhound_search.reciprocal_rank_fusion([semantic, lexical], 10)
+
+    assert [(r["file_path"], r["start_line"]) for r in fused] == [
+        ("/repo/src/a.py", 1),
+        ("/repo/src/b.py", 1),
+        ("/repo/lib/../src/c.py", 9),
+    ]
+    # The first list's copy is kept, scored first in both lists
+    assert fused[0]["source"] == "semantic"
+    assert fused[0]["similarity"] == 1.0
+    assert fused[1]["similarity"] == fused[2]["similarity"]
+
+
+def test_fusion_similarity_stays_within_0_and_1(chunkhound_search):
+    rankings = [
+        [hit(f"/r/{name}.py", 1, similarity=9.0) for name in "abcdef"],
+        [hit(f"/r/{name}.py", 1, similarity=-1.0) for name in "fedcba"],
+        [hit(f"/r/{name}.py", 1) for name in "xyz"],
+    ]
+    fused = chunkhound_search.reciprocal_rank_fusion(rankings, 20)
+    assert len(fused) == 9
+    assert all(0 < r["similarity"] <= 1 for r in fused)
+    similarities = [r["similarity"] for r in fused]
+    assert similarities == sorted(similarities, reverse=True)
+
+
+def test_fusion_keeps_top_k(chunkhound_search):
+    ranking = [hit(f"/r/{i}.py", 1) for i in range(10)]
+    assert len(chunkhound_search.reciprocal_rank_fusion([ranking, ranking], 3)) == 3
+    assert chunkhound_search.reciprocal_rank_fusion([[], []], 3) == []
+
+
+@pytest.fixture
+def no_api_key(monkeypatch):
+    monkeypatch.delenv("CHUNKHOUND_EMBEDDING__API_KEY", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+
+def test_auto_is_lexical_without_an_api_key(chunkhound_search, no_api_key):
+    assert chunkhound_search.resolve_mode("auto") == "lexical"
+
+
+@pytest.mark.parametrize("variable", ["CHUNKHOUND_EMBEDDING__API_KEY", "OPENAI_API_KEY"])
+def test_auto_is_semantic_with_an_api_key(chunkhound_search, no_api_key, monkeypatch, variable):
+    monkeypatch.setenv(variable, "sk-test")
+    assert chunkhound_search.resolve_mode("auto") == "semantic"
+
+
+def test_auto_is_semantic_with_fake_embeddings(chunkhound_search, no_api_key):
+    assert chunkhound_search.resolve_mode("auto", FakeEmbeddingProvider()) == "semantic"
+
+
+@pytest.mark.parametrize("mode", ["semantic", "lexical", "hybrid"])
+def test_explicit_modes_are_kept(chunkhound_search, no_api_key, mode):
+    assert chunkhound_search.resolve_mode(mode) == mode
+
+
+@pytest.fixture
+def searcher(chunkhound_search, monkeypatch):
+    """Searcher factory with stand-ins for the index, given whether it has embeddings."""
+    opened = []
+
+    class Lexical:
+        def search(self, query, top_k):
+            return [hit("/repo/a.py", 1, query=query)][:top_k]
+
+    def make(embeddings, mode="auto"):
+        monkeypatch.setattr(chunkhound_search, "has_embeddings", lambda db: embeddings)
+        monkeypatch.setattr(chunkhound_search, "open_lexical_index", lambda db, repo: Lexical())
+        monkeypatch.setattr(
+            chunkhound_search,
+            "setup_services",
+            lambda *args: opened.append("semantic") or (None, None, None),
+        )
+        return chunkhound_search.Searcher("/repo", "/repo/chunkhound.db", mode=mode)
+
+    make.opened = opened
+    return make
+
+
+def test_auto_falls_back_to_lexical_on_an_index_without_embeddings(searcher, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    s = searcher(embeddings=False)
+    assert (s.mode, s.error, searcher.opened) == ("lexical", None, [])
+    assert asyncio.run(s.search("event emitter", 5))[0]["query"] == "event emitter"
+
+
+def test_auto_stays_semantic_on_an_index_with_embeddings(searcher, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    s = searcher(embeddings=True)
+    assert (s.mode, s.error, searcher.opened) == ("semantic", None, ["semantic"])
+
+
+def test_explicit_semantic_ignores_missing_embeddings(searcher, no_api_key):
+    s = searcher(embeddings=False, mode="semantic")
+    assert s.mode == "semantic"
@@ -0,0 +1,110 @@
+import json
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from search_server import request
+
+pytest.importorskip("chunkhound")
+if shutil.which("chunkhound") is None:
+    pytest.skip("chunkhound CLI not on PATH", allow_module_level=True)
+
+SEARCH = Path(__file__).resolve().parent.parent / "tools" / "chunkhound-search.py"
+
+RULES = [
+    {"id": "emitter", "query": "event emitter", "top_k": 3},
+    {"id": "retry", "query": "retry with backoff", "top_k": 3},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    """A chunks-only chunkhound index of a two-file repo: (repo, db)."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "events.py").write_text(
+        "class EventEmitter:\n"
+        "    def emit(self, name):\n"
+        "        return [listener(name) for listener in self.listeners]\n"
+    )
+    (repo / "retry.py").write_text(
+        "def retry_with_backoff(call, attempts=3):\n"
+        "    for attempt in range(attempts):\n"
+        "        return call()\n"
+    )
+    db = tmp_path / "chunkhound.db"
+    subprocess.run(
+        ["chunkhound", "index", str(repo), "--db", str(db), "--no-embeddings"],
+        check=True,
+        capture_output=True,
+    )
+    return repo, db
+
+
+def search(*args, **kwargs):
+    return subprocess.run(
+        [sys.executable, str(SEARCH), *args], capture_output=True, text=True, **kwargs
+    )
+
+
+def stderr_json(stderr, key):
+    """The value of the last stderr JSON line carrying key."""
+    lines = [json.loads(line) for line in stderr.splitlines() if line.startswith("{")]
+    return [line[key] for line in lines if key in line][-1]
+
+
+def test_pack_is_answered_by_a_server_with_fake_embeddings(index, tmp_path):
+    repo, db = index
+    socket_path = tmp_path / "search.sock"
+    pack = tmp_path / "rules.jsonl"
+    pack.write_text("".join(json.dumps(rule) + "\n" for rule in RULES))
+    common = ["--repo", str(repo), "--db", str(db), "--mode", "semantic"]
+
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            str(SEARCH),
+            "--serve",
+            "--socket",
+            str(socket_path),
+            "--fake-embeddings",
+            "--no-embed-cache",
+            *common,
+        ],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while request(socket_path, "ping") is None:
+            assert server.poll() is None, server.stderr.read()
+            assert time.monotonic() < deadline, "search server did not start"
+            time.sleep(0.1)
+
+        # No --fake-embeddings here: without the server the pack would fail
+        client = search("--pack", str(pack), "--socket", str(socket_path), "--timings", *common)
+        assert client.returncode == 0, client.stderr
+        lines = [json.loads(line) for line in client.stdout.splitlines()]
+        assert [line["id"] for line in lines] == ["emitter", "retry"]
+        assert all(isinstance(line["results"], list) for line in lines)
+        assert not any("error" in line for line in lines)
+
+        # Setup happened in the server, before the request
+        timings = stderr_json(client.stderr, "timings")
+        assert timings["mode"] == "semantic"
+        assert timings["setup_ms"] == 0.0
+
+        assert request(socket_path, "shutdown")["result"] == "bye"
+        _, stderr = server.communicate(timeout=30)
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.communicate()
+    assert server.returncode == 0
+    # Each query was embedded once, by the fake provider behind the server's cache
+    assert stderr_json(stderr, "embed_cache")["misses"] == len(RULES)
+    assert not socket_path.exists()
@@ -10,12 +10,61 @@ available without any PYTHONPATH manipulation.
 
 Usage:
   ./chunkhound-search.py --query "text" --repo /path/to/repo --db /path/to/chunks.db --top-k 5
+  ./chunkhound-search.py --pack queries/core/rules --repo /path/to/repo --db /path/to/chunks.db
 
 Arguments:
-  --query   Search query string (required)
+  --query   Search query string (required unless --pack is given)
+  --pack    Run every query of a rule pack instead: a directory of rule YAML
+            files (id, query, top_k), or a JSONL file of {id, query, top_k}
   --repo    Repository root path for path normalization (required)
   --db      Path to chunkhound .db file (required)
-  --top-k   Maximum number of results to return (default: 5)
+  --top-k   Maximum number of results to return; with --pack, the default for
+            rules without top_k (default: 5)
+  --mode    semantic (embeddings), lexical (BM25 over the chunk text in the
+            index; offline, no API key), hybrid (both, fused by reciprocal
+            rank) or auto: semantic when an embedding API key (or
+            --fake-embeddings) is set and the index has embeddings, else
+            lexical (default: $ARCHIMEDES_SEARCH_MODE, else auto)
+  --embed-cache PATH
+            Query-embedding cache file (default: $ARCHIMEDES_EMBED_CACHE, else
+            ~/.cache/archimedes/query-embeddings.sqlite)
+  --embed-cache-size N
+            Entries kept in the cache; least recently used are evicted
+            (default: 10000)
+  --no-embed-cache
+            Do not read or write the cache file (queries of one run are still
+            embedded once)
+  --concurrency N
+            Searches run at once with --pack (default: 4)
+  --timings Print a per-stage timing breakdown to stderr
+  --serve   Set chunkhound up once and answer search requests until told to
+            exit (see search_server.py), on --socket or else stdin/stdout
+  --socket PATH
+            With --serve, the Unix socket to listen on. With --query/--pack
+            (default: $ARCHIMEDES_SEARCH_SOCKET), a server to send the search
+            to; without a server for this --db, the search runs in-process
+  --fake-embeddings
+            Embed with a deterministic offline provider instead of the
+            configured one (--fake-dims, --fake-latency-ms), for testing
+            without network access
+
+With --pack, chunkhound is imported, the config and embedding provider are set
+up and the index is opened once, then every rule's query runs against them.
+That replaces one process per rule with one process per pack. All of the
+pack's queries are embedded in one batched provider call, then the searches
+run concurrently (--concurrency at a time).
+
+Without an embedding API key, or on an index built with
+`chunkhound index --no-embeddings`, searches fall back to lexical retrieval: BM25
+over the chunk text chunkhound stored in the index, through a SQLite FTS5
+sidecar built next to it (see lexical_index.py). It needs no network and
+answers in milliseconds, so scans still write tags offline. Lexical
+similarity is the BM25 score mapped into 0..1; hybrid similarity is the
+fused reciprocal-rank score relative to its maximum.
+
+Query embeddings are cached on disk, keyed on (provider, model, query text),
+so rescanning with unchanged rules makes no embedding API calls (see
+embed_cache.py). Cache hits and misses are reported on stderr.
 
 Output (stdout):
   JSON array of result objects with fields:
@@ -27,18 +76,60 @@ Output (stdout):
     symbol      (str|null)
     chunk_type  (str|null)
 
+  With --pack, one JSON object per rule instead (JSONL, in pack order):
+    id          (str)       rule id
+    rule        (str|null)  rule YAML path (null for JSONL packs)
+    query       (str)
+    top_k       (int)
+    results     (array)     result objects as above
+    error       (str)       only when this rule's search failed
+
 Exit codes:
-  0  success (including missing-index case, returns [])
-  1  fatal error (bad args, import failure, embedding API failure)
+  0  success (including missing-index case, returns [] / empty results)
+  1  fatal error (bad args, import failure, embedding API failure); with
+     --pack, any rule failed
 """
 
 import argparse
 import asyncio
 import json
 import os
+import sqlite3
 import sys
+import time
 from pathlib import Path
 
+from embed_cache import (
+    DEFAULT_MAX_ENTRIES,
+    CachedEmbeddingProvider,
+    EmbeddingCache,
+    FakeEmbeddingProvider,
+    default_cache_path,
+)
+from lexical_index import has_embeddings, open_lexical_index
+from search_server import (
+    INVALID_PARAMS,
+    RequestError,
+    request,
+    serve_socket,
+    serve_stdio,
+)
+
+# Retrieval modes (see Searcher)
+MODES = ("auto", "semantic", "lexical", "hybrid")
+
+# Reciprocal-rank fusion constant and candidates per retriever (x top_k) in
+# hybrid mode
+RRF_K = 60
+HYBRID_DEPTH = 3
+
+# Searches in flight at once in --pack mode. chunkhound runs DuckDB queries on
+# its own executor, so this overlaps the rest of each search with them.
+DEFAULT_CONCURRENCY = 4
+
+# Seconds to wait for a search server's answer before searching in-process
+SERVER_TIMEOUT = 120.0
+
 
 def build_config(db_path: Path, repo_path: Path):
     """Build a minimal chunkhound Config for search-only use.
@@ -78,8 +169,74 @@ def build_config(db_path: Path, repo_path: Path):
     return cfg
 
 
-async def run_search(query: str, repo: Path, db: Path, top_k: int) -> list:
-    """Execute semantic search and return list of result dicts."""
+def read_rule_yaml(path: Path) -> dict:
+    """Read a rule YAML file (id, query, top_k and the archimedes block).
+
+    Uses PyYAML when the interpreter has it; otherwise reads the top-level
+    scalar keys, which is all a search needs from a rule.
+    """
+    text = path.read_text()
+    try:
+        import yaml
+    except ImportError:
+        rule = {}
+        for line in text.splitlines():
+            if not line or line[0] in " \t#" or ":" not in line:
+                continue
+            key, _, value = line.partition(":")
+            value = value.strip()
+            if value[:1] in ("\"", "'") and value[0] in value[1:]:
+                # Quoted: up to the closing quote, so " #" inside is kept
+                value = value[1 : value.index(value[0], 1)]
+            else:
+                value = value.split(" #", 1)[0].strip()
+            if value:
+                rule[key.strip()] = value
+        return rule
+    return yaml.safe_load(text) or {}
+
+
+def load_pack(pack: Path, default_top_k: int) -> list:
+    """Load a rule pack: a directory of *.yaml rules or a JSONL file of rules.
+
+    Returns [{"id", "rule", "query", "top_k"}] in pack order (file name order
+    for directories, line order for JSONL). Raises ValueError for rules
+    without a query.
+    """
+    entries = []
+    if pack.is_dir():
+        for path in sorted(pack.glob("*.yaml")):
+            rule = read_rule_yaml(path)
+            entries.append((rule, str(path), path.stem))
+    else:
+        with pack.open() as f:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    entries.append((json.loads(line), None, f"line-{line_number}"))
+
+    rules = []
+    for rule, rule_path, fallback_id in entries:
+        if not isinstance(rule, dict) or not rule.get("query"):
+            raise ValueError(f"Rule {rule_path or fallback_id} has no query")
+        rules.append({
+            "id": str(rule.get("id") or fallback_id),
+            "rule": rule_path,
+            "query": str(rule["query"]),
+            "top_k": int(rule.get("top_k") or default_top_k),
+        })
+    return rules
+
+
+def setup_services(repo: Path, db: Path, embed_cache=None, fake_provider=None):
+    """Set up chunkhound for searching.
+
+    Returns (services, embedding_manager, provider). This is the expensive
+    part of a search (imports, config, provider registration, opening the
+    DuckDB index); do it once per process. With an EmbeddingCache, the
+    provider is wrapped so query embeddings come from the cache when present;
+    provider is that wrapper (None without a cache or provider). A
+    fake_provider replaces the configured embedding provider.
+    """
     # Suppress chunkhound's verbose DEBUG/INFO logging so stdout stays clean JSON.
     # WARNING and above are still emitted to stderr so real errors are visible.
     try:
@@ -93,7 +250,6 @@ async def run_search(query: str, repo: Path, db: Path, top_k: int) -> list:
     from chunkhound.core.config.embedding_factory import EmbeddingProviderFactory
     from chunkhound.database_factory import create_services
     from chunkhound.embeddings import EmbeddingManager
-    from chunkhound.mcp_server.tools import search_semantic_impl
     from chunkhound.registry import configure_registry
 
     config = build_config(db_path=db, repo_path=repo)
@@ -103,9 +259,14 @@ async def run_search(query: str, repo: Path, db: Path, top_k: int) -> list:
 
     # Set up embedding manager (required by search_semantic_impl).
     embedding_manager = EmbeddingManager()
-    if config.embedding:
+    cached = None
+    if config.embedding or fake_provider is not None:
         try:
-            provider = EmbeddingProviderFactory.create_provider(config.embedding)
+            provider = fake_provider or EmbeddingProviderFactory.create_provider(
+                config.embedding
+            )
+            if embed_cache is not None:
+                provider = cached = CachedEmbeddingProvider(provider, embed_cache)
             embedding_manager.register_provider(provider, set_default=True)
         except Exception as exc:
             # Non-fatal: search will fail later with a clear message if the
@@ -121,6 +282,12 @@ async def run_search(query: str, repo: Path, db: Path, top_k: int) -> list:
         config=config,
         embedding_manager=embedding_manager,
     )
+    return services, embedding_manager, cached
+
+
+async def search(services, embedding_manager, query: str, top_k: int) -> list:
+    """Run one semantic search against services from setup_services()."""
+    from chunkhound.mcp_server.tools import search_semantic_impl
 
     # Execute semantic search via the shared MCP implementation.
     response = await search_semantic_impl(
@@ -134,6 +301,274 @@ async def run_search(query: str, repo: Path, db: Path, top_k: int) -> list:
     return response.get("results", [])
 
 
+def elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def resolve_mode(mode: str, fake_provider=None) -> str:
+    """The retrieval mode to use; "auto" is semantic when an embedding
+    provider is configured (API key or fake provider), else lexical.
+
+    Searcher also turns "auto" into lexical when the index has no
+    embeddings to search."""
+    if mode != "auto":
+        return mode
+    api_key = os.environ.get("CHUNKHOUND_EMBEDDING__API_KEY") or os.environ.get(
+        "OPENAI_API_KEY"
+    )
+    return "semantic" if api_key or fake_provider is not None else "lexical"
+
+
+def reciprocal_rank_fusion(rankings: list, top_k: int, k: int = RRF_K) -> list:
+    """Fuse ranked result lists by reciprocal rank: sum of 1 / (k + rank).
+
+    Results are the same chunk when file, start and end line agree; the
+    first list's copy is kept. similarity is the fused score divided by its
+    maximum (first in every list), so it stays within 0..1.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, 1):
+            key = (
+                os.path.normpath(result["file_path"]),
+                result.get("start_line"),
+                result.get("end_line"),
+            )
+            entry = fused.setdefault(key, [0.0, result])
+            entry[0] += 1.0 / (k + rank)
+    best = len(rankings) / (k + 1)
+    ordered = sorted(fused.values(), key=lambda entry: -entry[0])[:top_k]
+    return [dict(result, similarity=round(score / best, 6)) for score, result in ordered]
+
+
+class Searcher:
+    """chunkhound set up once for one index, then searched any number of times.
+
+    mode is semantic (embeddings through chunkhound), lexical (BM25 over the
+    index's chunk text, see lexical_index.py) or hybrid (both, fused by
+    reciprocal rank); see resolve_mode for "auto", which also picks lexical
+    for an index without embeddings. A setup failure is kept
+    in `error` rather than raised, so every rule of a pack (or every server
+    request) reports it.
+    """
+
+    def __init__(
+        self, repo: Path, db: Path, embed_cache=None, fake_provider=None, mode="auto"
+    ):
+        self.db = db
+        self.requested_mode = mode
+        self.mode = resolve_mode(mode, fake_provider)
+        start = time.perf_counter()
+        self.error = None
+        self.lexical = self.provider = None
+        try:
+            # Before chunkhound opens the index: both read it read-only
+            if mode == "auto" and self.mode == "semantic" and not has_embeddings(db):
+                self.mode = "lexical"
+            if self.mode in ("lexical", "hybrid"):
+                self.lexical = open_lexical_index(db, repo)
+            if self.mode in ("semantic", "hybrid"):
+                self.services, self.embedding_manager, self.provider = setup_services(
+                    repo, db, embed_cache, fake_provider
+                )
+        except Exception as exc:
+            self.error = str(exc)
+        self.setup_ms = elapsed_ms(start)
+
+    async def search(self, query: str, top_k: int) -> list:
+        """Normalized results for one query."""
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        if self.mode == "lexical":
+            return self.lexical.search(query, top_k)
+        if self.mode == "semantic":
+            raw = await search(self.services, self.embedding_manager, query, top_k)
+            return normalize_results(raw)
+
+        # Hybrid: fuse deeper candidate lists from both retrievers
+        depth = top_k * HYBRID_DEPTH
+        raw = await search(self.services, self.embedding_manager, query, depth)
+        return reciprocal_rank_fusion(
+            [normalize_results(raw), self.lexical.search(query, depth)], top_k
+        )
+
+    async def pack(
+        self, rules: list, concurrency: int = DEFAULT_CONCURRENCY, timings: dict = None
+    ):
+        """Yield one output line per rule, in pack order.
+
+        The queries are embedded up front in one batched provider call
+        (through the embedding cache, which then answers each search's own
+        embed call), then up to `concurrency` searches run at once. Each line
+        is yielded as soon as it and the rules before it have finished. Stage
+        times (embed, search, per rule) are added to `timings` when given.
+        """
+        timings = {} if timings is None else timings
+        if self.error is None and self.provider is not None:
+            start = time.perf_counter()
+            try:
+                await self.provider.embed([rule["query"] for rule in rules])
+            except Exception as exc:
+                # Non-fatal: each search embeds its own query and reports its error.
+                print(
+                    json.dumps({"warning": f"Batched query embedding failed: {exc}"}),
+                    file=sys.stderr,
+                )
+            timings["embed_ms"] = elapsed_ms(start)
+
+        concurrency = max(1, concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        rule_ms = timings.setdefault("rules", [])
+
+        async def run_rule(rule: dict) -> dict:
+            line = dict(rule, results=[])
+            async with semaphore:
+                rule_start = time.perf_counter()
+                try:
+                    line["results"] = await self.search(rule["query"], rule["top_k"])
+                except Exception as exc:
+                    line["error"] = str(exc)
+                rule_ms.append({"id": rule["id"], "ms": elapsed_ms(rule_start)})
+            return line
+
+        start = time.perf_counter()
+        tasks = [asyncio.ensure_future(run_rule(rule)) for rule in rules]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+        timings["search_ms"] = elapsed_ms(start)
+        timings["concurrency"] = concurrency
+
+
+async def run_search(
+    query: str,
+    repo: Path,
+    db: Path,
+    top_k: int,
+    embed_cache=None,
+    fake_provider=None,
+    mode: str = "auto",
+) -> list:
+    """Execute search and return list of normalized result dicts."""
+    searcher = Searcher(repo, db, embed_cache, fake_provider, mode)
+    return await searcher.search(query, top_k)
+
+
+async def run_pack(
+    rules: list,
+    repo: Path,
+    db: Path,
+    embed_cache=None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timings: dict = None,
+    fake_provider=None,
+    mode: str = "auto",
+) -> int:
+    """Run every rule's query with one Searcher, printing JSONL.
+
+    Returns the number of rules whose search failed.
+    """
+    timings = {} if timings is None else timings
+    searcher = Searcher(repo, db, embed_cache, fake_provider, mode)
+    timings["mode"] = searcher.mode
+    timings["setup_ms"] = searcher.setup_ms
+    if searcher.error is not None:
+        print(json.dumps({"error": searcher.error}), file=sys.stderr)
+    failed = 0
+    async for line in searcher.pack(rules, concurrency, timings):
+        failed += "error" in line
+        print(json.dumps(line), flush=True)
+    return failed
+
+
+async def serve(
+    repo: Path,
+    db: Path,
+    socket_path=None,
+    embed_cache=None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    fake_provider=None,
+    mode: str = "auto",
+) -> int:
+    """Keep one Searcher warm and answer requests until told to shut down.
+
+    Requests come from the Unix socket at socket_path, or from stdin when it
+    is None (see search_server.py for the protocol).
+    """
+    searcher = Searcher(repo, db, embed_cache, fake_provider, mode)
+    if searcher.error is not None:
+        # Keep serving: every request reports the setup error.
+        print(json.dumps({"error": searcher.error}), file=sys.stderr)
+    stop = asyncio.Event()
+
+    def check_db(params: dict) -> None:
+        if Path(params.get("db") or "").resolve() != db.resolve():
+            raise RequestError(INVALID_PARAMS, f"This server searches {db}")
+        requested = params.get("mode") or "auto"
+        # "auto" is resolved as the server resolved it, index check included
+        if requested == "auto" and searcher.requested_mode == "auto":
+            return
+        if resolve_mode(requested, fake_provider) != searcher.mode:
+            raise RequestError(INVALID_PARAMS, f"This server runs {searcher.mode} searches")
+
+    async def handle_search(params: dict) -> dict:
+        check_db(params)
+        if not isinstance(params.get("query"), str):
+            raise RequestError(INVALID_PARAMS, "params.query must be a string")
+        return {"results": await searcher.search(params["query"], int(params.get("top_k") or 5))}
+
+    async def handle_pack(params: dict) -> dict:
+        check_db(params)
+        rules = params.get("rules")
+        if not isinstance(rules, list) or not all(
+            isinstance(rule, dict) and isinstance(rule.get("query"), str) for rule in rules
+        ):
+            raise RequestError(INVALID_PARAMS, "params.rules must be a list of rules")
+        start = time.perf_counter()
+        timings = {"mode": searcher.mode, "setup_ms": 0.0}
+        lines = [
+            line
+            async for line in searcher.pack(
+                rules, int(params.get("concurrency") or concurrency), timings
+            )
+        ]
+        timings["total_ms"] = elapsed_ms(start)
+        return {"lines": lines, "timings": timings}
+
+    async def handle_shutdown(params: dict) -> str:
+        stop.set()
+        return "bye"
+
+    handlers = {"search": handle_search, "pack": handle_pack, "shutdown": handle_shutdown}
+    if socket_path is None:
+        await serve_stdio(handlers, stop)
+    else:
+        await serve_socket(socket_path, handlers, stop)
+    return 0
+
+
+def search_via_server(socket_path: Path, method: str, params: dict):
+    """Result of a request to a running server, or None to search in-process.
+
+    None when no server is listening, it does not answer within
+    SERVER_TIMEOUT, or it refused the request (for instance, because it
+    serves another index).
+    """
+    response = request(socket_path, method, params, SERVER_TIMEOUT)
+    if response is None:
+        return None
+    if "error" in response:
+        print(
+            json.dumps({"warning": f"Search server: {response['error'].get('message')}"}),
+            file=sys.stderr,
+        )
+        return None
+    return response.get("result")
+
+
 def normalize_results(raw: list) -> list:
     """Normalize raw result dicts to the canonical output schema."""
     output = []
@@ -154,7 +589,19 @@ def main() -> int:
     parser = argparse.ArgumentParser(
         description="chunkhound semantic search -> JSON array on stdout"
     )
-    parser.add_argument("--query", required=True, help="Search query text")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--query", help="Search query text")
+    target.add_argument(
+        "--pack",
+        help="Rule pack to run instead: directory of rule YAML files or JSONL "
+        "of {id, query, top_k}; prints one JSON line per rule",
+    )
+    target.add_argument(
+        "--serve",
+        action="store_true",
+        help="Keep chunkhound set up and answer JSON-RPC requests on --socket "
+        "(or stdin) until a shutdown request",
+    )
     parser.add_argument(
         "--repo",
         required=True,
@@ -166,11 +613,77 @@ def main() -> int:
     parser.add_argument(
         "--top-k", type=int, default=5, help="Maximum results to return (default: 5)"
     )
+    parser.add_argument(
+        "--mode",
+        choices=MODES,
+        default=os.environ.get("ARCHIMEDES_SEARCH_MODE") or "auto",
+        help="Retrieval: semantic (embeddings), lexical (BM25 over chunk text, "
+        "offline), hybrid (both, rank-fused), or auto: semantic with an API key, "
+        "else lexical (default: $ARCHIMEDES_SEARCH_MODE or auto)",
+    )
+    parser.add_argument(
+        "--embed-cache",
+        help="Query-embedding cache file (default: $ARCHIMEDES_EMBED_CACHE or "
+        "~/.cache/archimedes/query-embeddings.sqlite)",
+    )
+    parser.add_argument(
+        "--embed-cache-size",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help=f"Entries kept in the embedding cache (default: {DEFAULT_MAX_ENTRIES})",
+    )
+    parser.add_argument(
+        "--no-embed-cache",
+        action="store_true",
+        help="Do not read or write the query-embedding cache file",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Searches run at once with --pack (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print per-stage timings to stderr as one JSON line",
+    )
+    parser.add_argument(
+        "--socket",
+        help="Unix socket of the search server: listened on with --serve, "
+        "tried first with --query/--pack (default for clients: "
+        "$ARCHIMEDES_SEARCH_SOCKET)",
+    )
+    parser.add_argument(
+        "--fake-embeddings",
+        action="store_true",
+        help="Embed queries with a deterministic offline fake provider",
+    )
+    parser.add_argument(
+        "--fake-dims",
+        type=int,
+        default=1536,
+        help="Vector size of the fake provider (default: 1536)",
+    )
+    parser.add_argument(
+        "--fake-latency-ms",
+        type=float,
+        default=0.0,
+        help="Simulated round-trip time of each fake provider call",
+    )
     args = parser.parse_args()
 
     db_path = Path(args.db)
     repo_path = Path(args.repo)
 
+    rules = None
+    if args.pack:
+        try:
+            rules = load_pack(Path(args.pack), args.top_k)
+        except (OSError, ValueError) as exc:
+            print(json.dumps({"error": f"Invalid pack {args.pack}: {exc}"}), file=sys.stderr)
+            return 1
+
     # Graceful exit when index is absent -- scan.sh should continue.
     if not db_path.exists():
         print(
@@ -179,27 +692,119 @@ def main() -> int:
             ),
             file=sys.stderr,
         )
-        print("[]")
+        if args.serve:
+            return 1
+        if rules is None:
+            print("[]")
+        for rule in rules or []:
+            print(json.dumps(dict(rule, results=[])))
         return 0
 
+    start = time.perf_counter()
+    timings = {}
+
+    # A warm server answers without any chunkhound setup in this process.
+    socket_path = args.socket or os.environ.get("ARCHIMEDES_SEARCH_SOCKET")
+    if socket_path and not args.serve:
+        params = {"db": str(db_path.resolve()), "mode": args.mode}
+        if rules is not None:
+            params.update(rules=rules, concurrency=args.concurrency)
+            result = search_via_server(Path(socket_path), "pack", params)
+            if result is not None:
+                for line in result["lines"]:
+                    print(json.dumps(line))
+                if args.timings:
+                    print(json.dumps({"timings": result["timings"]}), file=sys.stderr)
+                return 1 if any("error" in line for line in result["lines"]) else 0
+        else:
+            params.update(query=args.query, top_k=args.top_k)
+            result = search_via_server(Path(socket_path), "search", params)
+            if result is not None:
+                print(json.dumps(result["results"]))
+                return 0
+
+    fake_provider = None
+    if args.fake_embeddings:
+        fake_provider = FakeEmbeddingProvider(
+            dims=args.fake_dims, latency_ms=args.fake_latency_ms
+        )
+    cache_path = None
+    if not args.no_embed_cache:
+        cache_path = Path(args.embed_cache) if args.embed_cache else default_cache_path()
     try:
-        raw = asyncio.run(
-            run_search(
-                query=args.query,
-                repo=repo_path,
-                db=db_path,
-                top_k=args.top_k,
-            )
+        embed_cache = EmbeddingCache(cache_path, args.embed_cache_size)
+    except (OSError, sqlite3.Error) as exc:
+        # Non-fatal: keep the cache in memory for this run.
+        print(
+            json.dumps({"warning": f"Embedding cache file disabled: {exc}"}),
+            file=sys.stderr,
         )
-        output = normalize_results(raw)
-        print(json.dumps(output))
-        return 0
+        embed_cache = EmbeddingCache(None, args.embed_cache_size)
 
-    except Exception as exc:
-        print(json.dumps({"error": str(exc)}), file=sys.stderr)
-        # Still emit an empty array so callers that check stdout get valid JSON.
-        print("[]")
-        return 1
+    try:
+        if args.serve:
+            try:
+                return asyncio.run(
+                    serve(
+                        repo_path,
+                        db_path,
+                        Path(args.socket) if args.socket else None,
+                        embed_cache,
+                        args.concurrency,
+                        fake_provider,
+                        args.mode,
+                    )
+                )
+            except OSError as exc:
+                print(json.dumps({"error": str(exc)}), file=sys.stderr)
+                return 1
+
+        if rules is not None:
+            failed = asyncio.run(
+                run_pack(
+                    rules,
+                    repo_path,
+                    db_path,
+                    embed_cache,
+                    args.concurrency,
+                    timings,
+                    fake_provider,
+                    args.mode,
+                )
+            )
+            return 1 if failed else 0
+
+        try:
+            output = asyncio.run(
+                run_search(
+                    query=args.query,
+                    repo=repo_path,
+                    db=db_path,
+                    top_k=args.top_k,
+                    embed_cache=embed_cache,
+                    fake_provider=fake_provider,
+                    mode=args.mode,
+                )
+            )
+            print(json.dumps(output))
+            return 0
+
+        except Exception as exc:
+            print(json.dumps({"error": str(exc)}), file=sys.stderr)
+            # Still emit an empty array so callers that check stdout get valid JSON.
+            print("[]")
+            return 1
+    finally:
+        print(
+            json.dumps(
+                {"embed_cache": {"hits": embed_cache.hits, "misses": embed_cache.misses}}
+            ),
+            file=sys.stderr,
+        )
+        embed_cache.close()
+        if args.timings:
+            timings["total_ms"] = elapsed_ms(start)
+            print(json.dumps({"timings": timings}), file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+"""
+embed_cache.py -- persistent query-embedding cache for chunkhound-search.py.
+
+Rule queries are static strings, so their embeddings only need computing
+once per (provider, model). The cache is a SQLite file keyed on provider
+name, model and the whitespace-normalized query text. Vectors are stored as
+float32 blobs, and the least recently used entries are evicted once the
+cache holds more than max_entries.
+
+CachedEmbeddingProvider wraps a chunkhound embedding provider and answers
+embed() from the cache, sending only the misses to the real provider. Every
+other attribute is delegated, so it can be registered with EmbeddingManager
+in place of the provider it wraps.
+
+FakeEmbeddingProvider returns deterministic vectors derived from the text
+and counts its calls, for exercising the cache without a network:
+
+    fake = FakeEmbeddingProvider()
+    provider = CachedEmbeddingProvider(fake, EmbeddingCache(Path("/tmp/cache.sqlite")))
+    asyncio.run(provider.embed(["event emitter"]))   # fake.calls == 1
+    asyncio.run(provider.embed(["event  emitter"]))  # still 1: cache hit
+
+Only the standard library is used; the module does not import chunkhound.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import struct
+import time
+from array import array
+from pathlib import Path
+
+DEFAULT_MAX_ENTRIES = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    provider TEXT NOT NULL,
+    model    TEXT NOT NULL,
+    query    TEXT NOT NULL,
+    dims     INTEGER NOT NULL,
+    vector   BLOB NOT NULL,
+    used     REAL NOT NULL,
+    PRIMARY KEY (provider, model, query)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used);
+"""
+
+
+def default_cache_path() -> Path:
+    """ARCHIMEDES_EMBED_CACHE, else query-embeddings.sqlite in the user cache dir."""
+    if path := os.environ.get("ARCHIMEDES_EMBED_CACHE"):
+        return Path(path)
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "archimedes" / "query-embeddings.sqlite"
+
+
+def normalize_query(text: str) -> str:
+    """Collapse runs of whitespace and trim: the text that is keyed and embedded."""
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """SQLite-backed map of (provider, model, query) -> float32 vector.
+
+    With path None the cache lives in memory for the life of the object.
+    """
+
+    def __init__(self, path: Path | None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(":memory:" if path is None else str(path), timeout=5.0)
+        self.db.executescript(SCHEMA)
+
+    def get(self, provider: str, model: str, queries: list) -> dict:
+        """Cached vectors for the queries found, as {query: [float, ...]}.
+
+        Hits are marked as used now, which is what eviction orders by.
+        """
+        found = {}
+        for query in queries:
+            if query in found:
+                continue
+            row = self.db.execute(
+                "SELECT dims, vector FROM embeddings"
+                " WHERE provider = ? AND model = ? AND query = ?",
+                (provider, model, query),
+            ).fetchone()
+            if row is None:
+                continue
+            dims, blob = row
+            vector = array("f")
+            vector.frombytes(blob)
+            if len(vector) == dims:
+                found[query] = vector.tolist()
+        self.hits += sum(query in found for query in queries)
+        self.misses += sum(query not in found for query in queries)
+        if found:
+            now = time.time()
+            self.db.executemany(
+                "UPDATE embeddings SET used = ?"
+                " WHERE provider = ? AND model = ? AND query = ?",
+                [(now, provider, model, query) for query in found],
+            )
+            self.db.commit()
+        return found
+
+    def put(self, provider: str, model: str, vectors: dict) -> None:
+        """Store {query: vector}, then evict down to max_entries."""
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (provider, model, query, len(vector), array("f", vector).tobytes(), now)
+                for query, vector in vectors.items()
+            ],
+        )
+        self.db.execute(
+            "DELETE FROM embeddings WHERE (provider, model, query) IN ("
+            " SELECT provider, model, query FROM embeddings"
+            " ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.db.commit()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class CachedEmbeddingProvider:
+    """Embedding provider answering embed() from an EmbeddingCache first."""
+
+    def __init__(self, provider, cache: EmbeddingCache):
+        self._provider = provider
+        self._cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self._provider, name)
+
+    def _key(self) -> tuple:
+        provider = getattr(self._provider, "name", None) or type(self._provider).__name__
+        model = getattr(self._provider, "model", None) or ""
+        return str(provider), str(model)
+
+    async def embed(self, texts: list) -> list:
+        """Embed texts, calling the wrapped provider only for cache misses."""
+        queries = [normalize_query(text) for text in texts]
+        provider, model = self._key()
+        vectors = self._cache.get(provider, model, queries)
+        missing = [query for query in dict.fromkeys(queries) if query not in vectors]
+        if missing:
+            # Rounded to float32 as stored, so a miss returns what a later hit will
+            computed = {
+                query: array("f", vector).tolist()
+                for query, vector in zip(missing, await self._provider.embed(missing))
+            }
+            self._cache.put(provider, model, computed)
+            vectors.update(computed)
+        return [vectors[query] for query in queries]
+
+    async def embed_single(self, text: str) -> list:
+        return (await self.embed([text]))[0]
+
+
+class FakeEmbeddingProvider:
+    """Deterministic, offline embedding provider (vectors hashed from the text).
+
+    Each embed() call waits latency_ms first, standing in for the provider's
+    network round-trip.
+    """
+
+    name = "fake"
+    distance = "cosine"
+    batch_size = 100
+
+    def __init__(
+        self, model: str = "fake-embedding", dims: int = 64, latency_ms: float = 0.0
+    ):
+        self.model = model
+        self.dims = dims
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    async def embed(self, texts: list) -> list:
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return [self.vector(text) for text in texts]
+
+    async def embed_single(self, text: str) -> list:
+        return (await self.embed([text]))[0]
+
+    def vector(self, text: str) -> list:
+        """Unit vector whose components are hashed from the text."""
+        words = []
+        counter = 0
+        while len(words) < self.dims:
+            digest = hashlib.sha256(f"{counter}:{text}".encode()).digest()
+            words.extend(struct.unpack("<8i", digest))
+            counter += 1
+        values = [w / 2**31 for w in words[: self.dims]]
+        norm = sum(v * v for v in values) ** 0.5 or 1.0
+        return [v / norm for v in values]
@@ -0,0 +1,216 @@
+"""
+lexical_index.py -- BM25 keyword search over a chunkhound index, offline.
+
+chunkhound's DuckDB index already stores every chunk's text. This module
+copies the chunks into a SQLite FTS5 sidecar next to the index
+(chunkhound.db -> chunkhound.lexical.sqlite) and ranks them with FTS5's
+bm25(). Queries take milliseconds and need neither an embedding provider nor
+a network connection.
+
+Code identifiers are split before indexing, so "executeNVAInBatches" or
+"load_config" are also found by their words (execute, nva, batches; load,
+config). Symbol names are weighted above the chunk body. A query matches
+chunks containing any of its words, best BM25 score first; similarity is
+that score mapped into 0..1 (score / (score + 1)).
+
+The sidecar records the size and modification time of the DuckDB file it
+was built from and is rebuilt when they change. Building reads the index
+with the duckdb module (present wherever chunkhound is installed) through a
+read-only connection, so do it before chunkhound opens the same file. The
+same goes for has_embeddings(), which tells an index built with
+`chunkhound index --no-embeddings` (chunks only) from one that can be
+searched semantically.
+"""
+
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+VERSION = 1
+
+# bm25() column weights: symbol words, then all words of the chunk
+SYMBOL_WEIGHT = 3.0
+TEXT_WEIGHT = 1.0
+
+CHUNKS_SQL = """
+SELECT f.path, c.symbol, c.chunk_type, c.start_line, c.end_line, c.code
+FROM chunks c JOIN files f ON f.id = c.file_id
+"""
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE chunks (
+    id         INTEGER PRIMARY KEY,
+    file_path  TEXT NOT NULL,
+    symbol     TEXT,
+    chunk_type TEXT,
+    start_line INTEGER,
+    end_line   INTEGER,
+    content    TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE chunks_fts USING fts5(symbol_words, words, content='');
+"""
+
+_TOKEN = re.compile(r"[A-Za-z0-9]+")
+_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def split_words(text: str) -> list:
+    """Lowercase words of text, with identifiers also split into their parts.
+
+    "executeNVAInBatches" gives executenvainbatches, execute, nva, in,
+    batches; single characters are dropped.
+    """
+    words = []
+    for token in _TOKEN.findall(text):
+        parts = _PART.findall(token)
+        for word in [token, *parts] if len(parts) > 1 else [token]:
+            if len(word) > 1:
+                words.append(word.lower())
+    return words
+
+
+def sidecar_path(db: Path) -> Path:
+    return db.with_name(db.stem + ".lexical.sqlite")
+
+
+def _signature(db: Path) -> str:
+    stat = db.stat()
+    return f"{VERSION}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def has_embeddings(db: Path) -> bool:
+    """Whether the chunkhound index db stores any chunk embeddings.
+
+    chunkhound keeps vectors in one embeddings_<dims> table per dimension
+    count; an index built with --no-embeddings has none, or only empty ones.
+    """
+    import duckdb
+
+    source = duckdb.connect(str(db), read_only=True)
+    try:
+        tables = source.execute(
+            "SELECT table_name FROM information_schema.tables"
+            " WHERE table_name LIKE 'embeddings_%'"
+        ).fetchall()
+        return any(
+            source.execute(f'SELECT 1 FROM "{name}" LIMIT 1').fetchone() for (name,) in tables
+        )
+    finally:
+        source.close()
+
+
+def write(path: Path, batches, signature: str) -> None:
+    """Write the sidecar at path from batches of chunk rows.
+
+    Rows are (file path, symbol, chunk type, start line, end line, code), as
+    selected by CHUNKS_SQL; signature identifies the index they came from.
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    out = sqlite3.connect(str(tmp))
+    try:
+        out.executescript(SCHEMA)
+        chunk_id = 0
+        for rows in batches:
+            chunks, postings = [], []
+            for file_path, symbol, chunk_type, start_line, end_line, code in rows:
+                chunk_id += 1
+                code = code or ""
+                chunks.append(
+                    (chunk_id, file_path, symbol, chunk_type, start_line, end_line, code)
+                )
+                postings.append(
+                    (
+                        chunk_id,
+                        " ".join(split_words(symbol or "")),
+                        " ".join(split_words(f"{file_path} {code}")),
+                    )
+                )
+            out.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?)", chunks)
+            out.executemany(
+                "INSERT INTO chunks_fts (rowid, symbol_words, words) VALUES (?, ?, ?)",
+                postings,
+            )
+        out.execute("INSERT INTO meta VALUES ('signature', ?)", (signature,))
+        out.commit()
+    finally:
+        out.close()
+    os.replace(tmp, path)
+
+
+def build(db: Path, path: Path) -> None:
+    """Build the sidecar at path from the chunks of the DuckDB index db."""
+    import duckdb
+
+    signature = _signature(db)
+    source = duckdb.connect(str(db), read_only=True)
+    try:
+        cursor = source.execute(CHUNKS_SQL)
+
+        def batches():
+            while rows := cursor.fetchmany(1000):
+                yield rows
+
+        write(path, batches(), signature)
+    finally:
+        source.close()
+
+
+class LexicalIndex:
+    """BM25 search over the sidecar of one chunkhound index."""
+
+    def __init__(self, path: Path, repo: Path):
+        self.path = path
+        self.repo = repo
+        self.db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    def search(self, query: str, top_k: int) -> list:
+        """Up to top_k chunks matching any word of query, in the output schema."""
+        words = list(dict.fromkeys(split_words(query)))
+        if not words or top_k <= 0:
+            return []
+        match = " OR ".join(f'"{word}"' for word in words)
+        rows = self.db.execute(
+            "SELECT c.file_path, c.content, -bm25(chunks_fts, ?, ?) AS score,"
+            " c.start_line, c.end_line, c.symbol, c.chunk_type"
+            " FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid"
+            " WHERE chunks_fts MATCH ? ORDER BY bm25(chunks_fts, ?, ?) LIMIT ?",
+            (SYMBOL_WEIGHT, TEXT_WEIGHT, match, SYMBOL_WEIGHT, TEXT_WEIGHT, top_k),
+        ).fetchall()
+        return [
+            {
+                # chunkhound stores paths relative to the indexed directory
+                "file_path": str(self.repo / file_path),
+                "content": content,
+                "similarity": round(score / (score + 1), 6) if score > 0 else 0.0,
+                "start_line": start_line,
+                "end_line": end_line,
+                "symbol": symbol,
+                "chunk_type": chunk_type,
+            }
+            for file_path, content, score, start_line, end_line, symbol, chunk_type in rows
+        ]
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def open_lexical_index(db: Path, repo: Path) -> LexicalIndex:
+    """The lexical index of db, built or rebuilt first when missing or stale."""
+    path = sidecar_path(db)
+    current = None
+    if path.exists():
+        try:
+            meta = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                row = meta.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+            finally:
+                meta.close()
+            current = row[0] if row else None
+        except sqlite3.Error:
+            current = None
+    if current != _signature(db):
+        build(db, path)
+    return LexicalIndex(path, repo)
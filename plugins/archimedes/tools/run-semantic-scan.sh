@@ -24,14 +24,48 @@ export PATH="$HOME/.local/bin:$PATH"
 
 echo "{\"scan_start\":true,\"repo\":\"$REPO\",\"packs\":\"$PACKS\",\"tier\":\"semantic\"}" >&2
 
+# Keep one warm search server for all packs (chunkhound set up and the index
+# opened once per repo); each pack's chunkhound-search.py finds it through
+# ARCHIMEDES_SEARCH_SOCKET. Only when the index is fresh: a missing or stale
+# index is rebuilt by the first pack, which needs the database closed.
+INDEX_DB="$REPO/.archimedes/index/chunkhound.db"
+if [ -f "$INDEX_DB" ] && ! find "$REPO/.archimedes/index/" -name "chunkhound.db" -mtime +7 2>/dev/null | grep -q .; then
+  # In a private directory: a guessable name in /tmp could be taken first
+  SOCKET_DIR=$(mktemp -d)
+  SEARCH_SOCKET="$SOCKET_DIR/search.sock"
+  "$SCRIPT_DIR/chunkhound-search.py" --serve \
+    --socket "$SEARCH_SOCKET" \
+    --repo "$REPO" \
+    --db "$INDEX_DB" &
+  SERVER_PID=$!
+  trap 'kill "$SERVER_PID" 2>/dev/null || true; rm -rf "$SOCKET_DIR"' EXIT
+
+  # The socket appears once setup is done; give up after 30s or if it died
+  for _ in $(seq 300); do
+    [ -S "$SEARCH_SOCKET" ] && break
+    kill -0 "$SERVER_PID" 2>/dev/null || break
+    sleep 0.1
+  done
+  if [ -S "$SEARCH_SOCKET" ]; then
+    export ARCHIMEDES_SEARCH_SOCKET="$SEARCH_SOCKET"
+  else
+    kill "$SERVER_PID" 2>/dev/null || true
+  fi
+fi
+
+# A pack with failed rules still writes its other tags; run the remaining
+# packs and exit 1 at the end
+rc=0
 for pack in $(echo "$PACKS" | tr ',' '\n'); do
   SCAN_SH="$PLUGIN_ROOT/queries/$pack/scan.sh"
   if [ -f "$SCAN_SH" ]; then
     echo "Running semantic pack: $pack" >&2
-    bash "$SCAN_SH" "$REPO" "$SESSION" "$DB_PATH"
+    bash "$SCAN_SH" "$REPO" "$SESSION" "$DB_PATH" || rc=$?
   else
     echo "{\"warning\":\"Semantic pack '$pack' not found at $SCAN_SH\"}" >&2
   fi
 done
 
-echo "{\"ok\":true,\"repo\":\"$REPO\",\"session\":\"$SESSION\",\"tier\":\"semantic\"}"
+OK=$([ "$rc" -eq 0 ] && echo true || echo false)
+echo "{\"ok\":$OK,\"repo\":\"$REPO\",\"session\":\"$SESSION\",\"tier\":\"semantic\"}"
+exit $rc
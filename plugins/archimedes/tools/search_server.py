@@ -0,0 +1,193 @@
+"""
+search_server.py -- warm server transport for chunkhound-search.py.
+
+`chunkhound-search.py --serve` sets chunkhound up once (registry, embedding
+manager, open DuckDB services) and answers search requests until told to
+exit, over a Unix socket (--socket) or stdin/stdout. Requests and responses
+are newline-delimited JSON-RPC 2.0, one per line:
+
+    {"jsonrpc": "2.0", "id": 1, "method": "pack", "params": {"db": "...", "rules": [...]}}
+    {"jsonrpc": "2.0", "id": 1, "result": {"lines": [...], "timings": {...}}}
+
+Methods:
+  ping      -> "pong"
+  search    {db, query, top_k}  -> {"results": [...]}
+  pack      {db, rules, concurrency?}  -> {"lines": [...], "timings": {...}}
+  shutdown  -> "bye"; the server exits after answering
+
+"db" must name the index the server was started for, so a client never gets
+results from another repository's index. A connection may send any number of
+requests; requests on different connections run concurrently.
+
+Clients call request(); it returns None when no server is listening, when
+the socket is not one of the user's own, or when the server does not answer
+within the timeout, so the caller can fall back to searching in-process. The
+socket is created readable by its owner only. Only the standard library is
+used; the module does not import chunkhound.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+CONNECT_TIMEOUT = 0.2
+
+# Seconds request() waits for a response by default
+REQUEST_TIMEOUT = 120.0
+
+# Pack responses carry every rule's results on one line
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class RequestError(Exception):
+    """A request the server refuses; code is a JSON-RPC error code."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def _error(request_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def _encode(response: dict) -> bytes:
+    return json.dumps(response, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+async def dispatch(line: bytes, handlers: dict) -> dict:
+    """Answer one JSON-RPC request line with handlers {method: async fn(params)}."""
+    try:
+        message = json.loads(line)
+    except ValueError as exc:
+        return _error(None, PARSE_ERROR, f"Parse error: {exc}")
+    if not isinstance(message, dict) or not isinstance(message.get("method"), str):
+        return _error(None, INVALID_REQUEST, "Invalid request")
+
+    request_id = message.get("id")
+    method = message["method"]
+    if method == "ping":
+        return {"jsonrpc": "2.0", "id": request_id, "result": "pong"}
+    handler = handlers.get(method)
+    if handler is None:
+        return _error(request_id, METHOD_NOT_FOUND, f"Method not found: {method}")
+    params = message.get("params") or {}
+    if not isinstance(params, dict):
+        return _error(request_id, INVALID_PARAMS, "params must be an object")
+    try:
+        result = await handler(params)
+    except RequestError as exc:
+        return _error(request_id, exc.code, str(exc))
+    except Exception as exc:
+        return _error(request_id, SERVER_ERROR, str(exc))
+    return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+
+async def serve_stdio(handlers: dict, stop: asyncio.Event) -> None:
+    """Answer requests from stdin, one at a time, until EOF or stop is set."""
+    loop = asyncio.get_running_loop()
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    while not stop.is_set():
+        line = await loop.run_in_executor(None, stdin.readline)
+        if not line:
+            break
+        if line.strip():
+            stdout.write(_encode(await dispatch(line, handlers)))
+            stdout.flush()
+
+
+async def serve_socket(path: Path, handlers: dict, stop: asyncio.Event) -> None:
+    """Answer requests on a Unix socket at path until stop is set.
+
+    Each connection is served by its own task. The socket file is removed on
+    exit, including on SIGTERM.
+    """
+    import signal
+
+    if path.exists():
+        if request(path, "ping") is not None:
+            raise OSError(f"A search server is already listening on {path}")
+        path.unlink()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    writer.write(_encode(await dispatch(line, handlers)))
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Shutdown while the client still holds the connection open
+            pass
+        finally:
+            writer.close()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Owner-only from the moment it is bound, not after a later chmod
+    umask = os.umask(0o177)
+    try:
+        server = await asyncio.start_unix_server(handle, path=str(path), limit=STREAM_LIMIT)
+    finally:
+        os.umask(umask)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    print(json.dumps({"info": f"search server listening on {path}"}), file=sys.stderr)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def _owned_socket(path: Path) -> bool:
+    """Whether path is a socket owned by the current user.
+
+    In a shared directory such as /tmp another user could create the socket
+    first and answer in the server's place.
+    """
+    import stat
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def request(
+    path: Path, method: str, params: dict = None, timeout: float = REQUEST_TIMEOUT
+):
+    """Send one request to the server at path and return its response.
+
+    Returns the whole JSON-RPC response (with "result" or "error"), or None
+    when no server of this user is reachable or it does not answer within
+    timeout seconds.
+    """
+    import socket
+
+    if not _owned_socket(path):
+        return None
+
+    message = {"jsonrpc": "2.0", "id": 1, "method": method}
+    if params is not None:
+        message["params"] = params
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(str(path))
+            sock.settimeout(timeout)
+            sock.sendall(_encode(message))
+            with sock.makefile("rb") as f:
+                return json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
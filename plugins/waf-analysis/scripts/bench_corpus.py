@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""Scaling benchmark for waf_query.py and generate_data.py on synthetic corpora.
+
+For each scale factor, writes a synthetic corpus with that many copies of
+every practice and DevOps capability in data/source into a scratch plugin
+directory (with a copy of the scripts), then times a full generate_data.py
+build and every waf_query.py subcommand in fresh interpreters, recording the
+median and minimum wall time and the peak RSS of each.
+
+Copy 0 is the real corpus. Copies 1..N-1 get unique IDs (the first six
+letters of the ID prefix plus a four-letter copy code, so IDs still match
+the schema patterns), related IDs remapped into the same copy, and text in
+which a share of the words is swapped for other corpus words and a few
+copy-specific words are added, so the vocabulary grows with the corpus.
+Every record is validated against data/source/schema.json or the DevOps
+capability schema before anything is timed; missing required fields are
+filled in (empty outcome, no related IDs, title as description, ...) so all
+scales are schema-valid.
+
+Results are written as JSON (--output). Given --baseline, each step is
+compared with the same step at the same scale in an earlier results file
+and the run exits 1 when a median time or peak RSS grew by more than
+--tolerance (and by more than a small absolute floor, to ignore noise).
+
+The daemon and result cache are disabled, so the in-process paths are what
+gets measured.
+
+Usage:
+    python bench_corpus.py                           # 1x, 10x, 100x
+    python bench_corpus.py --scales 1,10,100,1000    # 1000x takes hours and GBs
+    python bench_corpus.py --output baseline.json
+    python bench_corpus.py --baseline baseline.json  # fail on regressions
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+SCRIPT_DIR = Path(__file__).parent
+PLUGIN_DIR = SCRIPT_DIR.parent
+DATA_DIR = PLUGIN_DIR / "data" / "source"
+DEFAULT_OUTPUT = PLUGIN_DIR / "data" / "build" / "bench_corpus.json"
+
+DEFAULT_SCALES = "1,10,100"
+DEFAULT_RUNS = 5
+DEFAULT_TOLERANCE = 0.25
+# Changes smaller than these are noise, whatever the ratio
+TIME_FLOOR_MS = 5.0
+MEMORY_FLOOR_KB = 2048
+
+# Share of words replaced in synthetic copies, and of copy-specific words added
+SWAP_RATE = 0.25
+NOVEL_RATE = 0.02
+SEED = 0
+
+# Steps that need NumPy (semantic vectors); skipped without it
+NUMPY_COMMANDS = ("similar", "semantic", "score")
+
+# Steps timed at every scale: name -> waf_query.py arguments. IDs come from
+# copy 0, which every scale contains.
+COMMANDS = {
+    "index": ["index", "--pillar", "security", "--risk", "HIGH"],
+    "index-facets": ["index", "--lens", "framework,iot", "--facets"],
+    "detail": ["detail", "SEC01-BP01"],
+    "detail-devops": ["detail", "DL.CI.1"],
+    "search": ["search", "encryption at rest"],
+    "search-prefix": ["search", "encr", "--prefix"],
+    "search-fuzzy": ["search", "encrytpion"],
+    "related": ["related", "REL10-BP01", "--depth", "2"],
+    "similar": ["similar", "SEC01-BP01"],
+    "semantic": ["semantic", "retry with exponential backoff"],
+    "devops-index": ["devops-index"],
+    "devops-detail": ["devops-detail", "DL.CI"],
+    "stats": ["stats", "--pillar", "security,reliability"],
+    "sql": [
+        "sql",
+        "SELECT pillar, risk, COUNT(*) FROM practices GROUP BY pillar, risk ORDER BY pillar, risk",
+    ],
+    "score": ["score", "workloads.jsonl"],
+    "batch": ["batch", "batch.jsonl"],
+}
+
+# Input files of the steps above, written next to the scripts at every scale
+INPUTS = {
+    "workloads.jsonl": [
+        {"name": "web", "lenses": ["serverless"], "addressed": ["SEC01-BP01", "REL10-BP01"]},
+        {"name": "data", "lenses": ["data-analytics"], "addressed": ["SEC08-BP02"]},
+    ],
+    "batch.jsonl": [
+        {"cmd": "detail", "id": "SEC01-BP01"},
+        {"cmd": "search", "keyword": "encryption at rest"},
+        {"cmd": "related", "id": "REL10-BP01", "depth": 2},
+        {"cmd": "index", "pillar": "security", "risk": "HIGH"},
+        {"cmd": "stats", "lens": "framework"},
+    ],
+}
+
+PRACTICE_DEFAULTS = {
+    "href": "https://docs.aws.amazon.com/wellarchitected/latest/framework/welcome.html",
+    "outcome": "",
+    "relatedIds": [],
+}
+
+_ID = re.compile(r"^([A-Z]+)(\d.*)$")
+
+
+def copy_code(copy: int) -> str:
+    """Four-letter code of a synthetic copy: 1 -> AAAB."""
+    letters = ""
+    for _ in range(4):
+        copy, digit = divmod(copy, 26)
+        letters = chr(ord("A") + digit) + letters
+    return letters
+
+
+def remap_id(record_id: str, copy: int) -> str:
+    """The ID (or question prefix) of record_id in copy; copy 0 is unchanged."""
+    match = _ID.match(record_id)
+    if copy == 0 or not match:
+        return record_id
+    return f"{match.group(1)[:6]}{copy_code(copy)}{match.group(2)}"
+
+
+class Synthesizer:
+    """Deterministic synthetic copies of practices and capabilities."""
+
+    def __init__(self, vocabulary: list[str], seed: int = SEED) -> None:
+        self.vocabulary = vocabulary
+        self.seed = seed
+
+    def text(self, text: str, rng: random.Random, copy: int) -> str:
+        if copy == 0 or not text:
+            return text
+        words = []
+        for word in text.split(" "):
+            roll = rng.random()
+            if roll < SWAP_RATE:
+                word = rng.choice(self.vocabulary)
+            elif roll < SWAP_RATE + NOVEL_RATE:
+                word = f"{word}{copy_code(copy).lower()}"
+            words.append(word)
+        return " ".join(words)
+
+    def practices(self, practices: list[dict[str, Any]], copy: int) -> list[dict[str, Any]]:
+        rng = random.Random(self.seed * 1_000_003 + copy)
+        records = []
+        for template in practices:
+            p = {**PRACTICE_DEFAULTS, **template}
+            p["id"] = remap_id(p["id"], copy)
+            p["title"] = self.text(p["title"], rng, copy)
+            p["title_full"] = f"{p['id']} {p['title']}"
+            p["description"] = self.text(p.get("description") or p["title"], rng, copy)
+            p["outcome"] = self.text(p["outcome"], rng, copy)
+            p["relatedIds"] = [remap_id(ref, copy) for ref in p["relatedIds"]]
+            records.append(p)
+        return records
+
+    def capability(self, template: dict[str, Any], copy: int) -> dict[str, Any]:
+        rng = random.Random(self.seed * 1_000_003 + copy)
+        cap = dict(template)
+        old = f"{cap['sagaCode']}.{cap['capabilityCode']}"
+        if copy:
+            cap["capabilityCode"] = f"{cap['capabilityCode']}{copy_code(copy)}"
+            cap["capability"] = f"{cap['capability']} {copy_code(copy)}"
+        new = f"{cap['sagaCode']}.{cap['capabilityCode']}"
+        cap["description"] = self.text(cap["description"], rng, copy)
+        for kind in ("indicators", "antiPatterns", "metrics"):
+            items = []
+            for item in cap.get(kind) or []:
+                item = dict(item)
+                if item.get("id", "").startswith(old):
+                    item["id"] = new + item["id"][len(old) :]
+                item["title"] = self.text(item.get("title", ""), rng, copy)
+                item["description"] = self.text(item.get("description", item["title"]), rng, copy)
+                items.append(item)
+            cap[kind] = items
+        return cap
+
+
+def validate(instance: Any, schema: dict[str, Any], path: str = "$") -> list[str]:
+    """Errors of instance against the JSON Schema keywords the corpus schemas use."""
+    types = {
+        "object": dict,
+        "array": list,
+        "string": str,
+        "integer": int,
+        "number": (int, float),
+        "boolean": bool,
+    }
+    expected = schema.get("type")
+    if expected and not isinstance(instance, types[expected]):
+        return [f"{path}: expected {expected}"]
+    errors = []
+    if "enum" in schema and instance not in schema["enum"]:
+        errors.append(f"{path}: {instance!r} not in enum")
+    if isinstance(instance, str):
+        if len(instance) < schema.get("minLength", 0):
+            errors.append(f"{path}: shorter than {schema['minLength']}")
+        if "pattern" in schema and not re.search(schema["pattern"], instance):
+            errors.append(f"{path}: {instance!r} does not match {schema['pattern']}")
+    if isinstance(instance, list):
+        if len(instance) < schema.get("minItems", 0):
+            errors.append(f"{path}: fewer than {schema['minItems']} items")
+        for i, item in enumerate(instance):
+            errors += validate(item, schema.get("items", {}), f"{path}[{i}]")
+    if isinstance(instance, dict):
+        properties = schema.get("properties", {})
+        required = schema.get("required", [])
+        errors += [f"{path}: missing {key}" for key in required if key not in instance]
+        for key, value in instance.items():
+            if key in properties:
+                errors += validate(value, properties[key], f"{path}.{key}")
+            elif schema.get("additionalProperties") is False:
+                errors.append(f"{path}: unexpected {key}")
+    return errors
+
+
+def corpus_vocabulary(source_dir: Path) -> list[str]:
+    """Distinct alphabetic words of every practice title and description."""
+    words = set()
+    for path in sorted(source_dir.rglob("*.json")):
+        if path.name == "schema.json" or "devops" in path.parts:
+            continue
+        for p in json.loads(path.read_text()):
+            for field in ("title", "description"):
+                words.update(w for w in (p.get(field) or "").split() if w.isalpha())
+    return sorted(words)
+
+
+def write_corpus(source_dir: Path, dest_dir: Path, scale: int) -> dict[str, int]:
+    """Write a validated synthetic corpus of scale copies; returns its size."""
+    practice_schema = json.loads((source_dir / "schema.json").read_text())
+    capability_schema = json.loads((source_dir / "lens" / "devops" / "schema.json").read_text())
+    synthesizer = Synthesizer(corpus_vocabulary(source_dir))
+    records = 0
+
+    for path in sorted(source_dir.rglob("*.json")):
+        rel = path.relative_to(source_dir)
+        target = dest_dir / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if path.name == "schema.json":
+            shutil.copyfile(path, target)
+            continue
+        template = json.loads(path.read_text())
+        if "devops" in rel.parts:
+            for copy in range(scale):
+                cap = synthesizer.capability(template, copy)
+                errors = validate(cap, capability_schema)
+                if errors:
+                    sys.exit(f"{rel} copy {copy}: {errors[0]}")
+                name = target.name if copy == 0 else f"{path.stem}-{copy_code(copy).lower()}.json"
+                (target.parent / name).write_text(json.dumps(cap, indent=2))
+                records += 1
+        else:
+            practices = []
+            for copy in range(scale):
+                practices += synthesizer.practices(template, copy)
+            errors = validate(practices, practice_schema)
+            if errors:
+                sys.exit(f"{rel}: {errors[0]}")
+            target.write_text(json.dumps(practices, indent=2))
+            records += len(practices)
+
+    size = sum(p.stat().st_size for p in dest_dir.rglob("*.json"))
+    return {"records": records, "source_bytes": size}
+
+
+def run(argv: list[str], env: dict[str, str], cwd: Path) -> tuple[float, int]:
+    """Wall time (ms) and peak RSS (KB) of one run of argv; exits if it fails."""
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            argv, env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=stderr
+        )
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = (time.perf_counter() - start) * 1000
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode != 0:
+            stderr.seek(0)
+            if process.returncode < 0:
+                reason = f"killed by {signal.Signals(-process.returncode).name}"
+            else:
+                reason = f"exit status {process.returncode}"
+            sys.exit(f"{' '.join(argv)} failed ({reason}):\n{stderr.read().decode()}")
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    peak = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return elapsed, peak
+
+
+def measure(argv: list[str], env: dict[str, str], cwd: Path, runs: int) -> dict[str, float]:
+    times, peaks = [], []
+    for _ in range(runs):
+        elapsed, peak = run(argv, env, cwd)
+        times.append(elapsed)
+        peaks.append(peak)
+    return {
+        "median_ms": round(statistics.median(times), 2),
+        "min_ms": round(min(times), 2),
+        "peak_rss_kb": max(peaks),
+    }
+
+
+def bench_scale(scale: int, args: argparse.Namespace, workdir: Path) -> dict[str, Any]:
+    """Build a corpus at scale in workdir and time generation and every command."""
+    plugin = workdir / f"scale-{scale}"
+    scripts = plugin / "scripts"
+    scripts.mkdir(parents=True)
+    for path in SCRIPT_DIR.glob("*.py"):
+        shutil.copy2(path, scripts / path.name)
+    # Cold starts load bytecode, as in a normal checkout
+    subprocess.run([sys.executable, "-m", "compileall", "-q", str(scripts)], check=True)
+    for name, records in INPUTS.items():
+        (scripts / name).write_text("".join(json.dumps(r) + "\n" for r in records))
+
+    print(f"{scale}x: writing corpus...", flush=True)
+    corpus = write_corpus(DATA_DIR, plugin / "data" / "source", scale)
+    print(f"  {corpus['records']} records, {corpus['source_bytes']} bytes", flush=True)
+
+    env = dict(os.environ, WAF_QUERY_NO_DAEMON="1", WAF_QUERY_NO_CACHE="1")
+    python = sys.executable
+    steps = {}
+    generate = [python, "generate_data.py", "--force", "--jobs", str(args.jobs)]
+    steps["generate"] = measure(generate, env, scripts, args.generate_runs)
+    print(f"  generate: {steps['generate']['median_ms']:.0f} ms", flush=True)
+
+    run([python, "waf_query.py", "detail", "SEC01-BP01"], env, scripts)  # warm the page cache
+    for name in args.commands:
+        steps[name] = measure([python, "waf_query.py", *COMMANDS[name]], env, scripts, args.runs)
+        print(f"  {name}: {steps[name]['median_ms']:.1f} ms", flush=True)
+
+    if not args.keep:
+        shutil.rmtree(plugin)
+    return {**corpus, "steps": steps}
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Print a comparison table; returns the regressions found."""
+    regressions = []
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%}):")
+    print("| Scale | Step | Baseline ms | Current ms | Baseline MB | Current MB | |")
+    print("|:------|:-----|------------:|-----------:|------------:|-----------:|:-|")
+    for scale, current in results["scales"].items():
+        previous = baseline.get("scales", {}).get(scale)
+        if not previous:
+            continue
+        for name, now in current["steps"].items():
+            before = previous["steps"].get(name)
+            if not before:
+                continue
+            slower = (
+                now["median_ms"] > before["median_ms"] * (1 + tolerance)
+                and now["median_ms"] - before["median_ms"] > TIME_FLOOR_MS
+            )
+            bigger = (
+                now["peak_rss_kb"] > before["peak_rss_kb"] * (1 + tolerance)
+                and now["peak_rss_kb"] - before["peak_rss_kb"] > MEMORY_FLOOR_KB
+            )
+            flags = [label for label, hit in (("slower", slower), ("more memory", bigger)) if hit]
+            if flags:
+                regressions.append(f"{scale}x {name}: {', '.join(flags)}")
+            print(
+                f"| {scale}x | {name} | {before['median_ms']:.1f} | {now['median_ms']:.1f} | "
+                f"{before['peak_rss_kb'] / 1024:.1f} | {now['peak_rss_kb'] / 1024:.1f} | "
+                f"{'REGRESSION: ' + ', '.join(flags) if flags else ''} |"
+            )
+    return regressions
+
+
+def scale_list(value: str) -> list[int]:
+    scales = [int(part) for part in value.split(",") if part.strip()]
+    if not scales or min(scales) < 1:
+        raise argparse.ArgumentTypeError(f"scales must be positive integers: {value}")
+    return scales
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scales",
+        type=scale_list,
+        default=scale_list(DEFAULT_SCALES),
+        help=f"Comma-separated copies of the corpus (default: {DEFAULT_SCALES})",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=DEFAULT_RUNS,
+        help=f"Runs per command (default: {DEFAULT_RUNS})",
+    )
+    parser.add_argument(
+        "--generate-runs",
+        type=int,
+        default=1,
+        help="Full generate_data.py builds per scale (default: 1)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="generate_data.py --jobs (default: 1, so peak RSS covers the whole build)",
+    )
+    parser.add_argument(
+        "--commands",
+        type=lambda value: value.split(","),
+        default=list(COMMANDS),
+        help=f"Comma-separated steps to time (default: all of {', '.join(COMMANDS)})",
+    )
+    parser.add_argument(
+        "--output", type=Path, default=DEFAULT_OUTPUT, help="Results JSON path"
+    )
+    parser.add_argument("--baseline", type=Path, help="Earlier results JSON to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f"Allowed growth before a step counts as a regression (default: {DEFAULT_TOLERANCE})",
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the scratch corpora (paths are printed)"
+    )
+    args = parser.parse_args()
+    unknown = sorted(set(args.commands) - set(COMMANDS))
+    if unknown:
+        parser.error(f"unknown steps: {', '.join(unknown)}")
+    if not importlib.util.find_spec("numpy"):
+        print(f"NumPy not installed: skipping {', '.join(NUMPY_COMMANDS)}")
+        args.commands = [name for name in args.commands if name not in NUMPY_COMMANDS]
+
+    results = {
+        "version": 1,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "runs": args.runs,
+        "generate_runs": args.generate_runs,
+        "scales": {},
+    }
+    workdir = Path(tempfile.mkdtemp(prefix="waf-bench-"))
+    try:
+        for scale in args.scales:
+            results["scales"][str(scale)] = bench_scale(scale, args, workdir)
+    finally:
+        if args.keep:
+            print(f"Scratch corpora kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f"\nFAIL: {len(regressions)} regression(s)")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nOK: no regressions")
+
+
+if __name__ == "__main__":
+    main()
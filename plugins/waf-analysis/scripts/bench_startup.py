@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Cold-start benchmark for waf_query.py.
+
+Runs a waf_query.py command in fresh interpreters and fails (exit 1) when its
+median wall time exceeds the budget. Interpreter startup itself is measured
+the same way (`python -c pass`) and reported separately; --budget-ms applies
+to the time waf_query.py adds on top of it, so the check means the same thing
+on fast and slow machines. Use --absolute to budget total wall time instead.
+
+The daemon and the result cache are disabled (WAF_QUERY_NO_DAEMON=1,
+WAF_QUERY_NO_CACHE=1) so the in-process query path is what gets measured;
+--cache measures replaying a cached result instead. --importtime prints the
+slowest imports of one run.
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py --runs 50 --budget-ms 40 -- search "kms encryption"
+    python bench_startup.py --importtime
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPT = Path(__file__).parent / "waf_query.py"
+DEFAULT_COMMAND = ["detail", "SEC01-BP01"]
+DEFAULT_BUDGET_MS = 45.0
+
+
+def time_runs(argv: list[str], runs: int, env: dict[str, str]) -> list[float]:
+    """Wall time in ms of runs fresh invocations of argv."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(argv, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        times.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            sys.exit(f"{' '.join(argv)} failed:\n{result.stderr.decode()}")
+    return times
+
+
+def slowest_imports(argv: list[str], env: dict[str, str], count: int = 15) -> list[str]:
+    """Cumulative -X importtime lines of one run, slowest first."""
+    result = subprocess.run(
+        [argv[0], "-X", "importtime", *argv[1:]],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    lines = [line for line in result.stderr.splitlines() if line.startswith("import time:")]
+    lines = [line for line in lines if line.split("|")[1].strip().isdigit()]
+    lines.sort(key=lambda line: int(line.split("|")[1]), reverse=True)
+    return lines[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for waf_query.py")
+    parser.add_argument("--runs", type=int, default=30, help="Invocations to time (default: 30)")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help=f"Median budget in ms (default: {DEFAULT_BUDGET_MS:g})",
+    )
+    parser.add_argument(
+        "--absolute",
+        action="store_true",
+        help="Apply the budget to total wall time, not time over bare interpreter startup",
+    )
+    parser.add_argument(
+        "--importtime", action="store_true", help="Also print the slowest imports"
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="Time cache hits instead of running the query"
+    )
+    parser.add_argument(
+        "command",
+        nargs="*",
+        default=DEFAULT_COMMAND,
+        help="waf_query.py arguments (default: detail SEC01-BP01)",
+    )
+    args = parser.parse_args()
+
+    env = dict(os.environ, WAF_QUERY_NO_DAEMON="1")
+    if not args.cache:
+        env["WAF_QUERY_NO_CACHE"] = "1"
+    query = [sys.executable, str(SCRIPT), *args.command]
+    baseline = [sys.executable, "-c", "pass"]
+
+    # Warm the page cache before timing anything
+    time_runs(query, 2, env)
+    # Interleave so both series see the same machine load
+    query_times, baseline_times = [], []
+    for _ in range(args.runs):
+        query_times += time_runs(query, 1, env)
+        baseline_times += time_runs(baseline, 1, env)
+
+    median = statistics.median(query_times)
+    interpreter = statistics.median(baseline_times)
+    overhead = median - interpreter
+    measured = median if args.absolute else overhead
+
+    cached = ", cached" if args.cache else ""
+    print(f"waf_query.py {' '.join(args.command)} ({args.runs} runs{cached})")
+    print(f"  median {median:.1f} ms, min {min(query_times):.1f} ms")
+    print(f"  interpreter startup median {interpreter:.1f} ms")
+    print(f"  waf_query.py overhead {overhead:.1f} ms")
+
+    if args.importtime:
+        print("\nSlowest imports (self | cumulative, us):")
+        for line in slowest_imports(query, env):
+            print(f"  {line}")
+
+    label = "total" if args.absolute else "overhead"
+    if measured > args.budget_ms:
+        print(f"\nFAIL: {label} {measured:.1f} ms exceeds budget {args.budget_ms:g} ms")
+        sys.exit(1)
+    print(f"\nOK: {label} {measured:.1f} ms within budget {args.budget_ms:g} ms")
+
+
+if __name__ == "__main__":
+    main()
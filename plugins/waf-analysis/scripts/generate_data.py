@@ -2,21 +2,69 @@
 """Generate markdown data files from source JSON for Claude Code skills.
 
 This script transforms the source JSON files into markdown files optimized
-for progressive disclosure in skills and agents.
+for progressive disclosure in skills and agents, and writes the binary corpus
+snapshot that waf_query.py loads instead of re-parsing the JSON (plus the
+same corpus as a SQLite database for `waf_query.py --backend sqlite`).
+
+Outputs are rebuilt incrementally: data/build/manifest.json records the hash
+of every input of every output and of the output itself, and only outputs
+whose inputs (or generator code) changed, or that were modified since they
+were written, are regenerated. Unchanged files are not rewritten.
+
+Every source file is read once into a shared model; the markdown renders,
+the snapshot sections (search index, related graph, facets, statistics,
+vectors), the ID index and the SQLite database are independent steps that run
+on a process pool. Files are written and progress is printed by the main
+process in a fixed order, so the outputs do not depend on scheduling. A timing
+summary ends the run.
 
 Usage:
     python generate_data.py
+    python generate_data.py --force    # rebuild everything
+    python generate_data.py --jobs 1   # no worker processes
 """
 
+import argparse
+import hashlib
+import importlib.util
 import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
+
+from waf_db import build_database
+from waf_facets import build_facets
+from waf_graph import RelatedGraph, build_graph
+from waf_ids import build_id_index
+from waf_search import build_index
+from waf_snapshot import pack_section, write_snapshot
+from waf_stats import build_stats
 
 # Resolve directories
 SCRIPT_DIR = Path(__file__).parent
 PLUGIN_DIR = SCRIPT_DIR.parent
 DATA_DIR = PLUGIN_DIR / "data" / "source"
 OUTPUT_DIR = PLUGIN_DIR / "data"
+SNAPSHOT_PATH = OUTPUT_DIR / "build" / "corpus.snap"
+ID_INDEX_PATH = OUTPUT_DIR / "build" / "ids.idx"
+DB_PATH = OUTPUT_DIR / "build" / "waf.db"
+MANIFEST_PATH = OUTPUT_DIR / "build" / "manifest.json"
+TOC_PATH = OUTPUT_DIR / "toc.json"
+VECTORS_FILE = "vectors.npy"
+# Per-record shard directories, relative to OUTPUT_DIR
+PRACTICE_SHARD_DIR = "practices"
+CAPABILITY_SHARD_DIR = "capabilities"
+PROJECTION_FILE = "projection.npy"
+
+# Code whose changes invalidate the markdown outputs and the build artifacts
+GENERATOR_CODE = [Path(__file__)]
+BUILD_CODE = GENERATOR_CODE + [
+    SCRIPT_DIR / f"waf_{name}.py"
+    for name in ("db", "facets", "graph", "ids", "search", "snapshot", "stats", "vectors")
+]
 
 PILLAR_CONFIG = {
     "security": {
@@ -159,12 +207,6 @@ DEVOPS_SAGAS = {
 }
 
 
-def load_json(filepath: Path) -> list[dict[str, Any]] | dict[str, Any]:
-    """Load JSON file."""
-    with open(filepath) as f:
-        return json.load(f)
-
-
 def group_by_risk(practices: list[dict[str, Any]]) -> dict[str, list[dict[str, Any]]]:
     """Group practices by risk level."""
     groups = {"HIGH": [], "MEDIUM": [], "LOW": []}
@@ -215,23 +257,40 @@ def generate_pillar_md(
 
     for p in practices:
         lines.append(f"### {p['id']}: {p['title']}")
-        lines.append(f"**Risk:** {p.get('risk', 'N/A')}")
-        lines.append(f"**Areas:** {', '.join(p.get('area', []))}")
-        lines.append("")
-        lines.append(p.get("description", ""))
-        lines.append("")
-        if p.get("outcome"):
-            lines.append(f"**Outcome:** {p['outcome']}")
-            lines.append("")
-        if p.get("relatedIds"):
-            lines.append(f"**Related:** {', '.join(p['relatedIds'])}")
-            lines.append("")
-        lines.append(f"**Docs:** {p.get('href', 'N/A')}")
-        lines.append("")
+        lines.extend(practice_detail_lines(p))
 
     return "\n".join(lines)
 
 
+def practice_detail_lines(
+    practice: dict[str, Any], link: Callable[[str], str | None] | None = None
+) -> list[str]:
+    """Level 2 detail lines of a practice, shared by pillar files and shards.
+
+    link maps a related ID to a markdown link target (None leaves it plain).
+    """
+    p = practice
+    lines = [
+        f"**Risk:** {p.get('risk', 'N/A')}",
+        f"**Areas:** {', '.join(p.get('area', []))}",
+        "",
+        p.get("description", ""),
+        "",
+    ]
+    if p.get("outcome"):
+        lines.append(f"**Outcome:** {p['outcome']}")
+        lines.append("")
+    if p.get("relatedIds"):
+        related = p["relatedIds"]
+        if link:
+            related = [f"[{ref}]({link(ref)})" if link(ref) else ref for ref in related]
+        lines.append(f"**Related:** {', '.join(related)}")
+        lines.append("")
+    lines.append(f"**Docs:** {p.get('href', 'N/A')}")
+    lines.append("")
+    return lines
+
+
 def generate_lens_md(
     lens_key: str, config: dict[str, Any], practices: list[dict[str, Any]]
 ) -> str:
@@ -255,17 +314,18 @@ def generate_lens_md(
         lines.append(f"- [{pillar}](#{pillar.lower().replace('_', '-')})")
     lines.append("")
 
-    # Pillar sections
+    # Pillar sections: one line per practice, linking to its shard
     for pillar, pillar_practices in sorted(by_pillar.items()):
         lines.append(f"## {pillar}")
         lines.append("")
-        lines.append("| ID | Title | Risk |")
-        lines.append("|:---|:------|:-----|")
         for p in sorted(
             pillar_practices,
             key=lambda x: (x.get("risk", "LOW") != "HIGH", x.get("id", "")),
         ):
-            lines.append(f"| {p['id']} | {p['title']} | {p.get('risk', 'N/A')} |")
+            lines.append(
+                f"- [{p['id']}](../{PRACTICE_SHARD_DIR}/{p['id']}.md): "
+                f"{p['title']} ({p.get('risk', 'N/A')})"
+            )
         lines.append("")
 
     return "\n".join(lines)
@@ -292,44 +352,176 @@ def generate_devops_saga_md(
     # Capability details
     for cap in capabilities:
         lines.append(f"## {cap['capability']}")
-        lines.append(f"**Code:** {cap['sagaCode']}.{cap['capabilityCode']}")
+        lines.append(f"**Code:** {capability_code(cap)}")
+        lines.extend(capability_detail_lines(cap, "###"))
+
+    return "\n".join(lines)
+
+
+def capability_code(cap: dict[str, Any]) -> str:
+    """Saga-qualified capability code, e.g. DL.CI."""
+    return f"{cap['sagaCode']}.{cap['capabilityCode']}"
+
+
+def capability_detail_lines(cap: dict[str, Any], heading: str) -> list[str]:
+    """Detail lines of a capability; heading is the markdown level of its tables."""
+    lines = ["", cap.get("description", ""), "", f"**Docs:** {cap.get('href', 'N/A')}", ""]
+
+    # Indicators
+    if cap.get("indicators"):
+        lines.append(f"{heading} Indicators")
+        lines.append("| ID | Title | Category |")
+        lines.append("|:---|:------|:---------|")
+        for ind in cap["indicators"]:
+            cat = ind.get("category", "")
+            lines.append(f"| {ind['id']} | {ind['title']} | {cat} |")
         lines.append("")
-        lines.append(cap.get("description", ""))
+
+    # Anti-patterns
+    if cap.get("antiPatterns"):
+        lines.append(f"{heading} Anti-Patterns")
+        lines.append("| ID | Title |")
+        lines.append("|:---|:------|")
+        for ap in cap["antiPatterns"]:
+            lines.append(f"| {ap['id']} | {ap['title']} |")
         lines.append("")
-        lines.append(f"**Docs:** {cap.get('href', 'N/A')}")
+
+    # Metrics
+    if cap.get("metrics"):
+        lines.append(f"{heading} Metrics")
+        lines.append("| ID | Title |")
+        lines.append("|:---|:------|")
+        for m in cap["metrics"]:
+            lines.append(f"| {m['id']} | {m['title']} |")
         lines.append("")
 
-        # Indicators
-        if cap.get("indicators"):
-            lines.append("### Indicators")
-            lines.append("| ID | Title | Category |")
-            lines.append("|:---|:------|:---------|")
-            for ind in cap["indicators"]:
-                cat = ind.get("category", "")
-                lines.append(f"| {ind['id']} | {ind['title']} | {cat} |")
-            lines.append("")
-
-        # Anti-patterns
-        if cap.get("antiPatterns"):
-            lines.append("### Anti-Patterns")
-            lines.append("| ID | Title |")
-            lines.append("|:---|:------|")
-            for ap in cap["antiPatterns"]:
-                lines.append(f"| {ap['id']} | {ap['title']} |")
-            lines.append("")
-
-        # Metrics
-        if cap.get("metrics"):
-            lines.append("### Metrics")
-            lines.append("| ID | Title |")
-            lines.append("|:---|:------|")
-            for m in cap["metrics"]:
-                lines.append(f"| {m['id']} | {m['title']} |")
-            lines.append("")
+    return lines
 
+
+def generate_practice_shard(
+    practice: dict[str, Any], source: str, link: Callable[[str], str | None]
+) -> str:
+    """Generate the standalone Level 2 markdown for one practice."""
+    lines = [f"# {practice['id']}: {practice['title']}", "", f"**Source:** {source}"]
+    lines.extend(practice_detail_lines(practice, link))
     return "\n".join(lines)
 
 
+def generate_capability_shard(cap: dict[str, Any], saga: dict[str, Any]) -> str:
+    """Generate the standalone markdown for one DevOps capability."""
+    lines = [
+        f"# {capability_code(cap)}: {cap['capability']}",
+        "",
+        f"**Saga:** [{saga['name']}](../devops/{saga['dir']}.md)",
+    ]
+    lines.extend(capability_detail_lines(cap, "##"))
+    return "\n".join(lines)
+
+
+def section_ranges(content: str, level: int) -> list[tuple[list[str], int, int, int]]:
+    """Sections of content headed at a markdown heading level.
+
+    Each section runs up to the next heading at that level or above and is
+    returned as (its lines, start byte, end byte, first line number, 1-based).
+    """
+    sections = []
+    current = None
+    offset = 0
+    lines = content.split("\n")
+    for number, line in enumerate(lines, 1):
+        depth = len(line) - len(line.lstrip("#"))
+        if 0 < depth <= level and line[depth : depth + 1] == " ":
+            if current:
+                sections.append((current[0], current[1], offset, current[2]))
+            current = ([], offset, number) if depth == level else None
+        if current:
+            current[0].append(line)
+        offset += len(line.encode("utf-8")) + (number < len(lines))
+    if current:
+        sections.append((current[0], current[1], offset, current[2]))
+    return sections
+
+
+def generate_shards(
+    practice_groups: list[tuple[str, str, list[dict[str, Any]]]],
+    capability_groups: list[tuple[str, list[dict[str, Any]]]],
+) -> tuple[dict[str, str], dict[str, Any]]:
+    """Render one shard per practice and capability, and the TOC over them.
+
+    Returns ({path relative to OUTPUT_DIR: content}, toc). The TOC maps every
+    ID to its shard and, for framework practices and capabilities, to the
+    byte and line range of its section in the pillar or saga markdown, so a
+    reader can fetch one record without loading the whole file.
+    """
+    shards: dict[str, str] = {}
+    entries: dict[str, list[Any]] = {}
+    files: list[dict[str, Any]] = []
+
+    # First occurrence of an ID wins, as in the snapshot
+    owners: dict[str, tuple[str, str, dict[str, Any]]] = {}
+    for source, pillar, practices in practice_groups:
+        for p in practices:
+            owners.setdefault(p["id"], (source, pillar, p))
+
+    def link(ref: str) -> str | None:
+        return f"{ref}.md" if ref in owners else None
+
+    for practice_id, (source, pillar, p) in owners.items():
+        name = PILLAR_CONFIG[pillar]["name"]
+        if source == "framework":
+            label = f"{name} pillar ([pillars/{pillar}.md](../pillars/{pillar}.md))"
+        else:
+            lens = LENS_CONFIG[source]["name"]
+            label = f"{lens} lens, {name} ([lenses/{source}.md](../lenses/{source}.md))"
+        path = f"{PRACTICE_SHARD_DIR}/{practice_id}.md"
+        shards[path] = generate_practice_shard(p, label, link)
+        entries[practice_id] = [path, None, None, None, None, None]
+
+    def add_file(path: str, content: str) -> int:
+        data = content.encode("utf-8")
+        files.append(
+            {"path": path, "bytes": len(data), "sha1": hashlib.sha1(data).hexdigest()}
+        )
+        return len(files) - 1
+
+    for source, pillar, practices in practice_groups:
+        if source != "framework":
+            continue
+        content = generate_pillar_md(pillar, PILLAR_CONFIG[pillar], practices)
+        file_index = add_file(f"pillars/{pillar}.md", content)
+        for lines, start, end, first in section_ranges(content, 3):
+            entry = entries.get(lines[0][4:].split(":", 1)[0])
+            if entry and entry[1] is None:
+                entry[1:] = [file_index, start, end, first, len(lines)]
+
+    for code, capabilities in capability_groups:
+        saga = DEVOPS_SAGAS[code]
+        content = generate_devops_saga_md(code, saga, capabilities)
+        file_index = add_file(f"devops/{saga['dir']}.md", content)
+        ranges = {
+            lines[1][len("**Code:** ") :]: (start, end, first, len(lines))
+            for lines, start, end, first in section_ranges(content, 2)
+            if len(lines) > 1 and lines[1].startswith("**Code:** ")
+        }
+        for cap in capabilities:
+            cap_code = capability_code(cap)
+            path = f"{CAPABILITY_SHARD_DIR}/{cap_code}.md"
+            shards[path] = generate_capability_shard(cap, saga)
+            if cap_code not in entries:
+                entry = [path, None, None, None, None, None]
+                if cap_code in ranges:
+                    entry[1:] = [file_index, *ranges[cap_code]]
+                entries[cap_code] = entry
+
+    toc = {
+        "version": 1,
+        "fields": ["shard", "file", "start", "end", "line", "lines"],
+        "files": files,
+        "ids": entries,
+    }
+    return shards, toc
+
+
 def generate_index_md() -> str:
     """Generate the main index.md file."""
     lines = []
@@ -387,6 +579,10 @@ def generate_index_md() -> str:
     lines.append(
         "2. **Level 2 (Summary)**: Practice Details sections provide descriptions, outcomes, and areas"
     )
+    lines.append(
+        f"   - For a single record, read `{PRACTICE_SHARD_DIR}/{{ID}}.md` or "
+        f"`{CAPABILITY_SHARD_DIR}/{{CODE}}.md`, or use the line ranges in `toc.json`"
+    )
     lines.append(
         "3. **Level 3 (Full)**: WebFetch the `href` URL for complete AWS documentation"
     )
@@ -433,8 +629,358 @@ def generate_devops_index_md(all_capabilities: list[dict[str, Any]]) -> str:
     return "\n".join(lines)
 
 
+def load_groups(
+    sources: "Sources",
+) -> tuple[list[tuple[str, str, list[dict[str, Any]]]], list[tuple[str, list[dict[str, Any]]]]]:
+    """Practice groups (source, pillar key, practices) and capability groups (saga, capabilities).
+
+    Groups are in snapshot order: framework pillars, then every lens's pillars.
+    """
+    practice_groups = []
+    for key, config in PILLAR_CONFIG.items():
+        filepath = DATA_DIR / config["file"]
+        if filepath.exists():
+            practice_groups.append(("framework", key, sources.json(filepath)))
+
+    for lens_key, lens_config in LENS_CONFIG.items():
+        lens_dir = DATA_DIR / "lens" / lens_config["dir"]
+        for key, config in PILLAR_CONFIG.items():
+            filepath = lens_dir / config["file"]
+            if filepath.exists():
+                practice_groups.append((lens_key, key, sources.json(filepath)))
+
+    capability_groups = []
+    for code, config in DEVOPS_SAGAS.items():
+        saga_dir = DATA_DIR / "lens" / "devops" / config["dir"]
+        if saga_dir.exists():
+            capability_groups.append((code, [sources.json(f) for f in devops_sources(code)]))
+    return practice_groups, capability_groups
+
+
+def generate_vectors(practices: list[dict[str, Any]]) -> dict[str, Any] | None:
+    """Write the semantic vectors (NumPy) used by waf_query.py similar/semantic.
+
+    Returns their metadata, or None when NumPy is not installed.
+    """
+    try:
+        from waf_vectors import write_vectors
+    except ImportError:
+        return None
+    return write_vectors(SNAPSHOT_PATH.parent, practices)
+
+
+def generate_snapshot(
+    sources: "Sources",
+    practice_groups: list[tuple[str, str, list[dict[str, Any]]]],
+    capability_groups: list[tuple[str, list[dict[str, Any]]]],
+    sections: dict[str, bytes],
+) -> dict[str, int]:
+    """Write the corpus snapshot (records plus prebuilt sections) used by waf_query.py."""
+    return write_snapshot(
+        SNAPSHOT_PATH, DATA_DIR, practice_groups, capability_groups, sections, sources.read
+    )
+
+
+class Sources:
+    """Shared model of the inputs: every file is read from disk at most once.
+
+    Raw bytes feed the manifest hashes, the snapshot fingerprint and the ID
+    index; parsed JSON is cached so the markdown renders and the snapshot use
+    the same objects.
+    """
+
+    def __init__(self) -> None:
+        self._bytes: dict[Path, bytes] = {}
+        self._json: dict[Path, Any] = {}
+        self._digests: dict[Path, str] = {}
+
+    def read(self, path: Path) -> bytes:
+        if path not in self._bytes:
+            self._bytes[path] = path.read_bytes()
+        return self._bytes[path]
+
+    def json(self, path: Path) -> Any:
+        if path not in self._json:
+            self._json[path] = json.loads(self.read(path))
+        return self._json[path]
+
+    def digest(self, path: Path) -> str:
+        if path not in self._digests:
+            self._digests[path] = hashlib.sha1(self.read(path)).hexdigest()
+        return self._digests[path]
+
+    def contents(self, paths: list[Path]) -> dict[Path, bytes]:
+        """Bytes of paths, e.g. to hand to a worker process."""
+        return {path: self.read(path) for path in paths}
+
+    def subset(self, paths: list[Path]) -> "Sources":
+        """Sources holding only the bytes of paths, small enough to pickle."""
+        subset = Sources()
+        subset._bytes = self.contents(paths)
+        return subset
+
+
+def _timed(func: Callable[..., Any], *args: Any) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class Task:
+    """One build step, run inline or in a worker process; result() waits for it."""
+
+    def __init__(self, label: str, func: Callable[..., Any], args: tuple, future: Any) -> None:
+        self.label = label
+        self._call = (func, *args)
+        self._future = future
+        self._done = False
+        self.value: Any = None
+        self.seconds = 0.0
+
+    def result(self) -> Any:
+        if not self._done:
+            if self._future is not None:
+                self.value, self.seconds = self._future.result()
+            else:
+                self.value, self.seconds = _timed(*self._call)
+            self._done = True
+        return self.value
+
+
+class Pool:
+    """Run independent build steps on a process pool with deterministic output.
+
+    Steps are submitted in output order; then() queues work for the main
+    process (writing files, printing) that runs in that same order when
+    finish() is called, so files and the log never depend on scheduling.
+    With one job everything runs inline, without worker processes.
+    """
+
+    def __init__(self, jobs: int) -> None:
+        self.jobs = jobs
+        self._executor = ProcessPoolExecutor(jobs) if jobs > 1 else None
+        self.tasks: list[Task] = []
+        self._steps: list[tuple[Callable[..., Any], tuple]] = []
+
+    def submit(self, label: str, func: Callable[..., Any], *args: Any) -> Task:
+        future = self._executor.submit(_timed, func, *args) if self._executor else None
+        task = Task(label, func, args, future)
+        self.tasks.append(task)
+        return task
+
+    def then(self, func: Callable[..., Any], *args: Any) -> None:
+        self._steps.append((func, args))
+
+    def timed(self, label: str, func: Callable[..., Any], *args: Any) -> Any:
+        """Run func in the main process now, recording its time under label."""
+        task = Task(label, func, args, None)
+        self.tasks.append(task)
+        return task.result()
+
+    def finish(self) -> None:
+        try:
+            for func, args in self._steps:
+                func(*args)
+            for task in self.tasks:
+                task.result()
+        finally:
+            if self._executor:
+                self._executor.shutdown(cancel_futures=True)
+
+    def timings(self) -> dict[str, tuple[int, float]]:
+        """(count, seconds) per step label, in first-submission order."""
+        totals: dict[str, tuple[int, float]] = {}
+        for task in self.tasks:
+            count, seconds = totals.get(task.label, (0, 0.0))
+            totals[task.label] = (count + 1, seconds + task.seconds)
+        return totals
+
+
+class Build:
+    """Incremental build state backed by a manifest of input hashes per output.
+
+    The manifest (data/build/manifest.json) records, for each output, the
+    sha1 of every input file, of the generator code that produces it, any
+    extra key (e.g. the Python version for marshalled artifacts) and the
+    sha1 of the output as written. An output is only regenerated when one of
+    those changed or the output is missing or no longer matches what was
+    written (hand-edited, reformatted or checked out), and a regenerated file
+    is only written when its bytes differ, so unchanged outputs keep their
+    mtimes.
+    """
+
+    def __init__(
+        self,
+        sources: Sources,
+        force: bool = False,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.sources = sources
+        self.force = force
+        self.log = log
+        try:
+            self.previous = json.loads(MANIFEST_PATH.read_text()).get("outputs", {})
+        except (OSError, ValueError):
+            self.previous = {}
+        self.manifest: dict[str, Any] = {}
+        self.outputs: dict[str, list[Path]] = {}
+        self.rebuilt: list[str] = []
+        self.skipped: list[str] = []
+
+    def stale(
+        self,
+        outputs: list[Path],
+        inputs: list[Path],
+        code: list[Path] = GENERATOR_CODE,
+        extra: str = "",
+    ) -> bool:
+        """Record the inputs of outputs and tell whether they must be rebuilt."""
+        digest = self.sources.digest
+        name = outputs[0].relative_to(OUTPUT_DIR).as_posix()
+        entry = {
+            "inputs": {p.relative_to(PLUGIN_DIR).as_posix(): digest(p) for p in sorted(inputs)},
+            "code": hashlib.sha1("".join(digest(p) for p in code).encode()).hexdigest(),
+            "extra": extra,
+        }
+        previous = self.previous.get(name) or {}
+        current = output_digests(outputs)
+        self.manifest[name] = {**entry, "outputs": current}
+        self.outputs[name] = outputs
+        if (
+            self.force
+            or {k: v for k, v in previous.items() if k != "outputs"} != entry
+            or previous.get("outputs") != current
+            or not all(p.exists() for p in outputs)
+        ):
+            self.rebuilt.append(name)
+            return True
+        self.skipped.append(name)
+        self.log(f"  {name}: unchanged")
+        return False
+
+    def changes(self, output: Path) -> str:
+        """Describe what made output stale, for the build report."""
+        name = output.relative_to(OUTPUT_DIR).as_posix()
+        old, new = self.previous.get(name), self.manifest[name]
+        if self.force:
+            return "forced"
+        if old is None:
+            return "new"
+        changed = [
+            path
+            for path in new["inputs"].keys() | old["inputs"].keys()
+            if new["inputs"].get(path) != old["inputs"].get(path)
+        ]
+        if changed:
+            shown = ", ".join(sorted(changed)[:3])
+            return shown + (f" and {len(changed) - 3} more" if len(changed) > 3 else "")
+        if new["code"] != old["code"]:
+            return "generator changed"
+        if new["extra"] != old["extra"]:
+            return "settings changed"
+        if None in new["outputs"].values():
+            return "output missing"
+        return "output modified"
+
+    def save(self) -> None:
+        """Record the digests of rebuilt outputs and write the manifest."""
+        for name in self.rebuilt:
+            self.manifest[name]["outputs"] = output_digests(self.outputs[name])
+        MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+        MANIFEST_PATH.write_text(json.dumps({"version": 1, "outputs": self.manifest}, indent=1))
+
+
+def output_digests(paths: list[Path]) -> dict[str, str | None]:
+    """sha1 of each output (of its files' names and bytes for a directory), None if missing."""
+    digests: dict[str, str | None] = {}
+    for path in paths:
+        if path.is_dir():
+            sha = hashlib.sha1()
+            for f in sorted(p for p in path.rglob("*") if p.is_file()):
+                sha.update(f.relative_to(path).as_posix().encode() + b"\0")
+                sha.update(hashlib.sha1(f.read_bytes()).digest())
+            digests[path.relative_to(OUTPUT_DIR).as_posix()] = sha.hexdigest()
+        else:
+            try:
+                digest = hashlib.sha1(path.read_bytes()).hexdigest()
+            except OSError:
+                digest = None
+            digests[path.relative_to(OUTPUT_DIR).as_posix()] = digest
+    return digests
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Write content to path unless it already holds exactly those bytes."""
+    data = content.encode("utf-8")
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    path.write_bytes(data)
+    return True
+
+
+def practice_sources() -> list[Path]:
+    """Every practice JSON file that feeds the snapshot and ID index."""
+    files = [DATA_DIR / config["file"] for config in PILLAR_CONFIG.values()]
+    for lens_config in LENS_CONFIG.values():
+        lens_dir = DATA_DIR / "lens" / lens_config["dir"]
+        files.extend(lens_dir / config["file"] for config in PILLAR_CONFIG.values())
+    return [f for f in files if f.exists()]
+
+
+def devops_sources(saga: str | None = None) -> list[Path]:
+    """DevOps capability JSON files, for one saga code or all of them."""
+    sagas = [DEVOPS_SAGAS[saga]] if saga else DEVOPS_SAGAS.values()
+    files = []
+    for config in sagas:
+        files.extend(sorted((DATA_DIR / "lens" / "devops" / config["dir"]).glob("*.json")))
+    return files
+
+
+def print_timings(pool: Pool, elapsed: float) -> None:
+    """Print the time spent per kind of step, then the wall-clock total."""
+    print(f"\nTimings ({pool.jobs} job{'s' if pool.jobs != 1 else ''}):")
+    busy = 0.0
+    for label, (count, seconds) in pool.timings().items():
+        busy += seconds
+        name = f"{label} ({count})" if count > 1 else label
+        print(f"  {name:<24} {seconds:7.3f}s")
+    print(f"  {'total':<24} {elapsed:7.3f}s wall, {busy:.3f}s in steps")
+
+
 def main():
-    """Generate all markdown data files."""
+    """Generate the markdown data files and query artifacts whose inputs changed."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--force", action="store_true", help="Rebuild every output, ignoring the manifest"
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for independent outputs (default: CPU count; 1 runs inline)",
+    )
+    args = parser.parse_args()
+    started = time.perf_counter()
+
+    pool = Pool(max(1, args.jobs))
+    sources = Sources()
+    build = Build(sources, force=args.force, log=lambda message: pool.then(print, message))
+
+    # Read every input once; everything below works from this shared model
+    all_sources = practice_sources() + devops_sources()
+    pool.timed("hash sources", lambda: [sources.digest(p) for p in all_sources + BUILD_CODE])
+    practice_groups, capability_groups = pool.timed("parse sources", load_groups, sources)
+
+    def finish_md(task: Task, output_path: Path, describe: Callable[[str], str]) -> None:
+        content = task.result()
+        write_if_changed(output_path, content)
+        line_count = len(content.split("\n"))
+        print(f"  {describe(line_count)} ({build.changes(output_path)})")
+
     print("Generating markdown data files...")
 
     # Ensure output directories exist
@@ -443,64 +989,204 @@ def main():
     (OUTPUT_DIR / "devops").mkdir(parents=True, exist_ok=True)
 
     # Generate pillar files
-    print("Generating pillar files...")
+    pool.then(print, "Generating pillar files...")
     for key, config in PILLAR_CONFIG.items():
         filepath = DATA_DIR / config["file"]
-        if filepath.exists():
-            practices = load_json(filepath)
-            content = generate_pillar_md(key, config, practices)
-            output_path = OUTPUT_DIR / "pillars" / f"{key}.md"
-            output_path.write_text(content)
-            line_count = len(content.split("\n"))
-            print(f"  {key}.md: {len(practices)} practices, {line_count} lines")
+        output_path = OUTPUT_DIR / "pillars" / f"{key}.md"
+        if filepath.exists() and build.stale([output_path], [filepath]):
+            practices = sources.json(filepath)
+            task = pool.submit("markdown", generate_pillar_md, key, config, practices)
+            pool.then(
+                finish_md,
+                task,
+                output_path,
+                lambda lines, key=key, n=len(practices): f"{key}.md: {n} practices, {lines} lines",
+            )
 
     # Generate lens files
-    print("Generating lens files...")
+    pool.then(print, "Generating lens files...")
     for key, config in LENS_CONFIG.items():
         lens_dir = DATA_DIR / "lens" / config["dir"]
         if lens_dir.exists():
+            files = sorted(lens_dir.glob("*.json"))
+            output_path = OUTPUT_DIR / "lenses" / f"{key}.md"
+            if not files or not build.stale([output_path], files):
+                continue
             practices = []
-            for f in lens_dir.glob("*.json"):
-                practices.extend(load_json(f))
+            for f in files:
+                practices.extend(sources.json(f))
             if practices:
-                content = generate_lens_md(key, config, practices)
-                output_path = OUTPUT_DIR / "lenses" / f"{key}.md"
-                output_path.write_text(content)
-                line_count = len(content.split("\n"))
-                print(f"  {key}.md: {len(practices)} practices, {line_count} lines")
+                task = pool.submit("markdown", generate_lens_md, key, config, practices)
+                pool.then(
+                    finish_md,
+                    task,
+                    output_path,
+                    lambda lines, key=key, n=len(practices): f"{key}.md: {n} practices, {lines} lines",
+                )
 
     # Generate DevOps files
-    print("Generating DevOps files...")
-    all_capabilities = []
+    pool.then(print, "Generating DevOps files...")
     for code, config in DEVOPS_SAGAS.items():
         saga_dir = DATA_DIR / "lens" / "devops" / config["dir"]
         if saga_dir.exists():
-            capabilities = []
-            for f in saga_dir.glob("*.json"):
-                cap_data = load_json(f)
-                capabilities.append(cap_data)
-                all_capabilities.append(cap_data)
-            if capabilities:
-                content = generate_devops_saga_md(code, config, capabilities)
-                output_path = OUTPUT_DIR / "devops" / f"{config['dir']}.md"
-                output_path.write_text(content)
-                line_count = len(content.split("\n"))
-                print(
-                    f"  {config['dir']}.md: {len(capabilities)} capabilities, {line_count} lines"
-                )
+            files = devops_sources(code)
+            output_path = OUTPUT_DIR / "devops" / f"{config['dir']}.md"
+            if not files or not build.stale([output_path], files):
+                continue
+            capabilities = [sources.json(f) for f in files]
+            task = pool.submit("markdown", generate_devops_saga_md, code, config, capabilities)
+            pool.then(
+                finish_md,
+                task,
+                output_path,
+                lambda lines, name=config["dir"], n=len(capabilities): (
+                    f"{name}.md: {n} capabilities, {lines} lines"
+                ),
+            )
 
     # Generate DevOps index
-    devops_index = generate_devops_index_md(all_capabilities)
-    (OUTPUT_DIR / "devops" / "index.md").write_text(devops_index)
-    print(f"  index.md: overview of {len(all_capabilities)} capabilities")
+    files = devops_sources()
+    output_path = OUTPUT_DIR / "devops" / "index.md"
+    if build.stale([output_path], files):
+        all_capabilities = [sources.json(f) for f in files]
+        task = pool.submit("markdown", generate_devops_index_md, all_capabilities)
+        pool.then(
+            finish_md,
+            task,
+            output_path,
+            lambda lines, n=len(all_capabilities): f"index.md: overview of {n} capabilities",
+        )
 
     # Generate main index
-    print("Generating main index...")
-    index_content = generate_index_md()
-    (OUTPUT_DIR / "index.md").write_text(index_content)
-    print("  index.md: main data index")
+    pool.then(print, "Generating main index...")
+    output_path = OUTPUT_DIR / "index.md"
+    if build.stale([output_path], []):
+        task = pool.submit("markdown", generate_index_md)
+        pool.then(finish_md, task, output_path, lambda lines: "index.md: main data index")
+
+    # Generate per-practice and per-capability shards and their TOC
+    pool.then(print, "Generating shards...")
+    shard_dirs = [OUTPUT_DIR / PRACTICE_SHARD_DIR, OUTPUT_DIR / CAPABILITY_SHARD_DIR]
+    if build.stale([TOC_PATH, *shard_dirs], all_sources):
+        task = pool.submit("shards", generate_shards, practice_groups, capability_groups)
 
-    print("\nDone!")
+        def finish_shards(task: Task) -> None:
+            shards, toc = task.result()
+            written = removed = 0
+            for directory in shard_dirs:
+                directory.mkdir(parents=True, exist_ok=True)
+                for path in directory.glob("*.md"):
+                    if path.relative_to(OUTPUT_DIR).as_posix() not in shards:
+                        path.unlink()
+                        removed += 1
+            for path, content in shards.items():
+                written += write_if_changed(OUTPUT_DIR / path, content)
+            write_if_changed(TOC_PATH, json.dumps(toc, separators=(",", ":")) + "\n")
+            practices = sum(path.startswith(PRACTICE_SHARD_DIR + "/") for path in shards)
+            print(
+                f"  {TOC_PATH.relative_to(OUTPUT_DIR)}: {practices} practice and "
+                f"{len(shards) - practices} capability shards, {written} written, "
+                f"{removed} removed ({build.changes(TOC_PATH)})"
+            )
+
+        pool.then(finish_shards, task)
+
+    # Generate corpus snapshot: each section is an independent step
+    pool.then(print, "Generating corpus snapshot...")
+    outputs = [SNAPSHOT_PATH]
+    if importlib.util.find_spec("numpy"):
+        outputs += [SNAPSHOT_PATH.parent / VECTORS_FILE, SNAPSHOT_PATH.parent / PROJECTION_FILE]
+    extra = f"python {sys.version_info[0]}.{sys.version_info[1]}, {len(outputs)} outputs"
+    if build.stale(outputs, all_sources, BUILD_CODE, extra):
+        practices = [p for _, _, group in practice_groups for p in group]
+        section_tasks = {
+            "search": pool.submit("search index", build_index, practices),
+            "related": pool.submit("related graph", build_graph, practices),
+            "facets": pool.submit("facets", build_facets, practice_groups),
+            "stats": pool.submit("stats", build_stats, practice_groups, capability_groups),
+        }
+        vector_task = pool.submit("semantic vectors", generate_vectors, practices)
+
+        def finish_snapshot() -> None:
+            sections = {name: task.result() for name, task in section_tasks.items()}
+            vectors = vector_task.result()
+            if vectors is not None:
+                sections["vectors"] = pack_section(vectors, {})
+            stats = pool.timed(
+                "snapshot write",
+                generate_snapshot,
+                sources,
+                practice_groups,
+                capability_groups,
+                sections,
+            )
+            print(
+                f"  {SNAPSHOT_PATH.relative_to(OUTPUT_DIR)}: {stats['records']} records, "
+                f"{stats['groups']} groups, {stats['bytes']} bytes ({build.changes(SNAPSHOT_PATH)})"
+            )
+            related = RelatedGraph(sections["related"]).meta
+            print(
+                f"  related graph: {related['edges']} edges, "
+                f"{related['dangling']} unresolved references"
+            )
+            if vectors:
+                print(
+                    f"  build/vectors.npy: {vectors['docs']} x {vectors['dims']} "
+                    f"semantic vectors, {vectors['terms']} terms"
+                )
+            else:
+                print("  build/vectors.npy: skipped (NumPy not installed)")
+
+        pool.then(finish_snapshot)
+
+    if build.stale([ID_INDEX_PATH], all_sources, BUILD_CODE):
+        task = pool.submit(
+            "ID index",
+            build_id_index,
+            ID_INDEX_PATH,
+            DATA_DIR,
+            all_sources,
+            sources.contents(all_sources).__getitem__,
+        )
+
+        def finish_id_index(task: Task) -> None:
+            stats = task.result()
+            print(
+                f"  {ID_INDEX_PATH.relative_to(OUTPUT_DIR)}: {stats['ids']} IDs, "
+                f"{stats['duplicates']} duplicates, {stats['bytes']} bytes "
+                f"({build.changes(ID_INDEX_PATH)})"
+            )
+
+        pool.then(finish_id_index, task)
+
+    if build.stale([DB_PATH], all_sources, BUILD_CODE):
+        task = pool.submit(
+            "SQLite database",
+            build_database,
+            DB_PATH,
+            DATA_DIR,
+            practice_groups,
+            capability_groups,
+            sources.subset(all_sources).read,
+        )
+
+        def finish_database(task: Task) -> None:
+            stats = task.result()
+            print(
+                f"  {DB_PATH.relative_to(OUTPUT_DIR)}: {stats['practices']} practices, "
+                f"{stats['capabilities']} capabilities, {stats['terms']} terms, "
+                f"{stats['bytes']} bytes ({build.changes(DB_PATH)})"
+            )
+
+        pool.then(finish_database, task)
+
+    pool.finish()
+    build.save()
+    print(
+        f"\nDone! Rebuilt {len(build.rebuilt)} of "
+        f"{len(build.rebuilt) + len(build.skipped)} outputs."
+    )
+    print_timings(pool, time.perf_counter() - started)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""On-disk LRU cache of waf_query.py results.
+
+Reviewer agents repeat the same queries across runs and across parallel
+processes. waf_query.py stores the output of every successful in-process
+query here, keyed on its normalized arguments (including --format), and
+replays it the next time the same query is asked against the same corpus.
+
+Each entry is one JSON file holding the full key, the corpus version it was
+computed against and the captured stdout/stderr. The file name is a checksum
+of the key; a lookup only hits when the stored key and version both match,
+so a checksum collision or a changed corpus is a plain miss and the entry is
+overwritten. Entries are written to a temporary file and renamed into place,
+so concurrent readers never see a partial entry and concurrent writers of
+the same key just race to an identical result.
+
+Recency is the entry's mtime, bumped on every hit. After a write, when the
+entries exceed the size limit, the least recently used are deleted until
+they fit in LOW_WATER of it. Hit, miss and eviction counters live in
+stats.json, updated under an exclusive flock. Every operation treats an
+unwritable or vanished cache as a miss, so the cache can never fail a query.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import zlib
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+
+DEFAULT_MAX_BYTES = 32 << 20
+LOW_WATER = 0.8
+
+ENTRY_SUFFIX = ".json"
+STATS_FILE = "stats.json"
+COUNTERS = ("hits", "misses", "evictions")
+
+
+def checksum(text: str) -> str:
+    """64-bit hex checksum of text (crc32 + adler32; zlib is already loaded)."""
+    data = text.encode("utf-8")
+    return f"{zlib.crc32(data):08x}{zlib.adler32(data):08x}"
+
+
+class ResultCache:
+    """Size-bounded LRU store of query results in a directory."""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{checksum(key)}{ENTRY_SUFFIX}")
+
+    def get(self, key: str, version: str) -> dict[str, Any] | None:
+        """The result stored for key at version, or None; counts a hit or a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = json.loads(f.read())
+            if entry.get("key") != key or entry.get("version") != version:
+                entry = None
+            else:
+                os.utime(path)
+        except (OSError, ValueError):
+            entry = None
+        self._count("hits" if entry else "misses")
+        return entry["result"] if entry else None
+
+    def put(self, key: str, version: str, result: dict[str, Any]) -> None:
+        """Store result for key at version, then evict down to the size limit."""
+        path = self._path(key)
+        data = json.dumps({"key": key, "version": version, "result": result})
+        tmp = os.path.join(self.directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, path) of every entry."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(ENTRY_SUFFIX) and entry.name != STATS_FILE:
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes * LOW_WATER:
+                break
+            try:
+                os.unlink(path)
+                evicted += 1
+            except OSError:
+                pass
+            total -= size
+        self._count("evictions", evicted)
+
+    def _update_stats(self, update: Any) -> dict[str, int]:
+        """Apply update(counters) to stats.json under an exclusive lock."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, STATS_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                counters = json.loads(os.read(fd, 4096) or b"{}")
+            except ValueError:
+                counters = {}
+            counters = {name: int(counters.get(name, 0)) for name in COUNTERS}
+            update(counters)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, json.dumps(counters).encode("utf-8"))
+            return counters
+        finally:
+            os.close(fd)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        if amount:
+            try:
+                self._update_stats(lambda counters: counters.update({name: counters[name] + amount}))
+            except OSError:
+                pass
+
+    def stats(self) -> dict[str, Any]:
+        """Entry count and size, the limit, and the hit/miss/eviction counters."""
+        entries = self._entries()
+        try:
+            counters = self._update_stats(lambda counters: None)
+        except OSError:
+            counters = dict.fromkeys(COUNTERS, 0)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "directory": self.directory,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else None,
+        }
+
+    def clear(self) -> dict[str, int]:
+        """Delete every entry and reset the counters; returns what was removed."""
+        removed = removed_bytes = 0
+        for _, size, path in self._entries():
+            try:
+                os.unlink(path)
+                removed += 1
+                removed_bytes += size
+            except OSError:
+                pass
+        try:
+            self._update_stats(lambda counters: counters.update(dict.fromkeys(COUNTERS, 0)))
+        except OSError:
+            pass
+        return {"entries": removed, "bytes": removed_bytes}
@@ -0,0 +1,1488 @@
+#!/usr/bin/env python3
+"""Implementation of the waf_query.py CLI.
+
+waf_query.py is a thin launcher for this module: a script run as __main__ is
+compiled from source on every invocation, while an imported module is loaded
+from cached bytecode, which keeps agent-driven cold starts short. Modules only
+needed by some subcommands (search index, snapshot, daemon server) are
+imported where they are used.
+
+This module holds the shared loaders and the lookups (index, detail, search,
+related, devops-index, devops-detail). The other subcommands live in
+waf_cli_<name>.py modules, imported from the COMMANDS table only when they
+run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import itertools
+import json
+import os
+import sys
+import zlib
+
+import waf_daemon
+import waf_trace
+from waf_ids import IdIndex, open_id_index
+
+# Imported where used, so each subcommand only pays for the modules it needs;
+# typing and pathlib are only imported by type checkers
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Callable, Iterable, Iterator
+
+    from waf_cache import ResultCache
+    from waf_db import Database
+    from waf_facets import FacetIndex
+    from waf_graph import RelatedGraph
+    from waf_search import SearchIndex
+    from waf_snapshot import Snapshot
+
+# Resolve data directory relative to script location
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), "data", "source")
+BUILD_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), "data", "build")
+SNAPSHOT_PATH = os.path.join(BUILD_DIR, "corpus.snap")
+ID_INDEX_PATH = os.path.join(BUILD_DIR, "ids.idx")
+CACHE_DIR = os.path.join(BUILD_DIR, "cache")
+DB_PATH = os.path.join(BUILD_DIR, "waf.db")
+
+PILLAR_FILES = {
+    "security": "security.json",
+    "reliability": "reliability.json",
+    "performance": "performance_efficiency.json",
+    "cost": "cost_optimization.json",
+    "ops": "operational_excellence.json",
+    "sustainability": "sustainability.json",
+}
+
+PILLAR_ENUM_MAP = {
+    "security": "SECURITY",
+    "reliability": "RELIABILITY",
+    "performance": "PERFORMANCE_EFFICIENCY",
+    "cost": "COST_OPTIMIZATION",
+    "ops": "OPERATIONAL_EXCELLENCE",
+    "sustainability": "SUSTAINABILITY",
+}
+
+LENS_DIRS = {
+    "serverless": "serverless",
+    "iot": "iot",
+    "genai": "generative-ai",
+    "data-analytics": "data-analytics",
+    "container": "container-build",
+    "financial": "financial-services",
+    "healthcare": "healthcare",
+    "ml": "machine-learning",
+    "saas": "saas",
+    "sap": "sap",
+    "government": "government",
+    "migration": "migration",
+    "connected-mobility": "connected-mobility",
+    "mergers-acquisitions": "mergers-acquisitions",
+}
+
+DEVOPS_SAGAS = {
+    "DL": "development-lifecycle",
+    "QA": "quality-assurance",
+    "OB": "observability",
+    "AG": "automated-governance",
+    "OA": "organizational-adoption",
+}
+
+DEVOPS_ITEM_KINDS = {
+    "indicators": "indicator",
+    "antiPatterns": "antiPattern",
+    "metrics": "metric",
+}
+
+RISK_LEVELS = ("HIGH", "MEDIUM", "LOW")
+
+# Values of the index lens filter, in output order
+PRACTICE_SOURCES = ("framework", *LENS_DIRS)
+
+# Subcommands that always run in the invoking process (they read its stdin)
+LOCAL_COMMANDS = ("serve", "batch", "score", "cache")
+
+# Record stores: the snapshot (falling back to the source JSON) or waf.db
+BACKENDS = ("snapshot", "sqlite")
+
+
+class QueryError(Exception):
+    """A query that cannot be answered (unknown ID, invalid argument, ...)."""
+
+
+_backend = "snapshot"
+
+# Cached corpus loaders, here and in the subcommand modules (see corpus_loader)
+_loaders: list[Any] = []
+
+
+def set_backend(backend: str) -> None:
+    """Answer later queries from backend, dropping artifacts loaded for another one."""
+    global _backend
+    check_choice("backend", backend, BACKENDS)
+    if backend != _backend:
+        _backend = backend
+        reset_caches()
+
+
+def current_backend() -> str:
+    """The backend queries are answered from (see set_backend)."""
+    return _backend
+
+
+def corpus_loader(loader: Callable[..., Any]) -> Any:
+    """functools.cache for a loader of corpus artifacts; reset_caches() clears it."""
+    cached = functools.cache(loader)
+    _loaders.append(cached)
+    return cached
+
+
+def check_choice(name: str, value: str | None, choices: Any) -> None:
+    """Raise QueryError unless value is None or one of choices."""
+    if value is not None and value not in choices:
+        raise QueryError(f"Invalid {name}: {value!r} (choose from {', '.join(choices)})")
+
+
+def output(
+    args: argparse.Namespace,
+    query: Callable[[], Any],
+    render: Callable[[Any], None],
+    json_view: Callable[[Any], Any] | None = None,
+) -> None:
+    """Run a query and print its result as JSON, NDJSON or markdown per --format.
+
+    NDJSON writes one compact line per list item (or one line for a single
+    record). QueryErrors are reported on stderr with exit status 1.
+    """
+    try:
+        with waf_trace.span("query"):
+            result = query()
+    except QueryError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    with waf_trace.span("render", format=args.format):
+        if args.format == "markdown":
+            render(result)
+            return
+        data = json_view(result) if json_view else result
+        if args.format == "json":
+            print(json.dumps(data, indent=2))
+        else:
+            for record in data if isinstance(data, list) else [data]:
+                print(json.dumps(record))
+
+
+def encode_cursor(query: list[Any], offset: int) -> str:
+    """Opaque cursor resuming query at offset: "<offset>-<query checksum>"."""
+    key = json.dumps(query, sort_keys=True).encode("utf-8")
+    return f"{offset}-{zlib.crc32(key):08x}"
+
+
+def decode_cursor(cursor: str, query: list[Any]) -> int:
+    """Return the offset stored in cursor, checking it was issued for query."""
+    offset, _, checksum = cursor.partition("-")
+    if not offset.isdigit() or encode_cursor(query, int(offset)) != cursor:
+        raise QueryError(f"Invalid cursor for this query: {cursor}")
+    return int(offset)
+
+
+def page_start(args: argparse.Namespace, query: list[Any]) -> int:
+    """Resolve --offset/--cursor to a starting offset, exiting on a bad cursor."""
+    if args.cursor is None:
+        return args.offset
+    try:
+        return decode_cursor(args.cursor, query)
+    except QueryError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+
+def stream(
+    args: argparse.Namespace,
+    rows: Iterable[dict[str, Any]],
+    limit: int | None,
+    next_cursor: Callable[[], str],
+    render_header: Callable[[], None],
+    render_row: Callable[[dict[str, Any]], None],
+) -> None:
+    """Print rows as they are produced, stopping after limit.
+
+    One extra row is read to tell whether another page exists; if so NDJSON
+    ends with a {"cursor": ...} line and markdown with a note carrying the
+    cursor. JSON output stays a plain list.
+    """
+    rows = iter(rows)
+    page = itertools.islice(rows, limit)
+    with waf_trace.span("render", format=args.format) as span:
+        if args.format == "json":
+            page = list(page)
+            span["rows"] = len(page)
+            print(json.dumps(page, indent=2))
+            return
+
+        if args.format == "markdown":
+            render_header()
+        count = 0
+        for row in page:
+            count += 1
+            if args.format == "ndjson":
+                print(json.dumps(row))
+            else:
+                render_row(row)
+        span["rows"] = count
+        if limit and next(rows, None) is not None:
+            if args.format == "ndjson":
+                print(json.dumps({"cursor": next_cursor()}))
+            else:
+                print()
+                print(f"_More results: repeat with `--cursor {next_cursor()}`_")
+
+
+@corpus_loader
+def load_snapshot() -> "Snapshot | None":
+    """Open the prebuilt corpus snapshot, or None if it is missing or stale."""
+    from waf_snapshot import open_snapshot
+
+    with waf_trace.span("load.snapshot") as span:
+        snapshot = open_snapshot(SNAPSHOT_PATH, DATA_DIR)
+        span["used"] = snapshot is not None
+        if snapshot is not None:
+            span["bytes"] = snapshot.nbytes
+    return snapshot
+
+
+@corpus_loader
+def load_database() -> "Database":
+    """Open waf.db, raising QueryError when it is missing or stale."""
+    from waf_db import open_database
+
+    with waf_trace.span("load.database") as span:
+        database = open_database(DB_PATH, DATA_DIR)
+        if database is None:
+            raise QueryError("SQLite database missing or out of date: run generate_data.py")
+        span["bytes"] = database.nbytes
+    return database
+
+
+def load_store() -> "Snapshot | Database | None":
+    """Record store of the current backend; None means parse the source JSON.
+
+    The database offers the snapshot's read interface, so loaders use either.
+    """
+    return load_database() if _backend == "sqlite" else load_snapshot()
+
+
+@corpus_loader
+def load_json(filepath: str) -> Any:
+    """Parse a source JSON file once per process."""
+    with waf_trace.span("load.json", file=os.path.relpath(filepath, DATA_DIR)) as span:
+        with open(filepath, "rb") as f:
+            data = f.read()
+        span["bytes"] = len(data)
+        records = json.loads(data)
+        span["records"] = len(records) if isinstance(records, list) else 1
+    return records
+
+
+def load_pillar_data(pillar: str | None = None) -> list[dict[str, Any]]:
+    """Load practices from pillar JSON files."""
+    store = load_store()
+    if store:
+        with waf_trace.span("load.practices", source="framework", pillar=pillar) as span:
+            practices = store.practices(["framework"], pillar)
+            span["records"] = len(practices)
+        return practices
+
+    practices = []
+    files_to_load = {pillar: PILLAR_FILES[pillar]} if pillar else PILLAR_FILES
+
+    for _, filename in files_to_load.items():
+        filepath = os.path.join(DATA_DIR, filename)
+        if os.path.exists(filepath):
+            practices.extend(load_json(filepath))
+    return practices
+
+
+def load_lens_data(lens: str, pillar: str | None = None) -> list[dict[str, Any]]:
+    """Load practices from lens JSON files."""
+    store = load_store()
+    if store:
+        with waf_trace.span("load.practices", source=lens, pillar=pillar) as span:
+            practices = store.practices([lens], pillar)
+            span["records"] = len(practices)
+        return practices
+
+    practices = []
+    lens_dir = os.path.join(DATA_DIR, "lens", LENS_DIRS.get(lens, lens))
+
+    if not os.path.exists(lens_dir):
+        return []
+
+    pillar_files = (
+        [f"{PILLAR_FILES.get(pillar, pillar + '.json')}"]
+        if pillar
+        else list(PILLAR_FILES.values())
+    )
+
+    for filename in pillar_files:
+        filepath = os.path.join(lens_dir, filename)
+        if os.path.exists(filepath):
+            practices.extend(load_json(filepath))
+    return practices
+
+
+def load_devops_data(saga: str | None = None) -> list[dict[str, Any]]:
+    """Load DevOps capabilities from JSON files."""
+    store = load_store()
+    if store:
+        with waf_trace.span("load.capabilities", saga=saga) as span:
+            capabilities = store.capabilities(saga if saga in DEVOPS_SAGAS else None)
+            span["records"] = len(capabilities)
+        return capabilities
+
+    capabilities = []
+    devops_dir = os.path.join(DATA_DIR, "lens", "devops")
+
+    if not os.path.exists(devops_dir):
+        return []
+
+    saga_dirs = (
+        {saga: DEVOPS_SAGAS[saga]} if saga and saga in DEVOPS_SAGAS else DEVOPS_SAGAS
+    )
+
+    for _, saga_dirname in saga_dirs.items():
+        saga_path = os.path.join(devops_dir, saga_dirname)
+        if os.path.exists(saga_path):
+            for name in sorted(n for n in os.listdir(saga_path) if n.endswith(".json")):
+                capabilities.append(load_json(os.path.join(saga_path, name)))
+    return capabilities
+
+
+@corpus_loader
+def load_facet_index(
+    sources: tuple[str, ...],
+) -> tuple["FacetIndex", list[range] | None, Callable[[int], dict[str, Any]]]:
+    """Return (facet index, document ranges of sources, document -> practice).
+
+    Uses the database's indexes with the sqlite backend and the prebuilt
+    facets in the snapshot when available; otherwise builds them in memory
+    over the practices of sources. Ranges (None in memory) list each
+    source's documents in PRACTICE_SOURCES order.
+    """
+    from waf_facets import FacetIndex, build_facets
+
+    if _backend == "sqlite":
+        from waf_db import DatabaseFacets
+
+        database = load_database()
+        with waf_trace.span("load.facets", backend="sqlite"):
+            ranges = database.ranges("practice", list(sources))
+            return DatabaseFacets(database), ranges, database.record
+
+    snapshot = load_snapshot()
+    if snapshot:
+        section = snapshot.section("facets")
+        if section is not None:
+            with waf_trace.span("load.facets", built=False, bytes=section.nbytes):
+                ranges = snapshot.ranges("practice", list(sources))
+                return FacetIndex(section), ranges, snapshot.record
+
+    groups = []
+    for source in sources:
+        for pillar in PILLAR_FILES:
+            if source == "framework":
+                groups.append((source, pillar, load_pillar_data(pillar)))
+            else:
+                groups.append((source, pillar, load_lens_data(source, pillar)))
+    practices = [p for _, _, group in groups for p in group]
+    with waf_trace.span("load.facets", built=True, records=len(practices)):
+        return FacetIndex(build_facets(groups)), None, practices.__getitem__
+
+
+def filter_values(name: str, value: str | list[str] | None, split: bool = True) -> list[str]:
+    """Normalize a filter given as a list or (comma-separated) string."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(",") if v.strip()] if split else [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise QueryError(f"{name} must be a string or a list of strings")
+    return value
+
+
+def select_practices(
+    pillar: str | list[str] | None = None,
+    lens: str | list[str] | None = None,
+    risk: str | list[str] | None = None,
+    area: str | list[str] | None = None,
+) -> tuple["FacetIndex", int, list[range] | None, Callable[[int], dict[str, Any]]]:
+    """Evaluate index filters; returns (facets, selection, ranges, document -> practice).
+
+    Each filter takes one or more values: values of one filter are ORed,
+    filters are ANDed. Without lens, only framework practices are selected.
+    """
+    filters = {
+        "pillar": filter_values("pillar", pillar),
+        "lens": filter_values("lens", lens) or ["framework"],
+        "risk": [v.upper() for v in filter_values("risk", risk)],
+        "area": filter_values("area", area, split=False),
+    }
+    for value in filters["pillar"]:
+        check_choice("pillar", value, PILLAR_FILES)
+    for value in filters["lens"]:
+        check_choice("lens", value, PRACTICE_SOURCES)
+    for value in filters["risk"]:
+        check_choice("risk", value, RISK_LEVELS)
+
+    sources = tuple(s for s in PRACTICE_SOURCES if s in filters["lens"])
+    facets, ranges, practice_at = load_facet_index(sources)
+    areas = []
+    for value in filters["area"]:
+        canonical = facets.canonical("area", value)
+        if canonical is None:
+            raise QueryError(f"Unknown area: {value!r} (see index --facets for areas)")
+        areas.append(canonical)
+    filters["area"] = areas
+    with waf_trace.span("filter") as span:
+        selection = facets.select(filters)
+        span["selected"] = selection.bit_count()
+    return facets, selection, ranges, practice_at
+
+
+def iter_index(
+    pillar: str | list[str] | None = None,
+    lens: str | list[str] | None = None,
+    risk: str | list[str] | None = None,
+    area: str | list[str] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Return an iterator of practice summaries filtered by pillar, lens, risk and area.
+
+    Arguments are validated before the iterator is returned, so QueryError
+    is raised here rather than part-way through the output.
+    """
+    facets, selection, ranges, practice_at = select_practices(pillar, lens, risk, area)
+    practices = (practice_at(doc) for doc in facets.docs(selection, ranges))
+    return (
+        {
+            "id": p["id"],
+            "title": p["title"],
+            "risk": p.get("risk", ""),
+            "pillar": p.get("pillar", ""),
+            "areas": p.get("area", []),
+        }
+        for p in practices
+    )
+
+
+def query_index(
+    pillar: str | list[str] | None = None,
+    lens: str | list[str] | None = None,
+    risk: str | list[str] | None = None,
+    area: str | list[str] | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+) -> list[dict[str, Any]]:
+    """Return practice summaries, optionally filtered by pillar, lens, risk and area."""
+    rows = iter_index(pillar, lens, risk, area)
+    return list(itertools.islice(rows, offset, None if limit is None else offset + limit))
+
+
+def query_facets(
+    pillar: str | list[str] | None = None,
+    lens: str | list[str] | None = None,
+    risk: str | list[str] | None = None,
+    area: str | list[str] | None = None,
+) -> dict[str, Any]:
+    """Count the practices matching the index filters, per facet value.
+
+    Returns {"total", "facets"}: facets maps pillar, lens, risk and area to
+    {value: count} over the filtered set, most frequent first.
+    """
+    facets, selection, _, _ = select_practices(pillar, lens, risk, area)
+    return {"total": selection.bit_count(), "facets": facets.counts(selection)}
+
+
+def render_facets(result: dict[str, Any]) -> None:
+    """Print a query_facets() result as markdown."""
+    print(f"## Facets ({result['total']} matching practices)")
+    for facet, counts in result["facets"].items():
+        print()
+        print(f"### {facet.title()}")
+        print()
+        print("| Value | Practices |")
+        print("|:------|:----------|")
+        for value, count in counts.items():
+            print(f"| {value} | {count} |")
+
+
+def render_index_header() -> None:
+    print("| ID | Title | Risk | Pillar |")
+    print("|:---|:------|:-----|:-------|")
+
+
+def render_index_row(p: dict[str, Any]) -> None:
+    print(f"| {p['id']} | {p['title']} | {p['risk']} | {p['pillar']} |")
+
+
+def cmd_index(args: argparse.Namespace) -> None:
+    """Output practice index (or facet counts) with filtering."""
+    filters = (args.pillar, args.lens, args.risk, args.area)
+    if args.facets:
+        output(args, lambda: query_facets(*filters), render_facets)
+        return
+
+    query = ["index", *filters]
+    offset = page_start(args, query)
+    try:
+        rows = iter_index(*filters)
+    except QueryError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    stream(
+        args,
+        itertools.islice(rows, offset, None),
+        args.limit,
+        lambda: encode_cursor(query, offset + args.limit),
+        render_index_header,
+        render_index_row,
+    )
+
+
+@corpus_loader
+def load_id_index() -> IdIndex | None:
+    """Open the prebuilt ID index, or None if it is missing."""
+    with waf_trace.span("load.id_index") as span:
+        index = open_id_index(ID_INDEX_PATH, DATA_DIR)
+        span["used"] = index is not None
+        if index is not None:
+            span["bytes"] = index.nbytes
+    return index
+
+
+def find_record(record_id: str) -> tuple[str, dict[str, Any], str | None] | None:
+    """Find a practice, DevOps capability, or indicator/anti-pattern/metric by ID.
+
+    Returns (kind, record, parent capability code) or None. The ID index reads
+    only the matching record from its source file; without it (or if that
+    file changed since generation) the corpus is scanned. The sqlite backend
+    looks the ID up in the database instead.
+    """
+    record_id = record_id.upper()
+    if _backend == "sqlite":
+        with waf_trace.span("lookup", backend="sqlite"):
+            return load_database().find_record(record_id)
+
+    index = load_id_index()
+    if index:
+        entry = index.get(record_id)
+        if entry:
+            with waf_trace.span("read.record", file=entry.file, bytes=entry.end - entry.start):
+                record = index.read(entry)
+            if record is not None:
+                return entry.kind, record, entry.parent
+
+    snapshot = load_snapshot()
+    with waf_trace.span("scan", id=record_id) as span:
+        if snapshot:
+            practice = snapshot.find(record_id)
+        else:
+            # Scan pillars, then lenses, one file at a time until the ID is found
+            groups = (load_pillar_data(pillar) for pillar in PILLAR_FILES)
+            groups = itertools.chain(groups, (load_lens_data(lens) for lens in LENS_DIRS))
+            practice = None
+            scanned = 0
+            for p in (p for group in groups for p in group):
+                scanned += 1
+                if p.get("id") == record_id:
+                    practice = p
+                    break
+            span["records"] = scanned
+        if practice:
+            return "practice", practice, None
+
+        capabilities = load_devops_data()
+        span["capabilities"] = len(capabilities)
+        for capability in capabilities:
+            code = f"{capability['sagaCode']}.{capability['capabilityCode']}"
+            if code.upper() == record_id:
+                return "capability", capability, None
+            for key, kind in DEVOPS_ITEM_KINDS.items():
+                for item in capability.get(key, []):
+                    if item.get("id", "").upper() == record_id:
+                        return kind, item, code
+    return None
+
+
+def print_practice(practice: dict[str, Any]) -> None:
+    """Print a practice as markdown."""
+    print(f"## {practice['id']}: {practice['title']}")
+    print(
+        f"**Risk:** {practice.get('risk', 'N/A')} | **Pillar:** {practice.get('pillar', 'N/A')} | **Lens:** {practice.get('lens', 'FRAMEWORK')}"
+    )
+    print()
+    print(practice.get("description", ""))
+    print()
+    if practice.get("outcome"):
+        print(f"**Desired Outcome:** {practice['outcome']}")
+        print()
+    if practice.get("area"):
+        print(f"**Areas:** {', '.join(practice['area'])}")
+        print()
+    if practice.get("relatedIds"):
+        print(f"**Related Practices:** {', '.join(practice['relatedIds'])}")
+        print()
+    print(f"**Full Documentation:** {practice.get('href', 'N/A')}")
+
+
+def print_devops_item(kind: str, item: dict[str, Any], capability_code: str) -> None:
+    """Print a DevOps indicator, anti-pattern or metric as markdown."""
+    label = {"indicator": "Indicator", "antiPattern": "Anti-Pattern", "metric": "Metric"}
+    print(f"## {item['id']}: {item['title']}")
+    meta = f"**Type:** {label[kind]} | **Capability:** {capability_code}"
+    if item.get("category"):
+        meta += f" | **Category:** {item['category']}"
+    print(meta)
+    print()
+    print(item.get("description", ""))
+    print()
+    if item.get("formula"):
+        print(f"**Formula:** {item['formula']}")
+        print()
+    if item.get("unit"):
+        print(f"**Unit:** {item['unit']}")
+        print()
+    if item.get("href"):
+        print(f"**Documentation:** {item['href']}")
+
+
+def query_detail(record_id: str) -> dict[str, Any]:
+    """Return a practice, capability, or DevOps item by ID.
+
+    DevOps indicators, anti-patterns and metrics carry their "type" and parent
+    "capabilityCode".
+    """
+    found = find_record(record_id)
+    if not found:
+        raise QueryError(f"Practice not found: {record_id.upper()}")
+
+    kind, record, parent = found
+    if parent:
+        record = dict(record, type=kind, capabilityCode=parent)
+    return record
+
+
+def render_detail(record: dict[str, Any]) -> None:
+    """Print a query_detail() result as markdown."""
+    if "type" in record:
+        print_devops_item(record["type"], record, record["capabilityCode"])
+    elif "sagaCode" in record:
+        print_capability(record)
+    else:
+        print_practice(record)
+
+
+def cmd_detail(args: argparse.Namespace) -> None:
+    """Output detailed practice, capability, or DevOps item information."""
+    output(args, lambda: query_detail(args.id), render_detail)
+
+
+@corpus_loader
+def load_search_index(
+    pillar: str | None = None,
+) -> tuple["SearchIndex", list[range] | None, Callable[[int], dict[str, Any]]]:
+    """Return (index, document ranges to search, document -> practice).
+
+    Uses the database's FTS5 index with the sqlite backend and the prebuilt
+    index in the snapshot when available; otherwise builds one in memory
+    over the practices the search covers.
+    """
+    from waf_search import SearchIndex, build_index
+
+    if _backend == "sqlite":
+        from waf_db import FullTextIndex
+
+        database = load_database()
+        with waf_trace.span("load.search_index", backend="sqlite"):
+            ranges = database.ranges("practice", ["framework"] if pillar else None, pillar)
+            return FullTextIndex(database), ranges, database.record
+
+    snapshot = load_snapshot()
+    if snapshot:
+        section = snapshot.section("search")
+        if section is not None:
+            with waf_trace.span("load.search_index", built=False, bytes=section.nbytes):
+                ranges = snapshot.ranges("practice", ["framework"] if pillar else None, pillar)
+                return SearchIndex(section), ranges, snapshot.record
+
+    practices = load_pillar_data(pillar)
+    if not pillar:
+        for lens in LENS_DIRS:
+            practices.extend(load_lens_data(lens))
+    with waf_trace.span("load.search_index", built=True, records=len(practices)):
+        return SearchIndex(build_index(practices)), None, practices.__getitem__
+
+
+def iter_search(
+    keyword: str,
+    pillar: str | None = None,
+    limit: int | None = 20,
+    offset: int = 0,
+    fuzzy: str = "missing",
+    prefix: bool = False,
+    threshold: float | None = None,
+) -> tuple[int, dict[str, list[str]], Iterator[dict[str, Any]]]:
+    """Rank practices for keyword with BM25F full-text search.
+
+    Returns (number of matching practices, expansions, iterator over ranked
+    results from offset). expansions maps each query term that matched other
+    dictionary terms (fuzzy, compound split or prefix) to those terms.
+    Scoring covers every match, but only the best offset + limit are kept,
+    and snippets are built as results are consumed.
+    """
+    from waf_search import FUZZY_MODES, FUZZY_THRESHOLD, highlight
+
+    check_choice("pillar", pillar, PILLAR_FILES)
+    check_choice("fuzzy", fuzzy, FUZZY_MODES)
+    threshold = FUZZY_THRESHOLD if threshold is None else threshold
+    if not 0 < threshold <= 1:
+        raise QueryError(f"threshold must be in (0, 1]: {threshold}")
+    index, ranges, practice_at = load_search_index(pillar)
+    with waf_trace.span("search") as span:
+        terms = index.expand(keyword, fuzzy, prefix, threshold, ranges)
+        total, ranked = index.search(
+            keyword, None if limit is None else offset + limit, ranges, terms
+        )
+        span["matches"] = total
+
+    matched = {term for _, group in terms for term, _ in group}
+    expansions: dict[str, list[str]] = {}
+    for token, group in terms:
+        alternatives = [term for term, _ in group if term != token]
+        if alternatives:
+            expansions.setdefault(token, []).extend(alternatives)
+
+    def results() -> Iterator[dict[str, Any]]:
+        for doc, score in ranked[offset:]:
+            p = practice_at(doc)
+            snippet, positions = highlight(p, keyword, terms=matched)
+            yield {
+                "id": p["id"],
+                "title": p["title"],
+                "risk": p.get("risk", ""),
+                "pillar": p.get("pillar", ""),
+                "score": round(score, 4),
+                "match_context": snippet,
+                "matches": positions,
+            }
+
+    return total, expansions, results()
+
+
+def query_search(
+    keyword: str,
+    pillar: str | None = None,
+    top_k: int = 20,
+    offset: int = 0,
+    fuzzy: str = "missing",
+    prefix: bool = False,
+    threshold: float | None = None,
+) -> dict[str, Any]:
+    """Rank practices for keyword with BM25F full-text search.
+
+    Returns {"keyword", "total", "expansions", "results"}: total counts every
+    matching practice, expansions maps query terms to the other terms they
+    matched, results holds the best top_k (after skipping offset) with score
+    and match positions.
+    """
+    total, expansions, results = iter_search(
+        keyword, pillar, top_k, offset, fuzzy, prefix, threshold
+    )
+    return {
+        "keyword": keyword,
+        "total": total,
+        "expansions": expansions,
+        "results": list(results),
+    }
+
+
+def cmd_search(args: argparse.Namespace) -> None:
+    """Search practices with ranked (BM25F) full-text search."""
+    query = ["search", args.keyword, args.pillar]
+    if args.fuzzy != "missing" or args.prefix or args.threshold is not None:
+        query += [args.fuzzy, args.prefix, args.threshold]
+    offset = page_start(args, query)
+    try:
+        # One extra result tells stream() whether another page exists
+        total, expansions, results = iter_search(
+            args.keyword,
+            args.pillar,
+            args.top_k + 1,
+            offset,
+            args.fuzzy,
+            args.prefix,
+            args.threshold,
+        )
+    except QueryError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+    def render_header() -> None:
+        shown = max(0, min(args.top_k, total - offset))
+        print(f"## Search Results for '{args.keyword}'")
+        print()
+        if offset:
+            print(f"Found {total} matching practices (showing {offset + 1}-{offset + shown})")
+        else:
+            print(f"Found {total} matching practices (showing top {shown})")
+        print()
+        if expansions:
+            matched = "; ".join(
+                f"{term} -> {', '.join(terms)}" for term, terms in expansions.items()
+            )
+            print(f"Also matched: {matched}")
+            print()
+        print("| ID | Title | Risk | Pillar | Score |")
+        print("|:---|:------|:-----|:-------|:------|")
+
+    def render_row(p: dict[str, Any]) -> None:
+        print(f"| {p['id']} | {p['title']} | {p['risk']} | {p['pillar']} | {p['score']:.2f} |")
+
+    stream(
+        args,
+        results,
+        args.top_k,
+        lambda: encode_cursor(query, offset + args.top_k),
+        render_header,
+        render_row,
+    )
+
+
+@corpus_loader
+def load_related_graph() -> tuple[
+    "RelatedGraph", Callable[[str], int | None], Callable[[int], dict[str, Any]]
+]:
+    """Return (graph, practice ID -> node, node -> practice).
+
+    Uses the database's related table with the sqlite backend and the
+    prebuilt graph in the snapshot when available; otherwise builds one in
+    memory over every framework and lens practice.
+    """
+    from waf_graph import RelatedGraph, build_graph
+
+    if _backend == "sqlite":
+        from waf_db import DatabaseGraph
+
+        database = load_database()
+        with waf_trace.span("load.graph", backend="sqlite"):
+            return DatabaseGraph(database), database.index, database.record
+
+    snapshot = load_snapshot()
+    if snapshot:
+        section = snapshot.section("related")
+        if section is not None:
+            with waf_trace.span("load.graph", built=False, bytes=section.nbytes):
+                return RelatedGraph(section), snapshot.index, snapshot.record
+
+    practices = load_pillar_data()
+    for lens in LENS_DIRS:
+        practices.extend(load_lens_data(lens))
+    with waf_trace.span("load.graph", built=True, records=len(practices)):
+        nodes = {}
+        for doc, p in enumerate(practices):
+            nodes.setdefault(p["id"], doc)
+        return RelatedGraph(build_graph(practices)), nodes.get, practices.__getitem__
+
+
+def query_related(record_id: str, depth: int = 1) -> dict[str, Any]:
+    """Return the related-practice neighborhood of a practice.
+
+    Follows relatedIds in both directions (including question-prefix
+    references such as SEC02) up to depth hops. Returns {"id", "depth",
+    "nodes"}; nodes are in breadth-first order, starting with the practice
+    itself at hop 0, each with the practice it was reached from, the edge
+    direction ("out": listed by that practice, "in": lists it, or "both") and
+    the question prefix when the link came only from a prefix reference.
+    """
+    from waf_graph import direction, via_prefixes
+
+    graph, node_of, practice_at = load_related_graph()
+    start = node_of(record_id.upper())
+    if start is None:
+        raise QueryError(f"Practice not found: {record_id.upper()}")
+
+    nodes = []
+    with waf_trace.span("traverse") as span:
+        neighborhood = graph.bfs(start, depth, key=lambda doc: practice_at(doc)["id"])
+        span["nodes"] = len(neighborhood)
+    for n in neighborhood:
+        p = practice_at(n.doc)
+        reached = n.parent is not None
+        parent_id = practice_at(n.parent)["id"] if reached else None
+        nodes.append(
+            {
+                "id": p["id"],
+                "title": p["title"],
+                "risk": p.get("risk", ""),
+                "pillar": p.get("pillar", ""),
+                "lens": p.get("lens", "FRAMEWORK"),
+                "hop": n.hop,
+                "from": parent_id,
+                "direction": direction(n.flags) if reached else None,
+                "via": via_prefixes(n.flags, parent_id, p["id"]) if reached else None,
+            }
+        )
+    return {"id": record_id.upper(), "depth": depth, "nodes": nodes}
+
+
+def render_related(result: dict[str, Any]) -> None:
+    """Print a query_related() result as markdown."""
+    print(f"## Practices related to {result['id']} (depth {result['depth']})")
+    print()
+    print("| Hop | ID | Title | Risk | Lens | Direction | Via | From |")
+    print("|:----|:---|:------|:-----|:-----|:----------|:----|:-----|")
+    for n in result["nodes"]:
+        print(
+            f"| {n['hop']} | {n['id']} | {n['title']} | {n['risk']} | {n['lens']} | "
+            f"{n['direction'] or ''} | {n['via'] or ''} | {n['from'] or ''} |"
+        )
+
+
+def cmd_related(args: argparse.Namespace) -> None:
+    """Output the related-practice neighborhood of a practice."""
+    output(
+        args,
+        lambda: query_related(args.id, args.depth),
+        render_related,
+        json_view=lambda result: result["nodes"],
+    )
+
+
+def query_devops_index(saga: str | None = None) -> list[dict[str, Any]]:
+    """Return DevOps capability summaries, optionally for one saga."""
+    check_choice("saga", saga, DEVOPS_SAGAS)
+    return [
+        {
+            "saga": c["saga"],
+            "sagaCode": c["sagaCode"],
+            "capability": c["capability"],
+            "capabilityCode": c["capabilityCode"],
+            "indicatorCount": len(c.get("indicators", [])),
+            "antiPatternCount": len(c.get("antiPatterns", [])),
+            "metricCount": len(c.get("metrics", [])),
+        }
+        for c in load_devops_data(saga)
+    ]
+
+
+def render_devops_index(capabilities: list[dict[str, Any]]) -> None:
+    """Print DevOps capability summaries as a markdown table."""
+    print("| Saga | Capability | Code | Indicators | Anti-Patterns | Metrics |")
+    print("|:-----|:-----------|:-----|:-----------|:--------------|:--------|")
+    for c in capabilities:
+        code = f"{c['sagaCode']}.{c['capabilityCode']}"
+        print(
+            f"| {c['saga']} | {c['capability']} | {code} | {c['indicatorCount']} | {c['antiPatternCount']} | {c['metricCount']} |"
+        )
+
+
+def cmd_devops_index(args: argparse.Namespace) -> None:
+    """Output DevOps capabilities index."""
+    output(args, lambda: query_devops_index(args.saga), render_devops_index)
+
+
+def print_capability(capability: dict[str, Any]) -> None:
+    """Print a DevOps capability as markdown."""
+    print(f"## {capability['saga']}: {capability['capability']}")
+    print(f"**Code:** {capability['sagaCode']}.{capability['capabilityCode']}")
+    print()
+    print(capability.get("description", ""))
+    print()
+    print(f"**Documentation:** {capability.get('href', 'N/A')}")
+    print()
+
+    # Indicators
+    if capability.get("indicators"):
+        print("### Indicators")
+        for ind in capability["indicators"]:
+            print(f"- **{ind['id']}**: {ind['title']}")
+        print()
+
+    # Anti-Patterns
+    if capability.get("antiPatterns"):
+        print("### Anti-Patterns")
+        for ap in capability["antiPatterns"]:
+            print(f"- **{ap['id']}**: {ap['title']}")
+        print()
+
+    # Metrics
+    if capability.get("metrics"):
+        print("### Metrics")
+        for m in capability["metrics"]:
+            print(f"- **{m['id']}**: {m['title']}")
+
+
+def query_devops_detail(capability_id: str) -> dict[str, Any]:
+    """Return a DevOps capability by code (DL.CI or DL_CI)."""
+    # Parse ID format: DL.CI or DL_CI
+    parts = capability_id.replace("_", ".").split(".")
+    if len(parts) != 2:
+        raise QueryError(
+            f"Invalid capability ID format: {capability_id}. Use SAGA.CAP (e.g., DL.CI)"
+        )
+
+    saga_code, cap_code = parts[0].upper(), parts[1].upper()
+    found = find_record(f"{saga_code}.{cap_code}")
+    if not found or found[0] != "capability":
+        raise QueryError(f"Capability not found: {capability_id}")
+    return found[1]
+
+
+def cmd_devops_detail(args: argparse.Namespace) -> None:
+    """Output detailed DevOps capability information."""
+    output(args, lambda: query_devops_detail(args.id), print_capability)
+
+
+def input_lines(path: str) -> Iterator[str]:
+    """Lines of the file at path ("-" for stdin), closed when exhausted.
+
+    Exits with an error message and status 1 when the file cannot be opened.
+    """
+    if path == "-":
+        return iter(sys.stdin)
+    try:
+        f = open(path)
+    except OSError as e:
+        print(f"error: cannot read {path}: {e.strerror}", file=sys.stderr)
+        sys.exit(1)
+
+    def lines() -> Iterator[str]:
+        with f:
+            yield from f
+
+    return lines()
+
+
+def reset_caches() -> None:
+    """Drop every loaded corpus artifact so the next query reloads from disk."""
+    for loader in _loaders:
+        loader.cache_clear()
+
+
+def corpus_signature() -> tuple[Any, ...]:
+    """Stat-only signature of the source tree and the generated artifacts."""
+    from waf_snapshot import source_signature
+
+    built = []
+    for path in (SNAPSHOT_PATH, ID_INDEX_PATH, DB_PATH):
+        try:
+            st = os.stat(path)
+            built.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            built.append(None)
+    return source_signature(DATA_DIR), tuple(built)
+
+
+def command_name(argv: list[str]) -> str | None:
+    """Return the subcommand in argv without running the argument parser."""
+    args = iter(argv)
+    for arg in args:
+        if arg in ("--format", "-f", "--backend"):
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def result_cache() -> "ResultCache":
+    """The on-disk result cache ($WAF_QUERY_CACHE_DIR, $WAF_QUERY_CACHE_MB)."""
+    from waf_cache import DEFAULT_MAX_BYTES, ResultCache
+
+    directory = os.environ.get("WAF_QUERY_CACHE_DIR") or CACHE_DIR
+    try:
+        max_bytes = int(float(os.environ["WAF_QUERY_CACHE_MB"]) * (1 << 20))
+    except (KeyError, ValueError):
+        max_bytes = DEFAULT_MAX_BYTES
+    return ResultCache(directory, max_bytes)
+
+
+def cache_version() -> str:
+    """Version of the corpus and of this code that cached results depend on."""
+    from waf_cache import checksum
+
+    code = sorted(
+        (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+        for entry in os.scandir(SCRIPT_DIR)
+        if entry.name.endswith(".py")
+    )
+    return checksum(json.dumps([corpus_signature(), code]))
+
+
+class _Tee:
+    """Text stream that passes writes through and keeps a copy."""
+
+    def __init__(self, stream: Any) -> None:
+        self.stream = stream
+        self.parts: list[str] = []
+
+    def write(self, text: str) -> int:
+        self.parts.append(text)
+        return self.stream.write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def getvalue(self) -> str:
+        return "".join(self.parts)
+
+
+def run_cached(args: argparse.Namespace) -> None:
+    """Run a query through the result cache.
+
+    A hit replays the stored output. A miss runs the query, streaming its
+    output as usual, and stores it if the query succeeds; queries that exit
+    (errors, bad cursors) are never cached.
+    """
+    import contextlib
+
+    cache = result_cache()
+    key = json.dumps(
+        {k: v for k, v in vars(args).items() if k not in ("func", "timings")}, sort_keys=True
+    )
+    with waf_trace.span("cache.lookup") as span:
+        version = cache_version()
+        result = cache.get(key, version)
+        span["hit"] = result is not None
+    if result is not None:
+        sys.stdout.write(result["stdout"])
+        sys.stderr.write(result["stderr"])
+        return
+
+    stdout, stderr = _Tee(sys.stdout), _Tee(sys.stderr)
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        args.func(args)
+    with waf_trace.span("cache.store"):
+        cache.put(key, version, {"stdout": stdout.getvalue(), "stderr": stderr.getvalue()})
+
+
+def non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0: {value}")
+    return number
+
+
+def add_page_arguments(parser: argparse.ArgumentParser) -> None:
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument(
+        "--offset", type=non_negative_int, default=0, help="Skip this many results first"
+    )
+    start.add_argument("--cursor", help="Resume where a previous page ended")
+
+
+def comma_list(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def add_index_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--pillar",
+        "-p",
+        type=comma_list,
+        action="extend",
+        help=f"Pillars, comma-separated ({', '.join(PILLAR_FILES)})",
+    )
+    parser.add_argument(
+        "--lens",
+        "-l",
+        type=comma_list,
+        action="extend",
+        help="Lenses, comma-separated; 'framework' selects the framework itself "
+        f"(default: framework) ({', '.join(LENS_DIRS)})",
+    )
+    parser.add_argument(
+        "--risk",
+        "-r",
+        type=comma_list,
+        action="extend",
+        help=f"Risk levels, comma-separated ({', '.join(RISK_LEVELS)})",
+    )
+    parser.add_argument(
+        "--area",
+        "-a",
+        action="append",
+        help="Practice area, case-insensitive; repeat for several (areas may contain commas)",
+    )
+    parser.add_argument(
+        "--facets",
+        action="store_true",
+        help="Output per pillar/lens/risk/area counts for the filtered practices instead",
+    )
+    parser.add_argument(
+        "--limit", "-n", type=non_negative_int, help="Maximum practices to return"
+    )
+    add_page_arguments(parser)
+
+
+def add_detail_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "id",
+        help="Practice ID (e.g., SEC01-BP01), capability (DL.CI), or "
+        "indicator/anti-pattern/metric ID (DL.CI.1, DL.CI-AP1, DL.CI-M1)",
+    )
+
+
+def add_search_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("keyword", help="Search terms (e.g., 'kms encryption')")
+    parser.add_argument("--pillar", "-p", choices=list(PILLAR_FILES.keys()))
+    parser.add_argument(
+        "--top-k",
+        "--limit",
+        "-k",
+        type=non_negative_int,
+        default=20,
+        help="Maximum results to return, best first (default: 20)",
+    )
+    parser.add_argument(
+        "--fuzzy",
+        choices=["off", "missing", "all"],
+        default="missing",
+        help="Match near-miss terms for no terms, terms missing from the index "
+        "(default), or all terms",
+    )
+    parser.add_argument(
+        "--prefix",
+        action="store_true",
+        help="Treat each term as a prefix (autocomplete): 'encr' matches encryption",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        help="Minimum trigram similarity for fuzzy matches, 0-1 (default: 0.4)",
+    )
+    add_page_arguments(parser)
+
+
+def add_related_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("id", help="Practice ID (e.g., SEC01-BP01)")
+    parser.add_argument(
+        "--depth",
+        "-d",
+        type=non_negative_int,
+        default=1,
+        help="Maximum hops to follow (default: 1)",
+    )
+
+
+def add_devops_index_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--saga", "-s", choices=list(DEVOPS_SAGAS.keys()))
+
+
+def add_devops_detail_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("id", help="Capability ID (e.g., DL.CI)")
+
+
+def lazy(module: str, name: str) -> Callable[..., Any]:
+    """Stand-in for module.name that imports module when first called.
+
+    Only the lookups (index, detail, search, related, devops-*) live in this
+    module; every other subcommand's code is in a waf_cli_*.py module of its
+    own, so a cold start only loads the code of the subcommand it runs.
+    """
+
+    def call(*args: Any) -> Any:
+        import importlib
+
+        return getattr(importlib.import_module(module), name)(*args)
+
+    return call
+
+
+# Subcommand -> (help, argument setup, handler)
+COMMANDS: dict[
+    str,
+    tuple[str, Callable[[argparse.ArgumentParser], None], Callable[[argparse.Namespace], None]],
+] = {
+    "index": ("List practices by filter", add_index_arguments, cmd_index),
+    "detail": (
+        "Get practice or DevOps capability/indicator details",
+        add_detail_arguments,
+        cmd_detail,
+    ),
+    "search": ("Ranked full-text search across practices", add_search_arguments, cmd_search),
+    "related": (
+        "Walk related practices (both directions) up to --depth hops",
+        add_related_arguments,
+        cmd_related,
+    ),
+    "similar": (
+        "Semantically similar practices across pillars and lenses",
+        lazy("waf_cli_vectors", "add_similar_arguments"),
+        lazy("waf_cli_vectors", "cmd_similar"),
+    ),
+    "semantic": (
+        "Practices semantically closest to free text",
+        lazy("waf_cli_vectors", "add_semantic_arguments"),
+        lazy("waf_cli_vectors", "cmd_semantic"),
+    ),
+    "devops-index": ("List DevOps capabilities", add_devops_index_arguments, cmd_devops_index),
+    "devops-detail": (
+        "Get DevOps capability details",
+        add_devops_detail_arguments,
+        cmd_devops_detail,
+    ),
+    "stats": (
+        "Corpus-wide counts: pillar x lens x risk, areas, DevOps items per saga",
+        lazy("waf_cli_stats", "add_stats_arguments"),
+        lazy("waf_cli_stats", "cmd_stats"),
+    ),
+    "batch": (
+        "Answer a JSONL stream of queries in one process",
+        lazy("waf_cli_batch", "add_batch_arguments"),
+        lazy("waf_cli_batch", "cmd_batch"),
+    ),
+    "score": (
+        "Risk-score a JSONL stream of workloads by pillar and lens",
+        lazy("waf_cli_score", "add_score_arguments"),
+        lazy("waf_cli_score", "cmd_score"),
+    ),
+    "sql": (
+        "Run a read-only SQL statement against waf.db (no statement: print the schema)",
+        lazy("waf_cli_sql", "add_sql_arguments"),
+        lazy("waf_cli_sql", "cmd_sql"),
+    ),
+    "cache": (
+        "Show or clear the on-disk result cache",
+        lazy("waf_cli_cache", "add_cache_arguments"),
+        lazy("waf_cli_cache", "cmd_cache"),
+    ),
+    "serve": (
+        "Answer queries from a warm corpus over a socket or stdio",
+        lazy("waf_cli_serve", "add_serve_arguments"),
+        lazy("waf_cli_serve", "cmd_serve"),
+    ),
+}
+
+
+def help_formatter(prog: str) -> argparse.HelpFormatter:
+    """argparse's default formatter, sized without importing shutil.
+
+    HelpFormatter imports shutil (and with it bz2, lzma, fnmatch) to read the
+    terminal width whenever no width is given, which is a noticeable share of
+    cold-start time; this reads it the same way directly.
+    """
+    try:
+        columns = int(os.environ["COLUMNS"])
+    except (KeyError, ValueError):
+        try:
+            columns = os.get_terminal_size(sys.__stdout__.fileno()).columns
+        except (AttributeError, ValueError, OSError):
+            columns = 80
+    return argparse.HelpFormatter(prog, width=columns - 2)
+
+
+@functools.cache
+def build_parser(command: str | None = None) -> argparse.ArgumentParser:
+    """Build the CLI parser.
+
+    Every subcommand is registered so help and errors list them all, but
+    only the arguments of command are set up: top-level help and errors
+    never show another subcommand's arguments, and setting them up would
+    import that subcommand's module.
+    """
+    parser = argparse.ArgumentParser(
+        description="Query AWS Well-Architected Framework best practices",
+        formatter_class=help_formatter,
+    )
+    parser.add_argument(
+        "--format",
+        "-f",
+        choices=["json", "ndjson", "markdown"],
+        default="markdown",
+        help="Output format (default: markdown); ndjson streams one JSON object per line",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="snapshot",
+        help="Record store: the snapshot or the SQLite database "
+        "(default: $WAF_QUERY_BACKEND or snapshot)",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print per-phase timing spans to stderr as JSON (also: WAF_QUERY_TRACE=1)",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (help_text, add_arguments, handler) in COMMANDS.items():
+        subparser = subparsers.add_parser(
+            name, help=help_text, formatter_class=help_formatter
+        )
+        if command == name:
+            add_arguments(subparser)
+        subparser.set_defaults(func=handler)
+
+    return parser
+
+
+def run(argv: list[str]) -> None:
+    """Parse argv and run the command in-process."""
+    with waf_trace.span("parse_args"):
+        args = build_parser(command_name(argv)).parse_args(argv)
+    set_backend(args.backend)
+    try:
+        with waf_trace.span("run"):
+            if args.command in LOCAL_COMMANDS or os.environ.get("WAF_QUERY_NO_CACHE"):
+                args.func(args)
+            else:
+                run_cached(args)
+    except BrokenPipeError:
+        # The reader stopped early (e.g. `| head`); that is not an error
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
+
+
+def run_traced(argv: list[str], started: float | None) -> None:
+    """run() under a trace, printed to stderr however the command exits.
+
+    started (when waf_query.py began executing) splits the time before the
+    first span into interpreter startup and module imports.
+    """
+    import time
+
+    process_start = waf_trace.process_start()
+    with waf_trace.tracing(process_start or started) as trace:
+        if started is not None:
+            if process_start is not None:
+                trace.add("startup", process_start, started)
+            trace.add("import", started, time.perf_counter())
+        try:
+            run(argv)
+        finally:
+            waf_trace.emit(trace.report(command=command_name(argv)))
+
+
+def main(started: float | None = None) -> None:
+    argv = sys.argv[1:]
+    if waf_trace.enabled_by_env() and "--timings" not in argv:
+        argv = ["--timings", *argv]
+    backend = os.environ.get("WAF_QUERY_BACKEND")
+    if backend and "--backend" not in argv:
+        argv = ["--backend", backend, *argv]
+    if command_name(argv) not in LOCAL_COMMANDS and not os.environ.get("WAF_QUERY_NO_DAEMON"):
+        path = waf_daemon.default_socket_path(BUILD_DIR)
+        if os.path.exists(path):
+            result = waf_daemon.request(path, argv)
+            if result is not None:
+                sys.stdout.write(result["stdout"])
+                sys.stderr.write(result["stderr"])
+                sys.exit(result["exit"])
+
+    if "--timings" in argv:
+        run_traced(argv, started)
+    else:
+        run(argv)
@@ -0,0 +1,109 @@
+"""batch subcommand of waf_query.py: many queries from a JSONL stream."""
+
+import argparse
+import json
+from typing import Any, Callable
+
+import waf_trace
+from waf_cli import (
+    QueryError,
+    input_lines,
+    query_detail,
+    query_devops_detail,
+    query_devops_index,
+    query_facets,
+    query_index,
+    query_related,
+    query_search,
+)
+from waf_cli_stats import query_stats
+from waf_cli_vectors import query_semantic, query_similar
+
+
+# Batch request name -> (query function, required fields, optional fields)
+BATCH_COMMANDS: dict[str, tuple[Callable[..., Any], tuple[str, ...], tuple[str, ...]]] = {
+    "index": (query_index, (), ("pillar", "lens", "risk", "area", "limit", "offset")),
+    "facets": (query_facets, (), ("pillar", "lens", "risk", "area")),
+    "detail": (query_detail, ("id",), ()),
+    "search": (
+        query_search,
+        ("keyword",),
+        ("pillar", "top_k", "offset", "fuzzy", "prefix", "threshold"),
+    ),
+    "related": (query_related, ("id",), ("depth",)),
+    "similar": (query_similar, ("id",), ("top_k", "pillar", "lens")),
+    "semantic": (query_semantic, ("text",), ("top_k", "pillar", "lens")),
+    "devops-index": (query_devops_index, (), ("saga",)),
+    "devops-detail": (query_devops_detail, ("id",), ()),
+    "stats": (query_stats, (), ("pillar", "lens", "risk", "saga")),
+}
+
+# Request fields that must be strings
+STRING_FIELDS = ("id", "keyword", "text", "pillar", "lens", "risk", "area", "saga", "fuzzy")
+
+# Filter fields that may also be lists of strings, and the commands they may be in
+LIST_FIELDS = ("pillar", "lens", "risk", "area", "saga")
+LIST_COMMANDS = ("index", "facets", "stats", "similar", "semantic")
+
+
+def run_batch_request(request: Any) -> Any:
+    """Answer one batch request object, raising QueryError if it is invalid."""
+    if not isinstance(request, dict):
+        raise QueryError("Request must be a JSON object")
+    command = request.get("cmd")
+    if command not in BATCH_COMMANDS:
+        raise QueryError(
+            f"Unknown cmd: {command!r} (expected one of: {', '.join(BATCH_COMMANDS)})"
+        )
+    query, required, optional = BATCH_COMMANDS[command]
+    missing = [name for name in required if request.get(name) is None]
+    if missing:
+        raise QueryError(f"{command} requires: {', '.join(missing)}")
+    unknown = sorted(set(request) - {"cmd", *required, *optional})
+    if unknown:
+        raise QueryError(f"Unknown fields for {command}: {', '.join(unknown)}")
+    for name in ("top_k", "limit", "offset", "depth"):
+        if name in request and (not isinstance(request[name], int) or request[name] < 0):
+            raise QueryError(f"{name} must be a non-negative integer")
+    if "prefix" in request and not isinstance(request["prefix"], bool):
+        raise QueryError("prefix must be true or false")
+    if "threshold" in request and not isinstance(request["threshold"], (int, float)):
+        raise QueryError("threshold must be a number")
+    for name in STRING_FIELDS:
+        value = request.get(name)
+        if value is None or isinstance(value, str):
+            continue
+        if command in LIST_COMMANDS and name in LIST_FIELDS:
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise QueryError(f"{name} must be a string or a list of strings")
+        else:
+            raise QueryError(f"{name} must be a string")
+    kwargs = {name: request[name] for name in optional if request.get(name) is not None}
+    return query(*(request[name] for name in required), **kwargs)
+
+
+def cmd_batch(args: argparse.Namespace) -> None:
+    """Answer a JSONL stream of requests, one JSONL result per request, in order."""
+    source = input_lines(args.file)
+    for line_number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            command = request.get("cmd") if isinstance(request, dict) else None
+            with waf_trace.span("batch.request", line=line_number, cmd=command):
+                answer = run_batch_request(request)
+            result = {"line": line_number, "ok": True, "result": answer}
+        except ValueError as e:
+            result = {"line": line_number, "ok": False, "error": f"Invalid JSON: {e}"}
+        except QueryError as e:
+            result = {"line": line_number, "ok": False, "error": str(e)}
+        except Exception as e:
+            result = {"line": line_number, "ok": False, "error": f"{type(e).__name__}: {e}"}
+        print(json.dumps(result), flush=True)
+
+
+def add_batch_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "file", nargs="?", default="-", help="JSONL request file (default: stdin)"
+    )
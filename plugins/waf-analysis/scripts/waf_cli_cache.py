@@ -0,0 +1,43 @@
+"""cache subcommand of waf_query.py: result cache statistics and clearing."""
+
+import argparse
+from typing import Any
+
+from waf_cli import output, result_cache
+
+
+def render_cache_stats(stats: dict[str, Any]) -> None:
+    """Print a cache stats result as markdown."""
+    hit_rate = "n/a" if stats["hit_rate"] is None else f"{stats['hit_rate']:.1%}"
+    print("## Result Cache")
+    print()
+    print("| Stat | Value |")
+    print("|:-----|:------|")
+    print(f"| Directory | {stats['directory']} |")
+    print(f"| Entries | {stats['entries']} |")
+    print(f"| Size | {stats['bytes']} of {stats['max_bytes']} bytes |")
+    print(f"| Hits | {stats['hits']} |")
+    print(f"| Misses | {stats['misses']} |")
+    print(f"| Hit rate | {hit_rate} |")
+    print(f"| Evictions | {stats['evictions']} |")
+
+
+def cmd_cache(args: argparse.Namespace) -> None:
+    """Show result cache statistics or clear the cache."""
+    cache = result_cache()
+    if args.action == "stats":
+        output(args, cache.stats, render_cache_stats)
+    else:
+        output(
+            args,
+            cache.clear,
+            lambda removed: print(
+                f"Cleared {removed['entries']} cached results ({removed['bytes']} bytes)"
+            ),
+        )
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "action", choices=["stats", "clear"], help="Show hit/miss statistics or delete every entry"
+    )
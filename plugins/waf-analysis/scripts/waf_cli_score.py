@@ -0,0 +1,266 @@
+"""score subcommand of waf_query.py: workload risk scores (see waf_score.py).
+
+Needs NumPy.
+"""
+
+import argparse
+import itertools
+import json
+import sys
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+import waf_trace
+from waf_cli import (
+    PILLAR_FILES,
+    PRACTICE_SOURCES,
+    RISK_LEVELS,
+    QueryError,
+    check_choice,
+    comma_list,
+    corpus_loader,
+    filter_values,
+    input_lines,
+    load_lens_data,
+    load_pillar_data,
+    non_negative_int,
+)
+
+if TYPE_CHECKING:
+    from waf_score import ScoreModel
+
+# Default weight of each risk level in workload scores
+RISK_WEIGHTS = {"HIGH": 3.0, "MEDIUM": 2.0, "LOW": 1.0}
+
+# Workloads scored per matrix chunk by the score subcommand
+SCORE_CHUNK = 1024
+
+
+@corpus_loader
+def load_score_model(weights: tuple[tuple[str, float], ...]) -> "ScoreModel":
+    """Practice matrices for scoring workloads with the given risk weights."""
+    try:
+        with waf_trace.span("import.numpy"):
+            from waf_score import ScoreModel
+    except ImportError:
+        raise QueryError("score needs NumPy: pip install numpy") from None
+
+    groups = []
+    for source in PRACTICE_SOURCES:
+        for pillar in PILLAR_FILES:
+            if source == "framework":
+                groups.append((source, pillar, load_pillar_data(pillar)))
+            else:
+                groups.append((source, pillar, load_lens_data(source, pillar)))
+    with waf_trace.span("load.score_model") as span:
+        model = ScoreModel(groups, list(PRACTICE_SOURCES), list(PILLAR_FILES), dict(weights))
+        span["practices"] = len(model.practices)
+    return model
+
+
+def parse_workload(request: Any, model: "ScoreModel") -> dict[str, Any]:
+    """Validate a workload: {"name", "lenses", "addressed"}, as an object or JSON text.
+
+    Returns its name, lenses (framework first), the columns of the
+    addressed practices and the addressed IDs that are not practices.
+    """
+    if isinstance(request, str):
+        try:
+            request = json.loads(request)
+        except ValueError as e:
+            raise QueryError(f"Invalid JSON: {e}") from None
+    if not isinstance(request, dict):
+        raise QueryError("Workload must be a JSON object")
+    unknown = sorted(set(request) - {"name", "lenses", "addressed"})
+    if unknown:
+        raise QueryError(f"Unknown workload fields: {', '.join(unknown)}")
+    name = request.get("name")
+    if name is not None and not isinstance(name, str):
+        raise QueryError("name must be a string")
+    lenses = filter_values("lenses", request.get("lenses"))
+    for value in lenses:
+        check_choice("lens", value, PRACTICE_SOURCES)
+    addressed = filter_values("addressed", request.get("addressed"))
+    columns, unknown_ids = [], []
+    for record_id in addressed:
+        column = model.columns.get(record_id.upper())
+        if column is None:
+            unknown_ids.append(record_id)
+        else:
+            columns.append(column)
+    return {
+        "name": name,
+        "lenses": [s for s in PRACTICE_SOURCES if s == "framework" or s in lenses],
+        "columns": columns,
+        "unknownIds": unknown_ids,
+    }
+
+
+def score_value(value: Any) -> float | None:
+    return None if value != value else round(float(value), 4)
+
+
+def iter_scores(
+    requests: Iterable[tuple[int, Any]],
+    weights: dict[str, float] = RISK_WEIGHTS,
+    top: int = 5,
+    summary: dict[str, Any] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Score (line number, workload) pairs, yielding one result per workload in order.
+
+    Workloads are objects or JSON text (see parse_workload).
+
+    Workloads are scored SCORE_CHUNK at a time as matrix products (see
+    waf_score). Invalid workloads yield {"line", "ok": false, "error"}. When
+    summary is given, it is filled in with portfolio totals once the input
+    is exhausted.
+    """
+    import numpy as np
+
+    model = load_score_model(tuple(sorted(weights.items())))
+    sources = model.sources
+    high_gaps = np.zeros(len(model.practices), dtype=np.int64)
+    scored = failed = 0
+    overall_sum = 0.0
+    pillar_sums = np.zeros(len(model.pillars))
+    pillar_counts = np.zeros(len(model.pillars))
+
+    def practice(column: int) -> dict[str, Any]:
+        p = model.practices[column]
+        return {
+            "id": p["id"],
+            "title": p["title"],
+            "pillar": model.pillar_of[column],
+            "lens": model.lens_of[column],
+        }
+
+    requests = iter(requests)
+    while True:
+        chunk = list(itertools.islice(requests, SCORE_CHUNK))
+        if not chunk:
+            break
+        results: list[dict[str, Any] | None] = []
+        workloads = []
+        for line_number, request in chunk:
+            try:
+                workloads.append((line_number, parse_workload(request, model)))
+                results.append(None)
+            except QueryError as e:
+                results.append({"line": line_number, "ok": False, "error": str(e)})
+                failed += 1
+        if workloads:
+            with waf_trace.span("score.chunk", workloads=len(workloads)):
+                lenses = np.zeros((len(workloads), len(sources)), dtype=bool)
+                addressed = np.zeros((len(workloads), len(model.practices)), dtype=bool)
+                for row, (_, workload) in enumerate(workloads):
+                    lenses[row, [sources.index(s) for s in workload["lenses"]]] = True
+                    addressed[row, workload["columns"]] = True
+                scores = model.score(lenses, addressed, top)
+            high_gaps += scores["high_gaps"]
+            valid = ~np.isnan(scores["pillars"])
+            pillar_sums += np.where(valid, scores["pillars"], 0.0).sum(axis=0)
+            pillar_counts += valid.sum(axis=0)
+            overall_sum += float(np.nansum(scores["overall"]))
+            scored += len(workloads)
+
+        row = 0
+        for (line_number, _), result in zip(chunk, results):
+            if result is not None:
+                yield result
+                continue
+            _, workload = workloads[row]
+            yield {
+                "line": line_number,
+                "ok": True,
+                "workload": workload["name"],
+                "lenses": workload["lenses"],
+                "applicable": int(scores["applicable"][row]),
+                "addressed": int(scores["addressed"][row]),
+                "score": score_value(scores["overall"][row]),
+                "pillarScores": {
+                    pillar: score_value(value)
+                    for pillar, value in zip(model.pillars, scores["pillars"][row])
+                },
+                "lensScores": {
+                    lens: score_value(scores["lenses"][row][sources.index(lens)])
+                    for lens in workload["lenses"]
+                },
+                "topUnaddressed": [practice(int(c)) for c in scores["top"][row] if c >= 0],
+                "unknownIds": workload["unknownIds"],
+            }
+            row += 1
+
+    if summary is not None:
+        ranked = np.argsort(-high_gaps, kind="stable")[:top]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pillar_means = pillar_sums / pillar_counts
+        summary.update(
+            {
+                "workloads": scored,
+                "failed": failed,
+                "score": round(overall_sum / scored, 4) if scored else None,
+                "pillarScores": {
+                    pillar: score_value(value) for pillar, value in zip(model.pillars, pillar_means)
+                },
+                "topUnaddressed": [
+                    {**practice(int(c)), "workloads": int(high_gaps[c])}
+                    for c in ranked
+                    if high_gaps[c]
+                ],
+            }
+        )
+
+
+def cmd_score(args: argparse.Namespace) -> None:
+    """Score a JSONL stream of workloads, one JSONL result per workload, in order.
+
+    A final {"portfolio": ...} line carries the averages and the HIGH-risk
+    practices most workloads leave unaddressed.
+    """
+    source = input_lines(args.file)
+
+    summary: dict[str, Any] = {}
+    requests = ((n, line) for n, line in enumerate(source, 1) if line.strip())
+    try:
+        for result in iter_scores(requests, args.weights, args.top, summary):
+            print(json.dumps(result), flush=True)
+    except QueryError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps({"portfolio": summary}), flush=True)
+
+
+def risk_weights(value: str) -> dict[str, float]:
+    weights = dict(RISK_WEIGHTS)
+    for item in comma_list(value):
+        risk, _, weight = item.partition("=")
+        if risk.upper() not in RISK_LEVELS:
+            raise argparse.ArgumentTypeError(f"unknown risk level: {risk}")
+        try:
+            weights[risk.upper()] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight: {item}") from None
+        if weights[risk.upper()] < 0:
+            raise argparse.ArgumentTypeError(f"weight must be >= 0: {item}")
+    return weights
+
+
+def add_score_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "file",
+        nargs="?",
+        default="-",
+        help='JSONL workloads, {"name", "lenses", "addressed": [IDs]} (default: stdin)',
+    )
+    parser.add_argument(
+        "--weights",
+        type=risk_weights,
+        default=RISK_WEIGHTS,
+        help="Risk weights, e.g. HIGH=5,LOW=0; unlisted levels keep their default "
+        "(HIGH=3,MEDIUM=2,LOW=1)",
+    )
+    parser.add_argument(
+        "--top",
+        type=non_negative_int,
+        default=5,
+        help="Unaddressed HIGH-risk practices listed per workload and portfolio (default: 5)",
+    )
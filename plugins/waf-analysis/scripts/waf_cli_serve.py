@@ -0,0 +1,132 @@
+"""serve subcommand of waf_query.py: the query daemon (see waf_daemon.py)."""
+
+import argparse
+import sys
+from typing import Any
+
+import waf_daemon
+import waf_trace
+from waf_cli import (
+    BUILD_DIR,
+    LENS_DIRS,
+    LOCAL_COMMANDS,
+    QueryError,
+    build_parser,
+    command_name,
+    corpus_signature,
+    load_devops_data,
+    load_facet_index,
+    load_id_index,
+    load_lens_data,
+    load_search_index,
+    load_store,
+    reset_caches,
+    set_backend,
+)
+from waf_cli_vectors import load_vector_index
+
+# How often (seconds) a running daemon checks whether the corpus changed
+RELOAD_INTERVAL = 1.0
+
+
+def run_command(argv: list[str]) -> dict[str, Any]:
+    """Run one CLI invocation in-process, capturing its output and exit status.
+
+    With --timings the result also carries the trace report under "trace".
+    """
+    import contextlib
+    import io
+    import traceback
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    code = 0
+    report = None
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            args = build_parser(command_name(argv)).parse_args(argv)
+            if args.command in LOCAL_COMMANDS:
+                build_parser(args.command).error(
+                    f"{args.command} cannot be run through the daemon"
+                )
+            set_backend(args.backend)
+            if args.timings:
+                with waf_trace.tracing() as trace:
+                    try:
+                        args.func(args)
+                    finally:
+                        report = trace.report(command=args.command, daemon=True)
+                        waf_trace.emit(report)
+            else:
+                args.func(args)
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            if isinstance(e.code, str):
+                print(e.code, file=sys.stderr)
+        except Exception:
+            traceback.print_exc()
+            code = 1
+    result = {"exit": code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+    if report is not None:
+        result["trace"] = report
+    return result
+
+
+def cmd_serve(args: argparse.Namespace) -> None:
+    """Serve queries from a warm in-memory corpus until interrupted."""
+    import time
+
+    signature = corpus_signature()
+    checked = time.monotonic()
+
+    def handle(argv: list[str]) -> dict[str, Any]:
+        nonlocal signature, checked
+        now = time.monotonic()
+        if now - checked >= RELOAD_INTERVAL:
+            checked = now
+            current = corpus_signature()
+            if current != signature:
+                signature = current
+                reset_caches()
+        return run_command(argv)
+
+    # Warm the caches before the first request arrives
+    try:
+        store = load_store()
+    except QueryError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    load_id_index()
+    if store is None:
+        for lens in LENS_DIRS:
+            load_lens_data(lens)
+        load_devops_data()
+    load_search_index(None)
+    load_facet_index(("framework",))
+    try:
+        load_vector_index()
+    except QueryError:
+        pass
+
+    if args.stdio:
+        waf_daemon.serve_stdio(handle)
+    else:
+        if args.socket:
+            path = args.socket
+        else:
+            path = waf_daemon.default_socket_path(BUILD_DIR)
+        try:
+            waf_daemon.serve_socket(path, handle)
+        except OSError as e:
+            print(str(e), file=sys.stderr)
+            sys.exit(1)
+
+
+def add_serve_arguments(parser: argparse.ArgumentParser) -> None:
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument(
+        "--socket",
+        help="Unix socket path (default: $WAF_QUERY_SOCKET or a per-user, per-checkout temp path)",
+    )
+    target.add_argument(
+        "--stdio", action="store_true", help="Read JSON-RPC requests from stdin instead"
+    )
@@ -0,0 +1,98 @@
+"""sql subcommand of waf_query.py: read-only statements against waf.db."""
+
+import argparse
+import itertools
+import sys
+from typing import Any, Iterator
+
+from waf_cli import (
+    QueryError,
+    add_page_arguments,
+    encode_cursor,
+    load_database,
+    non_negative_int,
+    output,
+    page_start,
+    stream,
+)
+
+
+def iter_sql(statement: str) -> Iterator[dict[str, Any]]:
+    """Rows of a read-only statement against waf.db as column -> value dicts.
+
+    Raises QueryError for statements that fail or try to write. Errors while
+    fetching (including the timeout) end the rows with a QueryError too.
+    """
+    import sqlite3
+
+    database = load_database()
+    try:
+        cursor = database.query(statement)
+    except (sqlite3.Error, sqlite3.Warning) as e:
+        raise QueryError(f"SQL error: {e}") from None
+    columns = [c[0] for c in cursor.description or ()]
+
+    def rows() -> Iterator[dict[str, Any]]:
+        try:
+            for row in cursor:
+                yield {
+                    column: value.hex() if isinstance(value, bytes) else value
+                    for column, value in zip(columns, row)
+                }
+        except sqlite3.Error as e:
+            raise QueryError(f"SQL error: {e}") from None
+
+    return rows()
+
+
+def render_sql_cell(value: Any) -> str:
+    return "" if value is None else str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def cmd_sql(args: argparse.Namespace) -> None:
+    """Print the database schema, or the rows of a read-only statement."""
+    if args.statement is None:
+        output(
+            args,
+            lambda: load_database().schema(),
+            lambda schema: print(";\n\n".join(schema) + ";"),
+        )
+        return
+
+    query = ["sql", args.statement]
+    offset = page_start(args, query)
+    try:
+        rows = iter_sql(args.statement)
+        first = next(rows, None)
+    except QueryError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    columns = list(first) if first else []
+
+    def render_header() -> None:
+        if columns:
+            print("| " + " | ".join(columns) + " |")
+            print("|" + "|".join(":---" for _ in columns) + "|")
+
+    def render_row(row: dict[str, Any]) -> None:
+        print("| " + " | ".join(render_sql_cell(v) for v in row.values()) + " |")
+
+    try:
+        stream(
+            args,
+            itertools.islice(itertools.chain([first] if first else [], rows), offset, None),
+            args.limit,
+            lambda: encode_cursor(query, offset + args.limit),
+            render_header,
+            render_row,
+        )
+    except QueryError as e:
+        sys.stdout.flush()
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+
+def add_sql_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("statement", nargs="?", help="SELECT statement (or a read-only pragma)")
+    parser.add_argument("--limit", "-n", type=non_negative_int, help="Maximum rows to return")
+    add_page_arguments(parser)
@@ -0,0 +1,181 @@
+"""stats subcommand of waf_query.py: corpus-wide counts (see waf_stats.py)."""
+
+import argparse
+from typing import Any
+
+import waf_trace
+from waf_cli import (
+    DEVOPS_SAGAS,
+    LENS_DIRS,
+    PILLAR_FILES,
+    PRACTICE_SOURCES,
+    RISK_LEVELS,
+    check_choice,
+    comma_list,
+    corpus_loader,
+    current_backend,
+    filter_values,
+    load_database,
+    load_devops_data,
+    load_lens_data,
+    load_pillar_data,
+    load_snapshot,
+    output,
+)
+
+
+@corpus_loader
+def load_stats() -> dict[str, Any]:
+    """Return the corpus statistics (see waf_stats.aggregate).
+
+    Uses the aggregates stored in the database with the sqlite backend or in
+    the snapshot when available; otherwise counts the loaded corpus.
+    """
+    from waf_stats import aggregate, unpack_stats
+
+    if current_backend() == "sqlite":
+        with waf_trace.span("load.stats", backend="sqlite"):
+            return load_database().stats()
+
+    snapshot = load_snapshot()
+    section = snapshot.section("stats") if snapshot else None
+    if section is not None:
+        with waf_trace.span("load.stats", built=False, bytes=section.nbytes):
+            return unpack_stats(section)
+
+    practice_groups = []
+    for source in PRACTICE_SOURCES:
+        for pillar in PILLAR_FILES:
+            if source == "framework":
+                practice_groups.append((source, pillar, load_pillar_data(pillar)))
+            else:
+                practice_groups.append((source, pillar, load_lens_data(source, pillar)))
+    capability_groups = [(saga, load_devops_data(saga)) for saga in DEVOPS_SAGAS]
+    with waf_trace.span("load.stats", built=True):
+        return aggregate(practice_groups, capability_groups)
+
+
+def query_stats(
+    pillar: str | list[str] | None = None,
+    lens: str | list[str] | None = None,
+    risk: str | list[str] | None = None,
+    saga: str | list[str] | None = None,
+) -> dict[str, Any]:
+    """Corpus-wide counts, optionally narrowed by pillar, lens, risk and saga.
+
+    Unlike index, every lens is counted unless lens is given. Returns
+    {"practices", "withRelated", "risk", "crosstab", "areas", "devops"}:
+    crosstab has one row per pillar and lens with per-risk counts, areas
+    maps each area to its practice count, most frequent first.
+    """
+    from waf_stats import summarize
+
+    filters = {
+        "pillar": filter_values("pillar", pillar),
+        "lens": filter_values("lens", lens),
+        "risk": [v.upper() for v in filter_values("risk", risk)],
+        "saga": [v.upper() for v in filter_values("saga", saga)],
+    }
+    for name, choices in (
+        ("pillar", PILLAR_FILES),
+        ("lens", PRACTICE_SOURCES),
+        ("risk", RISK_LEVELS),
+        ("saga", DEVOPS_SAGAS),
+    ):
+        for value in filters[name]:
+            check_choice(name, value, choices)
+    result = summarize(
+        load_stats(), filters["pillar"], filters["lens"], filters["risk"], filters["saga"]
+    )
+    # Rows in index output order: by pillar, then framework before the lenses
+    pillars, sources = list(PILLAR_FILES), list(PRACTICE_SOURCES)
+    result["crosstab"].sort(
+        key=lambda row: (pillars.index(row["pillar"]), sources.index(row["lens"]))
+    )
+    return result
+
+
+def render_stats(result: dict[str, Any]) -> None:
+    """Print a query_stats() result as markdown tables."""
+    risks = list(result["risk"])
+    print(
+        f"## Corpus statistics ({result['practices']} practices, "
+        f"{result['withRelated']} with related practices)"
+    )
+    print()
+    print("### Practices by pillar, lens and risk")
+    print()
+    print(f"| Pillar | Lens | {' | '.join(risks)} | Total | With related |")
+    print(f"|:-------|:-----|{'|'.join('-----:' for _ in risks)}|------:|-------------:|")
+    for row in result["crosstab"]:
+        counts = " | ".join(str(row["risk"][r]) for r in risks)
+        print(
+            f"| {row['pillar']} | {row['lens']} | {counts} | {row['practices']} | "
+            f"{row['withRelated']} |"
+        )
+    counts = " | ".join(f"**{result['risk'][r]}**" for r in risks)
+    print(
+        f"| **Total** | | {counts} | **{result['practices']}** | "
+        f"**{result['withRelated']}** |"
+    )
+
+    print()
+    print("### Practices by area")
+    print()
+    print("| Area | Practices |")
+    print("|:-----|----------:|")
+    for area, count in result["areas"].items():
+        print(f"| {area} | {count} |")
+
+    if result["devops"]:
+        print()
+        print("### DevOps")
+        print()
+        print("| Saga | Code | Capabilities | Indicators | Anti-Patterns | Metrics |")
+        print("|:-----|:-----|-------------:|-----------:|--------------:|--------:|")
+        totals = dict.fromkeys(("capabilities", "indicators", "antiPatterns", "metrics"), 0)
+        for s in result["devops"]:
+            for key in totals:
+                totals[key] += s[key]
+            print(
+                f"| {s['saga']} | {s['sagaCode']} | {s['capabilities']} | {s['indicators']} | "
+                f"{s['antiPatterns']} | {s['metrics']} |"
+            )
+        print("| **Total** | | " + " | ".join(f"**{n}**" for n in totals.values()) + " |")
+
+
+def cmd_stats(args: argparse.Namespace) -> None:
+    """Output corpus-wide statistics."""
+    output(args, lambda: query_stats(args.pillar, args.lens, args.risk, args.saga), render_stats)
+
+
+def add_stats_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--pillar",
+        "-p",
+        type=comma_list,
+        action="extend",
+        help=f"Pillars, comma-separated ({', '.join(PILLAR_FILES)})",
+    )
+    parser.add_argument(
+        "--lens",
+        "-l",
+        type=comma_list,
+        action="extend",
+        help="Lenses, comma-separated; 'framework' selects the framework itself "
+        f"(default: all) ({', '.join(LENS_DIRS)})",
+    )
+    parser.add_argument(
+        "--risk",
+        "-r",
+        type=comma_list,
+        action="extend",
+        help=f"Risk levels, comma-separated ({', '.join(RISK_LEVELS)})",
+    )
+    parser.add_argument(
+        "--saga",
+        "-s",
+        type=comma_list,
+        action="extend",
+        help=f"DevOps sagas, comma-separated ({', '.join(DEVOPS_SAGAS)})",
+    )
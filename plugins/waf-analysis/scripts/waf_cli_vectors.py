@@ -0,0 +1,202 @@
+"""similar and semantic subcommands of waf_query.py.
+
+Nearest practices by cosine similarity of the semantic vectors built with the
+snapshot (see waf_vectors.py). Needs NumPy.
+"""
+
+import argparse
+from typing import TYPE_CHECKING, Any
+
+import waf_trace
+from waf_cli import (
+    BUILD_DIR,
+    PRACTICE_SOURCES,
+    QueryError,
+    comma_list,
+    corpus_loader,
+    load_search_index,
+    load_snapshot,
+    load_store,
+    non_negative_int,
+    output,
+    select_practices,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from waf_vectors import VectorIndex
+
+
+@corpus_loader
+def load_vector_index() -> "VectorIndex":
+    """Open the semantic vectors built with the snapshot.
+
+    Raises QueryError when NumPy is missing or the vectors are missing or
+    do not match the current snapshot.
+    """
+    try:
+        with waf_trace.span("import.numpy"):
+            from waf_vectors import VectorIndex
+    except ImportError:
+        raise QueryError("similar and semantic need NumPy: pip install numpy") from None
+    from pathlib import Path
+
+    from waf_snapshot import unpack_section
+
+    snapshot = load_snapshot()
+    section = snapshot.section("vectors") if snapshot else None
+    if section is None:
+        raise QueryError(
+            "Semantic vectors not built: run generate_data.py with NumPy installed"
+        )
+    meta, _ = unpack_section(section)
+    try:
+        with waf_trace.span("load.vectors", bytes=sum(f[0] for f in meta["files"].values())):
+            return VectorIndex(Path(BUILD_DIR), meta)
+    except (OSError, ValueError) as e:
+        raise QueryError(f"Semantic vectors out of date ({e}): run generate_data.py") from None
+
+
+def practice_mask(
+    pillar: str | list[str] | None, lens: str | list[str] | None
+) -> "np.ndarray | None":
+    """Boolean document mask for pillar/lens filters, or None when unfiltered."""
+    import numpy as np
+
+    if not pillar and not lens:
+        return None
+    facets, selection, _, _ = select_practices(pillar, lens or list(PRACTICE_SOURCES))
+    docs = facets.meta["docs"]
+    packed = np.frombuffer(selection.to_bytes((docs + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(packed, bitorder="little")[:docs].astype(bool)
+
+
+def similar_results(ranked: list[tuple[int, float]]) -> list[dict[str, Any]]:
+    store = load_store()
+    results = []
+    for doc, score in ranked:
+        p = store.record(doc)
+        results.append(
+            {
+                "id": p["id"],
+                "title": p["title"],
+                "risk": p.get("risk", ""),
+                "pillar": p.get("pillar", ""),
+                "lens": p.get("lens", "FRAMEWORK"),
+                "score": round(score, 4),
+            }
+        )
+    return results
+
+
+def query_similar(
+    record_id: str,
+    top_k: int = 10,
+    pillar: str | list[str] | None = None,
+    lens: str | list[str] | None = None,
+) -> dict[str, Any]:
+    """Return the practices semantically closest to a practice.
+
+    Returns {"id", "results"}; results are the top_k practices by cosine
+    similarity of their vectors, across all pillars and lenses unless
+    pillar or lens (one or more values, as for index) restrict them.
+    """
+    vectors = load_vector_index()
+    doc = load_store().index(record_id.upper())
+    if doc is None:
+        raise QueryError(f"Practice not found: {record_id.upper()}")
+    mask = practice_mask(pillar, lens)
+    with waf_trace.span("nearest", docs=len(vectors.vectors)):
+        ranked = vectors.nearest(vectors.vectors[doc], top_k, exclude=doc, mask=mask)
+    return {"id": record_id.upper(), "results": similar_results(ranked)}
+
+
+def query_semantic(
+    text: str,
+    top_k: int = 10,
+    pillar: str | list[str] | None = None,
+    lens: str | list[str] | None = None,
+) -> dict[str, Any]:
+    """Return the practices semantically closest to free text.
+
+    Returns {"text", "results"}; results is empty when none of the words
+    occur in the corpus.
+    """
+    vectors = load_vector_index()
+    index, _, _ = load_search_index(None)
+    vector = vectors.embed(text, index.lookup)
+    if vector is None:
+        return {"text": text, "results": []}
+    mask = practice_mask(pillar, lens)
+    with waf_trace.span("nearest", docs=len(vectors.vectors)):
+        ranked = vectors.nearest(vector, top_k, mask=mask)
+    return {"text": text, "results": similar_results(ranked)}
+
+
+def render_similar(result: dict[str, Any]) -> None:
+    """Print a query_similar() or query_semantic() result as markdown."""
+    if "id" in result:
+        print(f"## Practices similar to {result['id']}")
+    else:
+        print(f"## Practices similar to '{result['text']}'")
+    print()
+    print("| ID | Title | Risk | Lens | Similarity |")
+    print("|:---|:------|:-----|:-----|:-----------|")
+    for p in result["results"]:
+        print(f"| {p['id']} | {p['title']} | {p['risk']} | {p['lens']} | {p['score']:.3f} |")
+
+
+def cmd_similar(args: argparse.Namespace) -> None:
+    """Output the practices semantically closest to a practice."""
+    output(
+        args,
+        lambda: query_similar(args.id, args.top_k, args.pillar, args.lens),
+        render_similar,
+        json_view=lambda result: result["results"],
+    )
+
+
+def cmd_semantic(args: argparse.Namespace) -> None:
+    """Output the practices semantically closest to free text."""
+    output(
+        args,
+        lambda: query_semantic(args.text, args.top_k, args.pillar, args.lens),
+        render_similar,
+        json_view=lambda result: result["results"],
+    )
+
+
+def add_similar_filter_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--top-k",
+        "--limit",
+        "-k",
+        type=non_negative_int,
+        default=10,
+        help="Maximum results to return (default: 10)",
+    )
+    parser.add_argument(
+        "--pillar",
+        "-p",
+        type=comma_list,
+        action="extend",
+        help="Only return these pillars (comma-separated)",
+    )
+    parser.add_argument(
+        "--lens",
+        "-l",
+        type=comma_list,
+        action="extend",
+        help="Only return these lenses (comma-separated, 'framework' for the framework)",
+    )
+
+
+def add_similar_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("id", help="Practice ID (e.g., SLSREL01-BP01)")
+    add_similar_filter_arguments(parser)
+
+
+def add_semantic_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("text", help="Free-text description (e.g., 'retry with backoff')")
+    add_similar_filter_arguments(parser)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Long-running query daemon transport for waf_query.py.
+
+`waf_query.py serve` keeps the corpus loaded and answers requests over a Unix
+socket (or stdin/stdout) using newline-delimited JSON-RPC 2.0. One request per
+line:
+
+    {"jsonrpc": "2.0", "id": 1, "method": "query", "params": {"argv": ["detail", "SEC01-BP01"]}}
+
+and one response per line:
+
+    {"jsonrpc": "2.0", "id": 1, "result": {"exit": 0, "stdout": "...", "stderr": ""}}
+
+"query" takes the same arguments as the CLI, so a client gets byte-identical
+output; with --timings in argv the result also carries a "trace" (see
+waf_trace.py). "ping" returns "pong". A connection may send any number of
+requests.
+
+Clients call request(); it returns None when no daemon is listening, when
+the socket is not one of the user's own, or when the daemon does not answer
+within REQUEST_TIMEOUT, so the caller can fall back to running the query
+in-process. The socket is created readable by its owner only. Socket and server
+modules are imported on use so that importing this module stays cheap for
+clients that never find a daemon.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import zlib
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Any, Callable
+
+    Handler = Callable[[list[str]], dict[str, Any]]
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+
+CONNECT_TIMEOUT = 0.05
+
+# Seconds to wait for a response before giving up on a wedged daemon
+REQUEST_TIMEOUT = 10.0
+
+
+def default_socket_path(build_dir: str) -> str:
+    """Per-user, per-checkout socket path, overridable with WAF_QUERY_SOCKET.
+
+    The name includes a checksum of the resolved build directory, so a daemon
+    serving one checkout's corpus never answers queries from another.
+    """
+    if os.environ.get("WAF_QUERY_SOCKET"):
+        return os.environ["WAF_QUERY_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"
+    checkout = zlib.crc32(os.fsencode(os.path.realpath(build_dir)))
+    return os.path.join(runtime_dir, f"waf_query-{os.getuid()}-{checkout:08x}.sock")
+
+
+def _error(request_id: Any, code: int, message: str) -> dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def dispatch(line: bytes, handle: Handler) -> dict[str, Any]:
+    """Answer one JSON-RPC request line."""
+    try:
+        message = json.loads(line)
+    except ValueError as e:
+        return _error(None, PARSE_ERROR, f"Parse error: {e}")
+    if not isinstance(message, dict) or not isinstance(message.get("method"), str):
+        return _error(None, INVALID_REQUEST, "Invalid request")
+
+    request_id = message.get("id")
+    method = message["method"]
+    if method == "ping":
+        return {"jsonrpc": "2.0", "id": request_id, "result": "pong"}
+    if method != "query":
+        return _error(request_id, METHOD_NOT_FOUND, f"Method not found: {method}")
+
+    argv = (message.get("params") or {}).get("argv")
+    if not isinstance(argv, list) or not all(isinstance(a, str) for a in argv):
+        return _error(request_id, INVALID_PARAMS, "params.argv must be a list of strings")
+    return {"jsonrpc": "2.0", "id": request_id, "result": handle(argv)}
+
+
+def _encode(response: dict[str, Any]) -> bytes:
+    return json.dumps(response, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def serve_stdio(handle: Handler) -> None:
+    """Answer requests from stdin until EOF."""
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    for line in stdin:
+        if line.strip():
+            stdout.write(_encode(dispatch(line, handle)))
+            stdout.flush()
+
+
+def serve_socket(path: str | Path, handle: Handler) -> None:
+    """Answer requests on a Unix socket at path until interrupted.
+
+    Connections are served on their own threads; handle is called under a
+    lock, so it only has to be safe for one caller at a time.
+    """
+    import signal
+    import socketserver
+    import threading
+    from pathlib import Path
+
+    path = Path(path)
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+    if path.exists():
+        if request(path, None) is not None:
+            raise OSError(f"A waf_query daemon is already listening on {path}")
+        path.unlink()
+
+    lock = threading.Lock()
+
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for line in self.rfile:
+                if line.strip():
+                    with lock:
+                        response = dispatch(line, handle)
+                    self.wfile.write(_encode(response))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Owner-only from the moment it is bound, not after a later chmod
+    umask = os.umask(0o177)
+    try:
+        server = Server(str(path), RequestHandler)
+    finally:
+        os.umask(umask)
+    # Remove the socket on SIGTERM too, not just on Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"waf_query daemon listening on {path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        path.unlink(missing_ok=True)
+
+
+def _owned_socket(path: str | Path) -> bool:
+    """Whether path is a socket owned by the current user.
+
+    In a shared directory such as /tmp another user could create the socket
+    first and answer in the daemon's place.
+    """
+    import stat
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def request(path: str | Path, argv: list[str] | None) -> dict[str, Any] | None:
+    """Send one query (or a ping when argv is None) to the daemon at path.
+
+    Returns the result, or None when no daemon of this user is reachable or
+    it does not answer within REQUEST_TIMEOUT.
+    """
+    import socket
+
+    if not _owned_socket(path):
+        return None
+
+    message = {"jsonrpc": "2.0", "id": 1}
+    if argv is None:
+        message["method"] = "ping"
+    else:
+        message.update(method="query", params={"argv": argv})
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(str(path))
+            sock.settimeout(REQUEST_TIMEOUT)
+            sock.sendall(_encode(message))
+            with sock.makefile("rb") as f:
+                response = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+    return response.get("result")
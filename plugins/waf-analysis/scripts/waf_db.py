@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+"""SQLite storage backend: the whole corpus in one indexed database file.
+
+generate_data.py writes data/build/waf.db next to the snapshot. It holds the
+pillar, lens and DevOps records in normalized tables:
+
+    practices       one row per practice: doc, id, source (framework or lens
+                    key), pillar key, lens, risk, title, description, outcome,
+                    href and the full record as JSON
+    areas           (area, doc) per practice area
+    related         (doc, target, flags) resolved related-practice edges, as
+                    in waf_graph (both directions, prefix references expanded)
+    capabilities    one row per DevOps capability
+    indicators, anti_patterns, metrics
+                    DevOps items with their capability's doc
+    practices_fts   contentless FTS5 index of the search fields (tokenized
+                    like waf_search, so terms match the other backends)
+    terms           search dictionary: term, row (its index in the sorted
+                    dictionary, i.e. its projection.npy row), documents and
+                    trigram count
+    term_trigrams   (gram, row) postings for fuzzy term matching
+    groups, meta    record groups, the source fingerprint and the corpus
+                    statistics (waf_stats.aggregate)
+
+Practices and capabilities keep the snapshot's global record numbers (doc),
+so the semantic vectors line up with both. Each filter column has a
+covering index, so `waf_query.py --backend sqlite` answers filters, facet
+counts, ID lookups and graph walks with index lookups, and ranks search
+results with FTS5's bm25() using FIELD_WEIGHTS as column weights. Term
+expansion (prefix, fuzzy, compound splits) follows the snapshot index rules.
+
+Readers open the file read-only, so any number of processes can share it;
+generate_data.py writes a new file and renames it into place. The `sql`
+subcommand runs ad-hoc statements through an authorizer that only allows
+reads.
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from waf_facets import FACETS, FacetIndex, facet_values
+from waf_graph import RelatedGraph, build_graph
+from waf_search import FIELD_WEIGHTS, MAX_FUZZY_TERMS, MAX_PREFIX_TERMS, FUZZY_THRESHOLD
+from waf_search import SearchIndex, _field_text, tokenize, trigrams
+from waf_snapshot import is_fresh, source_fingerprint
+from waf_stats import aggregate
+
+VERSION = 2
+
+# DevOps item table -> (capability record key, kind, extra columns)
+ITEM_TABLES = {
+    "indicators": ("indicators", "indicator", ()),
+    "anti_patterns": ("antiPatterns", "antiPattern", ()),
+    "metrics": ("metrics", "metric", ("formula", "unit")),
+}
+
+# What the sql subcommand's authorizer allows: reads and schema introspection
+READ_ACTIONS = frozenset(
+    {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+)
+READ_PRAGMAS = frozenset(
+    "data_version table_info table_xinfo table_list index_list index_info index_xinfo "
+    "foreign_key_list database_list compile_options function_list pragma_list".split()
+)
+SQL_TIMEOUT = 10.0
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE groups (
+    position INTEGER PRIMARY KEY, kind TEXT NOT NULL, source TEXT NOT NULL,
+    pillar TEXT NOT NULL, start INTEGER NOT NULL, stop INTEGER NOT NULL
+);
+CREATE TABLE practices (
+    doc INTEGER PRIMARY KEY, id TEXT NOT NULL, source TEXT NOT NULL, pillar TEXT NOT NULL,
+    lens TEXT, risk TEXT, title TEXT, description TEXT, outcome TEXT, href TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX practices_id ON practices (id, doc);
+CREATE INDEX practices_source ON practices (source, doc);
+CREATE INDEX practices_pillar ON practices (pillar, doc);
+CREATE INDEX practices_risk ON practices (risk, doc);
+CREATE TABLE areas (area TEXT NOT NULL, doc INTEGER NOT NULL, PRIMARY KEY (area, doc))
+    WITHOUT ROWID;
+CREATE INDEX areas_doc ON areas (doc, area);
+CREATE TABLE related (
+    doc INTEGER NOT NULL, target INTEGER NOT NULL, flags INTEGER NOT NULL,
+    PRIMARY KEY (doc, target)
+) WITHOUT ROWID;
+CREATE TABLE capabilities (
+    doc INTEGER PRIMARY KEY, code TEXT NOT NULL, saga_code TEXT NOT NULL,
+    capability_code TEXT NOT NULL, saga TEXT, capability TEXT, description TEXT, href TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX capabilities_code ON capabilities (code COLLATE NOCASE, doc);
+CREATE INDEX capabilities_saga ON capabilities (saga_code, doc);
+CREATE TABLE terms (
+    term TEXT PRIMARY KEY, row INTEGER NOT NULL, docs INTEGER NOT NULL, grams INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX terms_row ON terms (row, term, docs, grams);
+CREATE TABLE term_trigrams (gram INTEGER NOT NULL, row INTEGER NOT NULL, PRIMARY KEY (gram, row))
+    WITHOUT ROWID;
+"""
+
+ITEM_SCHEMA = """
+CREATE TABLE {table} (
+    id TEXT NOT NULL, capability INTEGER NOT NULL, position INTEGER NOT NULL,
+    title TEXT, description TEXT, category TEXT, {extra}record TEXT NOT NULL,
+    PRIMARY KEY (capability, position)
+) WITHOUT ROWID;
+CREATE INDEX {table}_id ON {table} (id COLLATE NOCASE, capability, position);
+"""
+
+FTS_SCHEMA = (
+    f"CREATE VIRTUAL TABLE practices_fts USING fts5({', '.join(FIELD_WEIGHTS)}, content='')"
+)
+
+
+def _dumps(record: Any) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_database(
+    path: Path,
+    data_dir: Path,
+    practice_groups: list[tuple[str, str, list[dict[str, Any]]]],
+    capability_groups: list[tuple[str, list[dict[str, Any]]]],
+    read: Callable[[Path], bytes] | None = None,
+) -> dict[str, int]:
+    """Write the corpus database to path (atomically); returns its statistics.
+
+    Groups are the snapshot's (see waf_snapshot.write_snapshot) and records
+    are numbered the same way: practices first, in group order.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    connection = sqlite3.connect(tmp)
+    try:
+        connection.executescript(
+            "PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;" + SCHEMA + FTS_SCHEMA + ";"
+        )
+        for table, (_, _, extra) in ITEM_TABLES.items():
+            columns = "".join(f"{column} TEXT, " for column in extra)
+            connection.executescript(ITEM_SCHEMA.format(table=table, extra=columns))
+        stats = _insert_corpus(connection, practice_groups, capability_groups)
+        fingerprint = source_fingerprint(data_dir, read)
+        connection.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [
+                ("version", str(VERSION)),
+                ("fingerprint", json.dumps(fingerprint, separators=(",", ":"))),
+                ("related", json.dumps(stats.pop("related"))),
+                ("stats", json.dumps(aggregate(practice_groups, capability_groups))),
+            ],
+        )
+        connection.commit()
+        connection.execute("ANALYZE")
+        connection.commit()
+    except BaseException:
+        connection.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    connection.close()
+    os.replace(tmp, path)
+    return {**stats, "bytes": path.stat().st_size}
+
+
+def _insert_corpus(
+    connection: sqlite3.Connection,
+    practice_groups: list[tuple[str, str, list[dict[str, Any]]]],
+    capability_groups: list[tuple[str, list[dict[str, Any]]]],
+) -> dict[str, Any]:
+    doc = 0
+    practices = []
+    for position, (source, pillar, group) in enumerate(practice_groups):
+        connection.execute(
+            "INSERT INTO groups VALUES (?, 'practice', ?, ?, ?, ?)",
+            (position, source, pillar, doc, doc + len(group)),
+        )
+        for p in group:
+            values = facet_values(source, pillar, p)
+            connection.execute(
+                "INSERT INTO practices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    doc,
+                    p.get("id", ""),
+                    source,
+                    pillar,
+                    p.get("lens"),
+                    values["risk"][0] if values["risk"] else None,
+                    p.get("title"),
+                    p.get("description"),
+                    p.get("outcome"),
+                    p.get("href"),
+                    _dumps(p),
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO areas VALUES (?, ?)", [(area, doc) for area in values["area"]]
+            )
+            practices.append(p)
+            doc += 1
+
+    # Search dictionary and FTS rows, tokenized exactly like the BM25F index
+    term_docs: dict[str, int] = {}
+    for number, p in enumerate(practices):
+        fields = [tokenize(_field_text(p, field)) for field in FIELD_WEIGHTS]
+        for term in {token for tokens in fields for token in tokens}:
+            term_docs[term] = term_docs.get(term, 0) + 1
+        connection.execute(
+            f"INSERT INTO practices_fts (rowid, {', '.join(FIELD_WEIGHTS)}) "
+            f"VALUES (?{', ?' * len(FIELD_WEIGHTS)})",
+            (number, *(" ".join(tokens) for tokens in fields)),
+        )
+    for row, term in enumerate(sorted(term_docs)):
+        grams = trigrams(term)
+        connection.execute(
+            "INSERT INTO terms VALUES (?, ?, ?, ?)", (term, row, term_docs[term], len(grams))
+        )
+        connection.executemany(
+            "INSERT INTO term_trigrams VALUES (?, ?)", [(gram, row) for gram in grams]
+        )
+
+    graph = RelatedGraph(build_graph(practices))
+    for source in range(len(practices)):
+        connection.executemany(
+            "INSERT INTO related VALUES (?, ?, ?)",
+            [(source, target, flags) for target, flags in graph.neighbors(source)],
+        )
+
+    capabilities = 0
+    for position, (saga, group) in enumerate(capability_groups, len(practice_groups)):
+        connection.execute(
+            "INSERT INTO groups VALUES (?, 'capability', ?, '', ?, ?)",
+            (position, saga, doc, doc + len(group)),
+        )
+        for c in group:
+            code = f"{c.get('sagaCode', '')}.{c.get('capabilityCode', '')}"
+            connection.execute(
+                "INSERT INTO capabilities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    doc,
+                    code,
+                    c.get("sagaCode", ""),
+                    c.get("capabilityCode", ""),
+                    c.get("saga"),
+                    c.get("capability"),
+                    c.get("description"),
+                    c.get("href"),
+                    _dumps(c),
+                ),
+            )
+            for table, (key, _, extra) in ITEM_TABLES.items():
+                connection.executemany(
+                    f"INSERT INTO {table} VALUES ({', '.join('?' * (7 + len(extra)))})",
+                    [
+                        (
+                            item.get("id", ""),
+                            doc,
+                            order,
+                            item.get("title"),
+                            item.get("description"),
+                            item.get("category"),
+                            *(item.get(column) for column in extra),
+                            _dumps(item),
+                        )
+                        for order, item in enumerate(c.get(key, []))
+                    ],
+                )
+            capabilities += 1
+            doc += 1
+
+    return {
+        "practices": len(practices),
+        "capabilities": capabilities,
+        "terms": len(term_docs),
+        "edges": graph.meta["edges"],
+        "related": graph.meta,
+    }
+
+
+def _read_only(action: int, name: str | None, *args: Any) -> int:
+    if action in READ_ACTIONS or (action == sqlite3.SQLITE_PRAGMA and name in READ_PRAGMAS):
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+
+class Database:
+    """Read-only view of the corpus database with the Snapshot read interface.
+
+    record(), ranges(), practices(), iter_practices(), capabilities(),
+    index() and find() behave like their Snapshot counterparts, so the query
+    code can use either store.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.nbytes = path.stat().st_size
+        self.connection = self._connect()
+        self._adhoc: sqlite3.Connection | None = None
+        meta = dict(self.connection.execute("SELECT key, value FROM meta"))
+        if int(meta.get("version", 0)) != VERSION:
+            raise ValueError(f"Unsupported database version {meta.get('version')}: {path}")
+        self.header = {
+            "fingerprint": json.loads(meta["fingerprint"]),
+            "groups": [
+                list(row)
+                for row in self.connection.execute(
+                    "SELECT kind, source, pillar, start, stop FROM groups ORDER BY position"
+                )
+            ],
+            "related": json.loads(meta["related"]),
+        }
+        practice_ends = [g[4] for g in self.header["groups"] if g[0] == "practice"]
+        self.practice_count = max(practice_ends, default=0)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(
+            f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+        )
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.connection.execute(sql, parameters)
+
+    def is_fresh(self, data_dir: Path) -> bool:
+        return is_fresh(self.header["fingerprint"], data_dir)
+
+    def _table(self, index: int) -> str:
+        return "practices" if index < self.practice_count else "capabilities"
+
+    def record(self, index: int) -> dict[str, Any]:
+        """Return the record with global index."""
+        row = self.execute(
+            f"SELECT record FROM {self._table(index)} WHERE doc = ?", (index,)
+        ).fetchone()
+        if row is None:
+            raise IndexError(index)
+        return json.loads(row[0])
+
+    def _iter_records(self, start: int, end: int) -> Iterator[dict[str, Any]]:
+        rows = self.execute(
+            f"SELECT record FROM {self._table(start)} WHERE doc >= ? AND doc < ? ORDER BY doc",
+            (start, end),
+        )
+        return (json.loads(record) for record, in rows)
+
+    def ranges(
+        self, kind: str, sources: list[str] | None = None, pillar: str | None = None
+    ) -> list[range]:
+        """Global record ranges for kind, filtered by sources (in order) and pillar."""
+        groups = [g for g in self.header["groups"] if g[0] == kind]
+        if sources is not None:
+            groups = [g for s in sources for g in groups if g[1] == s]
+        return [range(g[3], g[4]) for g in groups if not pillar or g[2] == pillar]
+
+    def practices(
+        self, sources: list[str] | None = None, pillar: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Return practices for the given sources (in order) and pillar key."""
+        return list(self.iter_practices(sources, pillar))
+
+    def iter_practices(
+        self, sources: list[str] | None = None, pillar: str | None = None
+    ) -> Iterator[dict[str, Any]]:
+        for r in self.ranges("practice", sources, pillar):
+            yield from self._iter_records(r.start, r.stop)
+
+    def capabilities(self, saga: str | None = None) -> list[dict[str, Any]]:
+        """Return DevOps capabilities, optionally for a single saga code."""
+        capabilities = []
+        for r in self.ranges("capability", [saga] if saga else None):
+            capabilities.extend(self._iter_records(r.start, r.stop))
+        return capabilities
+
+    def index(self, record_id: str, kind: str = "practice") -> int | None:
+        """Return the global index of the first record of kind with record_id."""
+        if kind == "practice":
+            sql = "SELECT doc FROM practices WHERE id = ? ORDER BY doc LIMIT 1"
+        else:
+            sql = "SELECT doc FROM capabilities WHERE code = ? COLLATE NOCASE ORDER BY doc LIMIT 1"
+        row = self.execute(sql, (record_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def find(self, record_id: str, kind: str = "practice") -> dict[str, Any] | None:
+        """Return the record of kind with record_id."""
+        index = self.index(record_id, kind)
+        return None if index is None else self.record(index)
+
+    def find_record(self, record_id: str) -> tuple[str, dict[str, Any], str | None] | None:
+        """Find a practice, capability or DevOps item by (upper-case) ID.
+
+        Returns (kind, record, parent capability code) like waf_cli.find_record.
+        """
+        practice = self.find(record_id)
+        if practice is not None:
+            return "practice", practice, None
+        row = self.execute(
+            "SELECT record FROM capabilities WHERE code = ? COLLATE NOCASE ORDER BY doc LIMIT 1",
+            (record_id,),
+        ).fetchone()
+        if row is not None:
+            return "capability", json.loads(row[0]), None
+        found = []
+        for order, (table, (_, kind, _)) in enumerate(ITEM_TABLES.items()):
+            row = self.execute(
+                f"SELECT i.capability, i.position, i.record, c.code FROM {table} i "
+                "JOIN capabilities c ON c.doc = i.capability "
+                "WHERE i.id = ? COLLATE NOCASE ORDER BY i.capability, i.position LIMIT 1",
+                (record_id,),
+            ).fetchone()
+            if row is not None:
+                found.append(((row[0], order, row[1]), kind, row[2], row[3]))
+        if not found:
+            return None
+        _, kind, record, code = min(found)
+        return kind, json.loads(record), code
+
+    def query(self, sql: str, timeout: float = SQL_TIMEOUT) -> sqlite3.Cursor:
+        """Run an ad-hoc statement that may only read; raises sqlite3.Error.
+
+        Statements run on their own connection, where an authorizer rejects
+        anything but reads (no ATTACH, temp tables or setting pragmas) and
+        fetching is interrupted once timeout seconds have passed.
+        """
+        if self._adhoc is None:
+            self._adhoc = self._connect()
+            # FTS5 touches sqlite_master when it first connects to its table
+            self._adhoc.execute("SELECT rowid FROM practices_fts LIMIT 0").fetchall()
+            self._adhoc.set_authorizer(_read_only)
+        deadline = time.monotonic() + timeout
+        self._adhoc.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        return self._adhoc.execute(sql)
+
+    def stats(self) -> dict[str, Any]:
+        """Corpus statistics computed when the database was built."""
+        (stats,) = self.execute("SELECT value FROM meta WHERE key = 'stats'").fetchone()
+        return json.loads(stats)
+
+    def schema(self) -> list[str]:
+        """CREATE statements of every table, index and view."""
+        rows = self.execute(
+            "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL "
+            "AND name NOT LIKE 'practices_fts_%' AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+        )
+        return [sql for sql, in rows]
+
+
+def open_database(path: str | Path, data_dir: str | Path) -> Database | None:
+    """Open the database at path if it exists and matches data_dir, else None."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        database = Database(path)
+    except (OSError, ValueError, KeyError, sqlite3.Error):
+        return None
+    return database if database.is_fresh(data_dir) else None
+
+
+class DatabaseFacets(FacetIndex):
+    """FacetIndex whose bitsets come from the database's covering indexes."""
+
+    QUERIES = {
+        "pillar": "SELECT doc FROM practices WHERE pillar = ?",
+        "lens": "SELECT doc FROM practices WHERE source = ?",
+        "risk": "SELECT doc FROM practices WHERE risk = ?",
+        "area": "SELECT doc FROM areas WHERE area = ?",
+    }
+    VALUES = {
+        "pillar": "SELECT DISTINCT pillar FROM practices ORDER BY pillar",
+        "lens": "SELECT DISTINCT source FROM practices ORDER BY source",
+        "risk": "SELECT DISTINCT risk FROM practices WHERE risk IS NOT NULL ORDER BY risk",
+        "area": "SELECT DISTINCT area FROM areas ORDER BY area",
+    }
+
+    def __init__(self, database: Database) -> None:
+        self.database = database
+        values = {
+            facet: [value for value, in database.execute(self.VALUES[facet])]
+            for facet in FACETS
+        }
+        self.meta = {"docs": database.practice_count, "values": values}
+        self._width = (self.meta["docs"] + 7) // 8
+        self._folded = {
+            facet: {value.casefold(): value for value in values[facet]} for facet in FACETS
+        }
+        self._cache: dict[tuple[str, str], int] = {}
+
+    def bits(self, facet: str, value: str) -> int:
+        """Bitset of the documents with value for facet (0 if unknown)."""
+        key = (facet, value)
+        if key not in self._cache:
+            bits = bytearray(self._width)
+            for doc, in self.database.execute(self.QUERIES[facet], (value,)):
+                bits[doc >> 3] |= 1 << (doc & 7)
+            self._cache[key] = int.from_bytes(bits, "little")
+        return self._cache[key]
+
+
+class FullTextIndex(SearchIndex):
+    """SearchIndex over the database's FTS5 table and term dictionary.
+
+    Term lookup and expansion use the terms tables with the same rules as the
+    snapshot index; postings come from FTS5, scored by bm25() with
+    FIELD_WEIGHTS as column weights, so a term's impact in a document is
+    its bm25 contribution.
+    """
+
+    def __init__(self, database: Database) -> None:
+        self.database = database
+        (terms,) = database.execute("SELECT count(*) FROM terms").fetchone()
+        self.meta = {"docs": database.practice_count, "terms": terms, "fields": FIELD_WEIGHTS}
+        weights = ", ".join(str(weight) for weight in FIELD_WEIGHTS.values())
+        self._postings_sql = (
+            f"SELECT rowid, -bm25(practices_fts, {weights}) FROM practices_fts "
+            "WHERE practices_fts MATCH ?"
+        )
+
+    def _term(self, index: int) -> bytes:
+        (term,) = self.database.execute(
+            "SELECT term FROM terms WHERE row = ?", (index,)
+        ).fetchone()
+        return term.encode("utf-8")
+
+    def lookup(self, term: str) -> int | None:
+        """Return the dictionary index of term, or None if it never occurs."""
+        row = self.database.execute("SELECT row FROM terms WHERE term = ?", (term,)).fetchone()
+        return None if row is None else row[0]
+
+    def _occurs(self, index: int | None, mask: bytearray | None) -> bool:
+        if index is None or mask is None:
+            return index is not None
+        docs, _ = self.postings(self._term(index).decode("utf-8"))
+        return any(mask[doc] for doc in docs)
+
+    def _frequency(self, index: int) -> int:
+        (docs,) = self.database.execute(
+            "SELECT docs FROM terms WHERE row = ?", (index,)
+        ).fetchone()
+        return docs
+
+    def prefix_terms(
+        self, prefix: str, limit: int = MAX_PREFIX_TERMS, mask: bytearray | None = None
+    ) -> list[str]:
+        """Dictionary terms starting with prefix, the limit most frequent."""
+        # Terms are [a-z0-9]+ and "{" sorts after "z", so this is the prefix range
+        rows = self.database.execute(
+            "SELECT row, docs, term FROM terms WHERE term >= ?1 AND term < ?1 || '{'",
+            (prefix,),
+        )
+        matches = [row for row in rows if self._occurs(row[0], mask)]
+        matches = heapq.nsmallest(limit, matches, key=lambda row: (-row[1], row[0]))
+        return [term for _, _, term in sorted(matches)]
+
+    def similar_terms(
+        self,
+        term: str,
+        threshold: float = FUZZY_THRESHOLD,
+        limit: int = MAX_FUZZY_TERMS,
+        mask: bytearray | None = None,
+    ) -> list[tuple[str, float]]:
+        """Dictionary terms whose trigram Jaccard similarity to term is >= threshold."""
+        query = trigrams(term)
+        rows = self.database.execute(
+            "SELECT t.row, t.term, t.grams, count(*) FROM term_trigrams g "
+            "JOIN terms t ON t.row = g.row "
+            f"WHERE g.gram IN ({', '.join('?' * len(query))}) GROUP BY g.row",
+            sorted(query),
+        )
+        similar = []
+        for index, name, grams, common in rows:
+            score = common / (len(query) + min(grams, 255) - common)
+            if score >= threshold and self._occurs(index, mask):
+                similar.append((index, name, score))
+        similar = heapq.nsmallest(limit, similar, key=lambda item: (-item[2], item[0]))
+        return [(name, round(score, 4)) for _, name, score in similar]
+
+    def postings(self, term: str) -> tuple[array, array]:
+        """Return (doc ids, bm25 impacts) for term; both empty if it never occurs."""
+        docs, impacts = array("I"), array("f")
+        if self.lookup(term) is not None:
+            for doc, impact in self.database.execute(self._postings_sql, (f'"{term}"',)):
+                docs.append(doc)
+                impacts.append(impact)
+        return docs, impacts
+
+
+class DatabaseGraph(RelatedGraph):
+    """RelatedGraph whose adjacency is read from the related table."""
+
+    def __init__(self, database: Database) -> None:
+        self.database = database
+        self.meta = database.header["related"]
+
+    def neighbors(self, doc: int) -> Iterator[tuple[int, int]]:
+        """Yield (target, flags) for every edge of doc, by target."""
+        return iter(
+            self.database.execute(
+                "SELECT target, flags FROM related WHERE doc = ? ORDER BY target", (doc,)
+            ).fetchall()
+        )
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Faceted filtering over WAF practices with precomputed bitsets.
+
+generate_data.py builds one bitset per facet value and stores them as the
+"facets" section of the corpus snapshot; waf_query.py builds the same
+structure in memory when no fresh snapshot is available. Facets are:
+
+    pillar  pillar key (security, reliability, ...)
+    lens    "framework" or a lens key (serverless, iot, ...)
+    risk    HIGH, MEDIUM or LOW
+    area    practice areas ("Data protection", ...); a practice may have several
+
+Facet values use the CLI's filter keys, so counts can be fed straight back as
+filters. A filter ORs the bitsets of the values given for one facet and ANDs
+across facets; counting a facet value over a selection is one AND and a
+popcount. Bit N of a bitset is document N, stored little-endian so a bitset
+loads with int.from_bytes.
+"""
+
+from __future__ import annotations
+
+from waf_snapshot import pack_section, unpack_section
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Iterator
+
+FACETS = ("pillar", "lens", "risk", "area")
+
+
+def facet_values(source: str, pillar: str, practice: dict[str, Any]) -> dict[str, list[str]]:
+    """Facet values of one practice from its group (source, pillar key)."""
+    return {
+        "pillar": [pillar],
+        "lens": [source],
+        "risk": [practice["risk"]] if practice.get("risk") else [],
+        "area": list(dict.fromkeys(practice.get("area") or [])),
+    }
+
+
+def build_facets(groups: list[tuple[str, str, list[dict[str, Any]]]]) -> bytes:
+    """Build a packed facet section over (source, pillar key, practices) groups.
+
+    Documents are numbered across groups in order, matching the snapshot's
+    global record numbering when given the snapshot's practice groups.
+    """
+    docs: dict[str, dict[str, int]] = {facet: {} for facet in FACETS}
+    n_docs = 0
+    for source, pillar, practices in groups:
+        for p in practices:
+            for facet, values in facet_values(source, pillar, p).items():
+                for value in values:
+                    docs[facet][value] = docs[facet].get(value, 0) | 1 << n_docs
+            n_docs += 1
+
+    width = (n_docs + 7) // 8
+    bits = bytearray()
+    values = {}
+    for facet in FACETS:
+        values[facet] = sorted(docs[facet])
+        for value in values[facet]:
+            bits += docs[facet][value].to_bytes(width, "little")
+    return pack_section({"docs": n_docs, "values": values}, {"bits": bits})
+
+
+def iter_bits(selection: int, base: int = 0) -> Iterator[int]:
+    """Yield the set bit positions of selection in ascending order, plus base."""
+    while selection:
+        low = selection & -selection
+        yield base + low.bit_length() - 1
+        selection ^= low
+
+
+class FacetIndex:
+    """Filter and count view over a packed facet section (bytes or a snapshot section)."""
+
+    def __init__(self, buf: bytes | memoryview) -> None:
+        self.meta, arrays = unpack_section(memoryview(buf))
+        self._bits = arrays["bits"]
+        self._width = (self.meta["docs"] + 7) // 8
+        self._slots: dict[str, dict[str, int]] = {}
+        slot = 0
+        for facet in FACETS:
+            self._slots[facet] = {}
+            for value in self.meta["values"][facet]:
+                self._slots[facet][value] = slot
+                slot += 1
+        # Case-insensitive lookup of the stored spelling, for free-text areas
+        self._folded = {
+            facet: {value.casefold(): value for value in self.meta["values"][facet]}
+            for facet in FACETS
+        }
+
+    def values(self, facet: str) -> list[str]:
+        """Every value of facet, sorted."""
+        return self.meta["values"][facet]
+
+    def canonical(self, facet: str, value: str) -> str | None:
+        """Stored spelling of value (matched case-insensitively), or None."""
+        return self._folded[facet].get(value.casefold())
+
+    def bits(self, facet: str, value: str) -> int:
+        """Bitset of the documents with value for facet (0 if unknown)."""
+        slot = self._slots[facet].get(value)
+        if slot is None:
+            return 0
+        start = slot * self._width
+        return int.from_bytes(self._bits[start : start + self._width], "little")
+
+    def select(self, filters: dict[str, list[str]]) -> int:
+        """Bitset of documents matching any given value of every filtered facet."""
+        selection = (1 << self.meta["docs"]) - 1
+        for facet, values in filters.items():
+            if values:
+                union = 0
+                for value in values:
+                    union |= self.bits(facet, value)
+                selection &= union
+        return selection
+
+    def counts(self, selection: int) -> dict[str, dict[str, int]]:
+        """Per-facet value counts over selection, most frequent first."""
+        counts = {}
+        for facet in FACETS:
+            counted = [
+                (value, (self.bits(facet, value) & selection).bit_count())
+                for value in self.values(facet)
+            ]
+            counted = [item for item in counted if item[1]]
+            counted.sort(key=lambda item: (-item[1], item[0]))
+            counts[facet] = dict(counted)
+        return counts
+
+    def docs(self, selection: int, ranges: list[range] | None = None) -> Iterator[int]:
+        """Yield selected documents, in ascending order within each of ranges."""
+        if ranges is None:
+            yield from iter_bits(selection)
+            return
+        for r in ranges:
+            yield from iter_bits((selection >> r.start) & ((1 << len(r)) - 1), r.start)
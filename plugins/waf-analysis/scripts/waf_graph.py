@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Related-practice graph built from practice relatedIds.
+
+generate_data.py builds the adjacency over every framework and lens practice
+and stores it as the "related" section of the corpus snapshot; waf_query.py
+builds the same structure in memory when no fresh snapshot is available.
+Nodes are practice positions (the snapshot's global record numbers).
+
+Each practice's relatedIds become edges in both directions: an "out" edge
+from the practice that lists the reference and an "in" edge back to it, so a
+traversal also finds practices that point at the start. References may name
+a practice (SEC02-BP01) or only its question prefix (SEC02), which links to
+every practice under that question. Edges between the same pair are merged
+and carry flag bits recording which kinds of link produced them.
+References that match no practice are dropped.
+
+The adjacency is stored in CSR form: offsets (u32, one per node plus one),
+targets (u32) and flags (u8), sorted by target within each node.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections import namedtuple
+
+from waf_snapshot import pack_section, unpack_section
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Callable, Iterator
+
+OUT = 1
+OUT_PREFIX = 2
+IN = 4
+IN_PREFIX = 8
+
+
+class Neighbor(namedtuple("Neighbor", "doc hop parent flags")):
+    """A practice reached by traversal.
+
+    doc was reached from parent (None for the start) after hop hops, over an
+    edge with flags.
+    """
+
+    __slots__ = ()
+
+
+def question_prefix(practice_id: str) -> str:
+    """SEC02-BP01 -> SEC02; IDs without a -BP suffix are their own prefix."""
+    return practice_id.split("-", 1)[0]
+
+
+def direction(flags: int) -> str:
+    """Edge direction for flags: "out", "in" or "both"."""
+    out, inbound = flags & (OUT | OUT_PREFIX), flags & (IN | IN_PREFIX)
+    return "both" if out and inbound else "out" if out else "in"
+
+
+def via_prefix(flags: int) -> bool:
+    """True when an edge comes only from question-prefix references."""
+    return not flags & (OUT | IN)
+
+
+def via_prefixes(flags: int, from_id: str, to_id: str) -> str | None:
+    """The question prefixes a prefix-only edge from_id -> to_id matched.
+
+    An outbound prefix edge matched to_id's prefix (from_id lists it); an
+    inbound one matched from_id's prefix (to_id lists it). None when the
+    edge also has a direct reference.
+    """
+    if not via_prefix(flags):
+        return None
+    prefixes = []
+    if flags & OUT_PREFIX:
+        prefixes.append(question_prefix(to_id))
+    if flags & IN_PREFIX and question_prefix(from_id) not in prefixes:
+        prefixes.append(question_prefix(from_id))
+    return ", ".join(prefixes)
+
+
+def build_graph(practices: list[dict[str, Any]]) -> bytes:
+    """Build a packed adjacency section; node N is practices[N]."""
+    by_id: dict[str, int] = {}
+    by_prefix: dict[str, list[int]] = {}
+    for doc, p in enumerate(practices):
+        by_id.setdefault(p.get("id", ""), doc)
+        by_prefix.setdefault(question_prefix(p.get("id", "")), []).append(doc)
+
+    edges: list[dict[int, int]] = [{} for _ in practices]
+    dangling = 0
+
+    def link(source: int, target: int, out_flag: int, in_flag: int) -> None:
+        if source != target:
+            edges[source][target] = edges[source].get(target, 0) | out_flag
+            edges[target][source] = edges[target].get(source, 0) | in_flag
+
+    for doc, p in enumerate(practices):
+        for ref in p.get("relatedIds") or []:
+            if ref in by_id:
+                link(doc, by_id[ref], OUT, IN)
+            elif "-" not in ref and ref in by_prefix:
+                for target in by_prefix[ref]:
+                    link(doc, target, OUT_PREFIX, IN_PREFIX)
+            else:
+                dangling += 1
+
+    offsets = array("I", [0])
+    targets = array("I")
+    flags = array("B")
+    for adjacent in edges:
+        for target in sorted(adjacent):
+            targets.append(target)
+            flags.append(adjacent[target])
+        offsets.append(len(targets))
+
+    meta = {"nodes": len(practices), "edges": len(targets), "dangling": dangling}
+    return pack_section(meta, {"offsets": offsets, "targets": targets, "flags": flags})
+
+
+class RelatedGraph:
+    """Traversal view over a packed adjacency (bytes or a snapshot section)."""
+
+    def __init__(self, buf: bytes | memoryview) -> None:
+        self.meta, arrays = unpack_section(memoryview(buf))
+        self._offsets = arrays["offsets"]
+        self._targets = arrays["targets"]
+        self._flags = arrays["flags"]
+
+    def neighbors(self, doc: int) -> Iterator[tuple[int, int]]:
+        """Yield (target, flags) for every edge of doc, by target."""
+        start, end = self._offsets[doc], self._offsets[doc + 1]
+        return zip(self._targets[start:end], self._flags[start:end])
+
+    def bfs(
+        self, start: int, depth: int, key: Callable[[int], Any] | None = None
+    ) -> list[Neighbor]:
+        """Breadth-first neighborhood of start up to depth hops.
+
+        Returns the start (hop 0, no parent) followed by every practice
+        reached, each with the hop it was first reached at, the practice it
+        was reached from and the flags of that edge. key orders each node's
+        edges (e.g. by practice ID) so the traversal does not depend on node
+        numbering; without it, node order is used.
+        """
+        reached = [Neighbor(start, 0, None, 0)]
+        seen = {start}
+        frontier = [start]
+        for hop in range(1, depth + 1):
+            next_frontier = []
+            for doc in frontier:
+                edges = self.neighbors(doc)
+                if key:
+                    edges = sorted(edges, key=lambda edge: key(edge[0]))
+                for target, flags in edges:
+                    if target not in seen:
+                        seen.add(target)
+                        reached.append(Neighbor(target, hop, doc, flags))
+                        next_frontier.append(target)
+            frontier = next_frontier
+        return reached
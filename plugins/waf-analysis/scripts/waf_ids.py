@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Persistent ID -> source byte range index for waf_query.py detail lookups.
+
+generate_data.py records, for every practice ID, DevOps capability code
+(DL.CI) and indicator / anti-pattern / metric ID (DL.CI.1, DL.CI-AP1,
+DL.CI-M1), the source JSON file and the byte range of its object. A lookup
+hashes the ID into an open-addressing table read straight from the
+memory-mapped index, checks only the one source file it points at, and
+decodes only that record's bytes.
+
+Layout:
+
+    MAGIC | u32 version | u32 header length | header JSON | slots | keys
+
+The header lists the indexed files with their size, mtime and sha1. Each slot
+is SLOT_WORDS u32 values: key offset, key length, file, start, end, kind,
+parent key offset, parent key length. Keys are upper-cased UTF-8 in the keys
+blob; an empty slot has key length 0.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import sys
+import zlib
+from array import array
+from collections import namedtuple
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Any, Callable
+
+MAGIC = b"WAFIDS\x00\x00"
+VERSION = 1
+SLOT_WORDS = 8
+
+KINDS = ("practice", "capability", "indicator", "antiPattern", "metric")
+_ITEM_KINDS = {"indicators": "indicator", "antiPatterns": "antiPattern", "metrics": "metric"}
+
+_decoder = json.JSONDecoder()
+
+
+class Entry(namedtuple("Entry", "kind file start end parent")):
+    """Location of one indexed record.
+
+    file is relative to the data directory and start:end is the record's
+    byte range in it; parent is the capability code of a DevOps item.
+    """
+
+    __slots__ = ()
+
+
+def _skip_ws(text: str, pos: int) -> int:
+    while text[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+
+def _elements(text: str, pos: int):
+    """Yield (start, end) character spans of the array starting at text[pos]."""
+    pos = _skip_ws(text, pos + 1)
+    while text[pos] != "]":
+        _, end = _decoder.raw_decode(text, pos)
+        yield pos, end
+        pos = _skip_ws(text, end)
+        if text[pos] == ",":
+            pos = _skip_ws(text, pos + 1)
+
+
+def _members(text: str, pos: int):
+    """Yield (key, start, end) for each member of the object at text[pos]."""
+    pos = _skip_ws(text, pos + 1)
+    while text[pos] != "}":
+        key, pos = _decoder.raw_decode(text, pos)
+        pos = _skip_ws(text, _skip_ws(text, pos) + 1)
+        _, end = _decoder.raw_decode(text, pos)
+        yield key, pos, end
+        pos = _skip_ws(text, end)
+        if text[pos] == ",":
+            pos = _skip_ws(text, pos + 1)
+
+
+def _scan_file(text: str) -> list[tuple[str, str, int, int, str | None]]:
+    """Return (key, kind, start, end, parent) character spans in one source file.
+
+    Practice files are arrays of practices; DevOps files are one capability
+    object whose indicators, anti-patterns and metrics are indexed too.
+    """
+    spans = []
+    pos = _skip_ws(text, 0)
+    if text[pos] == "[":
+        for start, end in _elements(text, pos):
+            record = json.loads(text[start:end])
+            spans.append((record.get("id", ""), "practice", start, end, None))
+        return spans
+
+    _, end = _decoder.raw_decode(text, pos)
+    capability = json.loads(text[pos:end])
+    code = f"{capability.get('sagaCode', '')}.{capability.get('capabilityCode', '')}"
+    spans.append((code, "capability", pos, end, None))
+    for key, start, stop in _members(text, pos):
+        if key in _ITEM_KINDS and text[start] == "[":
+            for item_start, item_end in _elements(text, start):
+                item = json.loads(text[item_start:item_end])
+                spans.append((item.get("id", ""), _ITEM_KINDS[key], item_start, item_end, code))
+    return spans
+
+
+def _file_digest(data: bytes) -> str:
+    import hashlib
+
+    return hashlib.sha1(data).hexdigest()
+
+
+def build_id_index(
+    path: Path,
+    data_dir: Path,
+    files: list[Path],
+    read: Callable[[Path], bytes] | None = None,
+) -> dict[str, int]:
+    """Index every record in files (relative to data_dir) and write path.
+
+    read returns a file's contents, so callers holding them can skip the disk.
+    """
+    header_files = []
+    entries = []
+    for file_index, filepath in enumerate(files):
+        data = read(filepath) if read else filepath.read_bytes()
+        st = filepath.stat()
+        rel = filepath.relative_to(data_dir).as_posix()
+        header_files.append([rel, st.st_size, st.st_mtime_ns, _file_digest(data)])
+
+        text = data.decode("utf-8")
+        # Convert character spans to byte offsets incrementally.
+        char_pos = byte_pos = 0
+        for key, kind, start, end, parent in sorted(
+            _scan_file(text), key=lambda span: span[2]
+        ):
+            byte_pos += len(text[char_pos:start].encode("utf-8"))
+            byte_start, char_pos = byte_pos, start
+            byte_end = byte_start + len(text[start:end].encode("utf-8"))
+            entries.append((key.upper(), kind, file_index, byte_start, byte_end, parent))
+
+    slot_count = 1 << max(4, (2 * len(entries) - 1).bit_length())
+    slots = array("I", [0] * (slot_count * SLOT_WORDS))
+    keys = bytearray()
+    key_offsets: dict[str, tuple[int, int]] = {}
+
+    def intern_key(key: str) -> tuple[int, int]:
+        if key not in key_offsets:
+            encoded = key.encode("utf-8")
+            key_offsets[key] = (len(keys), len(encoded))
+            keys.extend(encoded)
+        return key_offsets[key]
+
+    indexed = duplicates = 0
+    for key, kind, file_index, start, end, parent in entries:
+        if not key:
+            continue
+        encoded = key.encode("utf-8")
+        slot = zlib.crc32(encoded) & (slot_count - 1)
+        while slots[slot * SLOT_WORDS + 1]:
+            other = slots[slot * SLOT_WORDS : slot * SLOT_WORDS + 2]
+            if bytes(keys[other[0] : other[0] + other[1]]) == encoded:
+                break
+            slot = (slot + 1) & (slot_count - 1)
+        if slots[slot * SLOT_WORDS + 1]:
+            duplicates += 1
+            continue
+        parent_off, parent_len = intern_key(parent.upper()) if parent else (0, 0)
+        key_off, key_len = intern_key(key)
+        slots[slot * SLOT_WORDS : (slot + 1) * SLOT_WORDS] = array(
+            "I",
+            [key_off, key_len, file_index, start, end, KINDS.index(kind), parent_off, parent_len],
+        )
+        indexed += 1
+
+    header = {
+        "byteorder": sys.byteorder,
+        "files": header_files,
+        "slots": slot_count,
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-len(header_bytes) % 4)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(VERSION.to_bytes(4, "little"))
+        f.write(len(header_bytes).to_bytes(4, "little"))
+        f.write(header_bytes)
+        f.write(slots.tobytes())
+        f.write(keys)
+    os.replace(tmp, path)
+
+    return {
+        "ids": indexed,
+        "duplicates": duplicates,
+        "bytes": path.stat().st_size,
+    }
+
+
+class IdIndex:
+    """Memory-mapped ID index; lookups touch one slot chain and one file."""
+
+    def __init__(self, path: str | Path, data_dir: str | Path) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.nbytes = len(self._mmap)
+        buf = memoryview(self._mmap)
+        if bytes(buf[: len(MAGIC)]) != MAGIC:
+            raise ValueError(f"Not a WAF ID index: {path}")
+        pos = len(MAGIC)
+        version = int.from_bytes(buf[pos : pos + 4], "little")
+        header_len = int.from_bytes(buf[pos + 4 : pos + 8], "little")
+        if version != VERSION:
+            raise ValueError(f"Unsupported ID index version {version}: {path}")
+        pos += 8
+        self.header = json.loads(bytes(buf[pos : pos + header_len]))
+        if self.header["byteorder"] != sys.byteorder:
+            raise ValueError(f"ID index byte order mismatch: {path}")
+        pos += header_len
+        slot_bytes = self.header["slots"] * SLOT_WORDS * 4
+        self._slots = buf[pos : pos + slot_bytes].cast("I")
+        self._keys = buf[pos + slot_bytes :]
+        self._files = {f[0]: f for f in self.header["files"]}
+        self._data_dir = data_dir
+
+    def _key(self, offset: int, length: int) -> str:
+        return str(self._keys[offset : offset + length], "utf-8")
+
+    def get(self, record_id: str) -> Entry | None:
+        """Return the location of record_id (case-insensitive), or None."""
+        encoded = record_id.upper().encode("utf-8")
+        mask = self.header["slots"] - 1
+        slot = zlib.crc32(encoded) & mask
+        while True:
+            words = self._slots[slot * SLOT_WORDS : (slot + 1) * SLOT_WORDS]
+            if not words[1]:
+                return None
+            if self._keys[words[0] : words[0] + words[1]] == encoded:
+                return Entry(
+                    kind=KINDS[words[5]],
+                    file=self.header["files"][words[2]][0],
+                    start=words[3],
+                    end=words[4],
+                    parent=self._key(words[6], words[7]) if words[7] else None,
+                )
+            slot = (slot + 1) & mask
+
+    def _file_fresh(self, entry: Entry, filepath: str) -> bool:
+        _, size, mtime_ns, digest = self._files[entry.file]
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return False
+        if st.st_size != size:
+            return False
+        if st.st_mtime_ns == mtime_ns:
+            return True
+        with open(filepath, "rb") as f:
+            return _file_digest(f.read()) == digest
+
+    def read(self, entry: Entry) -> dict[str, Any] | None:
+        """Decode the record at entry, or None if its source file changed."""
+        filepath = os.path.join(self._data_dir, entry.file)
+        if not self._file_fresh(entry, filepath):
+            return None
+        with open(filepath, "rb") as f:
+            f.seek(entry.start)
+            return json.loads(f.read(entry.end - entry.start))
+
+
+def open_id_index(path: str | Path, data_dir: str | Path) -> IdIndex | None:
+    """Open the ID index at path, or None if it is missing or unreadable."""
+    if os.environ.get("WAF_QUERY_NO_SNAPSHOT") or not os.path.exists(path):
+        return None
+    try:
+        return IdIndex(path, data_dir)
+    except (OSError, ValueError, KeyError):
+        return None
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Portfolio risk scoring: many workloads against the practice corpus at once.
+
+A workload lists the lenses it uses and the practice IDs it has addressed.
+Framework practices apply to every workload, lens practices to the workloads
+using that lens. A workload's risk score is the risk-weighted share of its
+applicable practices it has not addressed: 0 when everything is addressed, 1
+when nothing is. Scores are reported overall, per pillar and per lens.
+
+Workloads are scored in chunks as matrices over the practices:
+
+    applicable  workloads x practices, lens selection @ lens incidence
+    gaps        applicable and not addressed
+    scores      (gaps * weights) @ pillar (or lens) incidence, divided by
+                (applicable * weights) @ the same incidence
+
+so a chunk costs a few matrix products regardless of how many workloads it
+holds. The top unaddressed HIGH-risk practices of each workload are ranked by
+how many other practices reference them in relatedIds (most referenced
+first, then corpus order). NumPy is only needed by this module, which the
+score subcommand imports on use.
+"""
+
+from typing import Any
+
+import numpy as np
+
+
+class ScoreModel:
+    """Practice-side matrices shared by every chunk of workloads.
+
+    groups are (source, pillar key, practices) in corpus order; sources and
+    pillars give the score columns.
+    """
+
+    def __init__(
+        self,
+        groups: list[tuple[str, str, list[dict[str, Any]]]],
+        sources: list[str],
+        pillars: list[str],
+        weights: dict[str, float],
+    ) -> None:
+        self.sources = sources
+        self.pillars = pillars
+        self.practices = [p for _, _, group in groups for p in group]
+        self.columns = {p["id"].upper(): i for i, p in enumerate(self.practices)}
+        n = len(self.practices)
+        self.weights = np.zeros(n, dtype=np.float32)
+        self.lens_incidence = np.zeros((len(sources), n), dtype=np.float32)
+        self.pillar_incidence = np.zeros((n, len(pillars)), dtype=np.float32)
+        self.high = np.zeros(n, dtype=bool)
+        self.lens_of: list[str] = []
+        self.pillar_of: list[str] = []
+        doc = 0
+        for source, pillar, group in groups:
+            for p in group:
+                self.lens_of.append(source)
+                self.pillar_of.append(pillar)
+                risk = p.get("risk", "")
+                self.weights[doc] = weights.get(risk, 0.0)
+                self.high[doc] = risk == "HIGH"
+                self.lens_incidence[sources.index(source), doc] = 1.0
+                self.pillar_incidence[doc, pillars.index(pillar)] = 1.0
+                doc += 1
+
+        referenced = np.zeros(n, dtype=np.int64)
+        for p in self.practices:
+            for ref in p.get("relatedIds") or []:
+                column = self.columns.get(ref.upper())
+                if column is not None:
+                    referenced[column] += 1
+        # Practice columns from most to least referenced, stable in corpus order
+        self.rank = np.argsort(-referenced, kind="stable")
+
+    def score(
+        self, lenses: np.ndarray, addressed: np.ndarray, top: int
+    ) -> dict[str, np.ndarray]:
+        """Score a chunk: lenses is workloads x sources, addressed workloads x practices.
+
+        Returns per-workload arrays: applicable and addressed counts, overall,
+        pillar and lens scores (NaN where nothing applies) and the columns of
+        the top unaddressed HIGH-risk practices (-1 padded), plus per practice
+        the number of workloads leaving it unaddressed if it is HIGH risk.
+        """
+        applicable = (lenses.astype(np.float32) @ self.lens_incidence) > 0
+        gaps = applicable & ~addressed
+        exposure = applicable * self.weights
+        open_risk = gaps * self.weights
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            overall = open_risk.sum(axis=1) / exposure.sum(axis=1)
+            pillars = (open_risk @ self.pillar_incidence) / (exposure @ self.pillar_incidence)
+            lens_scores = (open_risk @ self.lens_incidence.T) / (
+                exposure @ self.lens_incidence.T
+            )
+
+        high_gaps = (gaps & self.high)[:, self.rank]
+        top = min(top, high_gaps.shape[1])
+        order = np.argsort(~high_gaps, axis=1, kind="stable")[:, :top]
+        found = np.take_along_axis(high_gaps, order, axis=1)
+        top_columns = np.where(found, self.rank[order], -1)
+
+        return {
+            "applicable": applicable.sum(axis=1),
+            "addressed": (applicable & addressed).sum(axis=1),
+            "overall": overall,
+            "pillars": pillars,
+            "lenses": lens_scores,
+            "top": top_columns,
+            "high_gaps": (gaps & self.high).sum(axis=0),
+        }
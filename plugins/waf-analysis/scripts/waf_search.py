@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""Ranked full-text search over WAF practices (BM25F inverted index).
+
+generate_data.py builds the index over title, area, outcome and description
+and stores it as the "search" section of the corpus snapshot. waf_query.py
+builds the same index in memory when no fresh snapshot is available.
+
+Scoring is BM25F: per-field term frequencies are length-normalised, weighted
+by FIELD_WEIGHTS and summed before saturation. Weights and parameters are
+fixed at build time, so every posting stores its precomputed impact and a
+query only sums impacts for its terms. Terms are kept in a sorted dictionary
+searched by bisection over the memory-mapped section, so query cost depends
+on the postings of the query terms rather than on corpus size.
+
+Near-miss query terms are resolved against the term dictionary, not the
+documents: a trigram index maps each padded trigram to the terms containing
+it, and a term's fuzzy matches are the dictionary terms whose trigram sets
+have Jaccard similarity >= the threshold with it. Only terms sharing a
+trigram are ever compared, so fuzzy lookups grow with the vocabulary (which
+grows far slower than the corpus) rather than with an edit-distance scan.
+Unknown terms can also match as a split compound ("multiaccount" -> "multi"
+"account"), and prefix queries take the bisected range of terms starting with
+each query term. Each query term contributes its best-scoring match per
+document, weighted by similarity.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+import re
+from array import array
+
+from waf_snapshot import pack_section, unpack_section
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+
+FIELD_WEIGHTS = {"title": 3.0, "area": 2.0, "outcome": 1.0, "description": 1.0}
+K1 = 1.2
+B = 0.75
+SNIPPET_WIDTH = 200
+
+# Which query terms get fuzzy matches: none, only terms missing from the
+# dictionary, or all terms
+FUZZY_MODES = ("off", "missing", "all")
+FUZZY_THRESHOLD = 0.4
+MAX_FUZZY_TERMS = 5
+MAX_PREFIX_TERMS = 50
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have in into is it its of on or "
+    "that the their these this to was were will with you your".split()
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+", re.IGNORECASE)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase alphanumeric tokens of text, without stopwords."""
+    return [
+        t for t in (m.lower() for m in _TOKEN_RE.findall(text)) if t not in STOPWORDS
+    ]
+
+
+def _field_text(practice: dict[str, Any], field: str) -> str:
+    value = practice.get(field) or ""
+    return " ".join(value) if isinstance(value, list) else value
+
+
+def trigrams(term: str) -> set[int]:
+    """Distinct padded trigrams of an ASCII term, each packed into an int."""
+    padded = f"  {term} ".encode("ascii", "ignore")
+    return {
+        padded[i] << 16 | padded[i + 1] << 8 | padded[i + 2] for i in range(len(padded) - 2)
+    }
+
+
+def build_trigrams(terms: list[str]) -> dict[str, array]:
+    """Trigram -> term postings over a sorted term dictionary."""
+    grams: dict[int, list[int]] = {}
+    counts = array("B")
+    for index, term in enumerate(terms):
+        term_grams = trigrams(term)
+        counts.append(min(len(term_grams), 255))
+        for gram in term_grams:
+            grams.setdefault(gram, []).append(index)
+
+    gram_keys = array("I", sorted(grams))
+    gram_offsets = array("I", [0])
+    gram_terms = array("I")
+    for gram in gram_keys:
+        gram_terms.extend(grams[gram])
+        gram_offsets.append(len(gram_terms))
+    return {
+        "gram_keys": gram_keys,
+        "gram_offsets": gram_offsets,
+        "gram_terms": gram_terms,
+        "gram_counts": counts,
+    }
+
+
+def build_index(practices: list[dict[str, Any]]) -> bytes:
+    """Build a packed search index; document N is practices[N]."""
+    fields = list(FIELD_WEIGHTS)
+    lengths: list[list[int]] = [[] for _ in fields]
+    doc_terms: list[dict[str, list[int]]] = []
+
+    for p in practices:
+        terms: dict[str, list[int]] = {}
+        for fi, field in enumerate(fields):
+            tokens = tokenize(_field_text(p, field))
+            lengths[fi].append(len(tokens))
+            for token in tokens:
+                terms.setdefault(token, [0] * len(fields))[fi] += 1
+        doc_terms.append(terms)
+
+    n_docs = len(practices)
+    avg = [(sum(col) / n_docs if n_docs else 0.0) or 1.0 for col in lengths]
+    weights = list(FIELD_WEIGHTS.values())
+
+    postings: dict[str, list[tuple[int, float]]] = {}
+    for doc, terms in enumerate(doc_terms):
+        for term, tf in terms.items():
+            weighted = sum(
+                weights[fi] * tf[fi] / (1 - B + B * lengths[fi][doc] / avg[fi])
+                for fi in range(len(fields))
+                if tf[fi]
+            )
+            postings.setdefault(term, []).append((doc, weighted))
+
+    term_offsets = array("I", [0])
+    term_blob = bytearray()
+    post_offsets = array("I", [0])
+    docs = array("I")
+    impacts = array("f")
+    for term in sorted(postings):
+        term_blob += term.encode("utf-8")
+        term_offsets.append(len(term_blob))
+        plist = postings[term]
+        idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+        for doc, weighted in plist:
+            docs.append(doc)
+            impacts.append(idf * weighted * (K1 + 1) / (K1 + weighted))
+        post_offsets.append(len(docs))
+
+    meta = {"docs": n_docs, "terms": len(postings), "fields": FIELD_WEIGHTS}
+    meta.update(k1=K1, b=B)
+    return pack_section(
+        meta,
+        {
+            "term_offsets": term_offsets,
+            "terms": term_blob,
+            "post_offsets": post_offsets,
+            "docs": docs,
+            "impacts": impacts,
+            **build_trigrams(sorted(postings)),
+        },
+    )
+
+
+def _rank_key(item: tuple[int, float]) -> tuple[float, int]:
+    return (-item[1], item[0])
+
+
+class SearchIndex:
+    """Query view over a packed search index (bytes or a snapshot section)."""
+
+    def __init__(self, buf: bytes | memoryview) -> None:
+        self.meta, arrays = unpack_section(memoryview(buf))
+        self._term_offsets = arrays["term_offsets"]
+        self._terms = arrays["terms"]
+        self._post_offsets = arrays["post_offsets"]
+        self._docs = arrays["docs"]
+        self._impacts = arrays["impacts"]
+        self._grams = arrays if "gram_keys" in arrays else None
+
+    def _term(self, index: int) -> bytes:
+        return bytes(self._terms[self._term_offsets[index] : self._term_offsets[index + 1]])
+
+    def _bisect(self, key: bytes) -> int:
+        lo, hi = 0, self.meta["terms"]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, term: str) -> int | None:
+        """Return the dictionary index of term, or None if it never occurs."""
+        key = term.encode("utf-8")
+        index = self._bisect(key)
+        if index < self.meta["terms"] and self._term(index) == key:
+            return index
+        return None
+
+    def mask(self, ranges: list[range] | None) -> bytearray | None:
+        """Document mask (one byte per document) for ranges; None for all."""
+        if ranges is None:
+            return None
+        mask = bytearray(self.meta["docs"])
+        for r in ranges:
+            mask[r.start : r.stop] = b"\x01" * len(r)
+        return mask
+
+    def _occurs(self, index: int | None, mask: bytearray | None) -> bool:
+        if index is None or mask is None:
+            return index is not None
+        start, end = self._post_offsets[index], self._post_offsets[index + 1]
+        return any(mask[doc] for doc in self._docs[start:end])
+
+    def _frequency(self, index: int) -> int:
+        return self._post_offsets[index + 1] - self._post_offsets[index]
+
+    def prefix_terms(
+        self, prefix: str, limit: int = MAX_PREFIX_TERMS, mask: bytearray | None = None
+    ) -> list[str]:
+        """Dictionary terms starting with prefix, the limit most frequent.
+
+        mask (see mask()) keeps only terms occurring in the masked documents.
+        """
+        key = prefix.encode("utf-8")
+        matches = []
+        index = self._bisect(key)
+        while index < self.meta["terms"] and self._term(index).startswith(key):
+            if self._occurs(index, mask):
+                matches.append(index)
+            index += 1
+        matches = heapq.nsmallest(limit, matches, key=lambda i: (-self._frequency(i), i))
+        return [self._term(i).decode("utf-8") for i in sorted(matches)]
+
+    def _trigram_arrays(self) -> dict[str, Any]:
+        # Indexes written before trigrams were added: build them from the terms
+        if self._grams is None:
+            terms = [self._term(i).decode("utf-8") for i in range(self.meta["terms"])]
+            self._grams = build_trigrams(terms)
+        return self._grams
+
+    def similar_terms(
+        self,
+        term: str,
+        threshold: float = FUZZY_THRESHOLD,
+        limit: int = MAX_FUZZY_TERMS,
+        mask: bytearray | None = None,
+    ) -> list[tuple[str, float]]:
+        """Dictionary terms whose trigram Jaccard similarity to term is >= threshold.
+
+        Returns up to limit (term, similarity) pairs, most similar first.
+        mask (see mask()) keeps only terms occurring in the masked documents.
+        """
+        grams = self._trigram_arrays()
+        keys, offsets = grams["gram_keys"], grams["gram_offsets"]
+        postings, counts = grams["gram_terms"], grams["gram_counts"]
+        query = trigrams(term)
+        shared: dict[int, int] = {}
+        for gram in query:
+            slot = bisect.bisect_left(keys, gram)
+            if slot < len(keys) and keys[slot] == gram:
+                for index in postings[offsets[slot] : offsets[slot + 1]]:
+                    shared[index] = shared.get(index, 0) + 1
+
+        similar = []
+        for index, common in shared.items():
+            score = common / (len(query) + counts[index] - common)
+            if score >= threshold and self._occurs(index, mask):
+                similar.append((index, score))
+        similar = heapq.nsmallest(limit, similar, key=lambda item: (-item[1], item[0]))
+        return [(self._term(i).decode("utf-8"), round(score, 4)) for i, score in similar]
+
+    def split_compound(self, term: str, mask: bytearray | None = None) -> list[str] | None:
+        """Split term into two dictionary terms ("multiaccount"), if possible."""
+        for i in range(2, len(term) - 1):
+            if self._occurs(self.lookup(term[:i]), mask) and self._occurs(
+                self.lookup(term[i:]), mask
+            ):
+                return [term[:i], term[i:]]
+        return None
+
+    def expand(
+        self,
+        query: str,
+        fuzzy: str = "off",
+        prefix: bool = False,
+        threshold: float = FUZZY_THRESHOLD,
+        ranges: list[range] | None = None,
+    ) -> list[tuple[str, list[tuple[str, float]]]]:
+        """Resolve query into (query term, alternatives) groups for search().
+
+        Alternatives are (dictionary term, weight) pairs: the term itself, its
+        completions when prefix is set, and its fuzzy matches (weighted by
+        similarity) per fuzzy mode. A missing term that splits into two
+        dictionary terms becomes one group per part. With ranges, a term only
+        counts as present if it occurs in those documents.
+        """
+        mask = self.mask(ranges)
+        groups = []
+        for token in dict.fromkeys(tokenize(query)):
+            known = self._occurs(self.lookup(token), mask)
+            group = {token: 1.0} if known else {}
+            if prefix:
+                group.update((term, 1.0) for term in self.prefix_terms(token, mask=mask))
+            if fuzzy == "all" or (fuzzy == "missing" and not group):
+                parts = None if group else self.split_compound(token, mask)
+                if parts:
+                    groups.extend((token, [(part, 1.0)]) for part in parts)
+                    continue
+                for term, score in self.similar_terms(token, threshold, mask=mask):
+                    group.setdefault(term, score)
+            groups.append((token, list(group.items()) or [(token, 1.0)]))
+        return groups
+
+    def postings(self, term: str) -> tuple[memoryview, memoryview]:
+        """Return (doc ids, impacts) for term; both empty if it never occurs."""
+        index = self.lookup(term)
+        if index is None:
+            return self._docs[:0], self._impacts[:0]
+        start, end = self._post_offsets[index], self._post_offsets[index + 1]
+        return self._docs[start:end], self._impacts[start:end]
+
+    def search(
+        self,
+        query: str,
+        limit: int | None = None,
+        ranges: list[range] | None = None,
+        terms: list[tuple[str, list[tuple[str, float]]]] | None = None,
+    ) -> tuple[int, list[tuple[int, float]]]:
+        """Score documents for query.
+
+        Returns (number of matching documents, [(doc, score)] best first),
+        keeping at most limit results. ranges restricts matches to the given
+        document ranges. terms is the expand() result to score instead of the
+        query's exact terms; a document scores each group's best match.
+        """
+        mask = self.mask(ranges)
+        if terms is None:
+            terms = [(term, [(term, 1.0)]) for term in dict.fromkeys(tokenize(query))]
+
+        scores: dict[int, float] = {}
+        for _, group in terms:
+            best: dict[int, float] = {}
+            for term, weight in group:
+                docs, impacts = self.postings(term)
+                for doc, impact in zip(docs, impacts):
+                    if (mask is None or mask[doc]) and impact * weight > best.get(doc, 0.0):
+                        best[doc] = impact * weight
+            for doc, impact in best.items():
+                scores[doc] = scores.get(doc, 0.0) + impact
+
+        if limit is None:
+            ranked = sorted(scores.items(), key=_rank_key)
+        else:
+            ranked = heapq.nsmallest(limit, scores.items(), key=_rank_key)
+        return len(scores), ranked
+
+
+def highlight(
+    practice: dict[str, Any],
+    query: str,
+    width: int = SNIPPET_WIDTH,
+    terms: set[str] | None = None,
+) -> tuple[str, list[dict[str, Any]]]:
+    """Locate query terms in a practice and build a snippet around them.
+
+    Returns (snippet, matches) where matches lists {"field", "start", "end"}
+    character offsets into the original field text (list fields such as area
+    are joined with single spaces). terms overrides the terms to locate (e.g.
+    fuzzy matches). The snippet is the title when it matches, otherwise a
+    window of the description around its first match.
+    """
+    if terms is None:
+        terms = set(tokenize(query))
+    matches = []
+    for field in FIELD_WEIGHTS:
+        for m in _TOKEN_RE.finditer(_field_text(practice, field)):
+            if m.group().lower() in terms:
+                matches.append({"field": field, "start": m.start(), "end": m.end()})
+
+    if any(m["field"] == "title" for m in matches):
+        return practice.get("title", ""), matches
+
+    description = practice.get("description", "")
+    first = next((m["start"] for m in matches if m["field"] == "description"), 0)
+    start = max(0, first - width // 4)
+    if start:
+        space = description.rfind(" ", 0, start)
+        start = space + 1 if space >= 0 else start
+    end = min(len(description), start + width)
+    snippet = description[start:end]
+    if start:
+        snippet = "..." + snippet
+    if end < len(description):
+        snippet += "..."
+    return snippet, matches
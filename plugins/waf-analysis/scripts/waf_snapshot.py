@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""Binary corpus snapshot shared by generate_data.py and waf_query.py.
+
+The snapshot packs every pillar, lens and DevOps record into one file that
+waf_query.py memory-maps instead of parsing ~90 source JSON files per call.
+
+Layout:
+
+    MAGIC | u32 version | u32 header length | header JSON | blocks | sections
+
+The header JSON records the interpreter the blobs were written with, the
+source fingerprint used for freshness checks, one entry per record group
+(framework pillar, lens x pillar, or DevOps saga) giving its global record
+range, and the offset/length of each named section. Records are marshalled in
+blocks of up to BLOCK_SIZE, so a point lookup decodes one block and a group
+scan decodes only that group's blocks. Built-in sections are "blocks" (block
+start/offset/length table) and "ids" (record ID -> global index); extra
+sections such as the search index, related-practice graph and facet bitsets
+are written with pack_section().
+
+Enumerated values (pillar, lens, risk, areas, saga codes, categories) are
+interned before marshalling, so each one is stored once per block and shared
+across the whole corpus once loaded.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import marshal
+import mmap
+import os
+import sys
+from array import array
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Any, Callable, Iterator
+
+MAGIC = b"WAFSNAP\x00"
+VERSION = 2
+BLOCK_SIZE = 64
+
+_INTERNED_FIELDS = ("pillar", "lens", "risk", "saga", "sagaCode", "category")
+
+
+def _source_files(data_dir: str | Path) -> dict[str, os.DirEntry]:
+    """Map relpath -> DirEntry for every corpus JSON file, excluding schemas."""
+    files = {}
+    pending = [("", str(data_dir))]
+    while pending:
+        prefix, directory = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    pending.append((f"{prefix}{entry.name}/", entry.path))
+                elif entry.name.endswith(".json") and entry.name != "schema.json":
+                    files[prefix + entry.name] = entry
+    return dict(sorted(files.items()))
+
+
+def _file_digest(path: str, read: Callable[[Path], bytes] | None = None) -> str:
+    import hashlib
+
+    if read is not None:
+        from pathlib import Path
+
+        return hashlib.sha1(read(Path(path))).hexdigest()
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def source_fingerprint(
+    data_dir: Path, read: Callable[[Path], bytes] | None = None
+) -> dict[str, list[Any]]:
+    """Fingerprint the source tree as {relpath: [size, mtime_ns, sha1]}.
+
+    read supplies file contents already in memory instead of re-reading them.
+    """
+    fingerprint = {}
+    for rel, entry in _source_files(data_dir).items():
+        st = entry.stat()
+        fingerprint[rel] = [st.st_size, st.st_mtime_ns, _file_digest(entry.path, read)]
+    return fingerprint
+
+
+def source_signature(data_dir: str | Path) -> tuple[tuple[str, int, int], ...]:
+    """Cheap stat-only signature of the source tree: (relpath, size, mtime_ns)."""
+    signature = []
+    for rel, entry in _source_files(data_dir).items():
+        st = entry.stat()
+        signature.append((rel, st.st_size, st.st_mtime_ns))
+    return tuple(signature)
+
+
+def is_fresh(fingerprint: dict[str, list[Any]], data_dir: str | Path) -> bool:
+    """Check a recorded fingerprint against the current source tree.
+
+    Size and mtime are compared first; a file whose mtime moved but whose size
+    did not (e.g. after a checkout) is re-hashed before being declared stale.
+    """
+    files = _source_files(data_dir)
+    if files.keys() != fingerprint.keys():
+        return False
+    for rel, entry in files.items():
+        size, mtime_ns, digest = fingerprint[rel]
+        st = entry.stat()
+        if st.st_size != size:
+            return False
+        if st.st_mtime_ns != mtime_ns and _file_digest(entry.path) != digest:
+            return False
+    return True
+
+
+def _intern(record: Any) -> Any:
+    """Intern enumerated string values in place so marshal shares them."""
+    if isinstance(record, list):
+        for item in record:
+            _intern(item)
+    elif isinstance(record, dict):
+        for key, value in record.items():
+            if key in _INTERNED_FIELDS and isinstance(value, str):
+                record[key] = sys.intern(value)
+            elif key == "area" and isinstance(value, list):
+                record[key] = [sys.intern(a) for a in value]
+            elif isinstance(value, list):
+                _intern(value)
+    return record
+
+
+def pack_section(meta: dict[str, Any], arrays: dict[str, array | bytes]) -> bytes:
+    """Pack JSON metadata and named typed arrays into one section blob.
+
+    Layout: u32 metadata length | metadata JSON | 4-byte aligned arrays. Raw
+    bytes are stored with typecode "B".
+    """
+    meta = dict(meta, arrays={})
+    body = bytearray()
+    for name, values in arrays.items():
+        typecode = values.typecode if isinstance(values, array) else "B"
+        data = values.tobytes() if isinstance(values, array) else bytes(values)
+        meta["arrays"][name] = [typecode, len(body), len(data)]
+        body += data + b"\0" * (-len(data) % 4)
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    meta_bytes += b" " * (-len(meta_bytes) % 4)
+    return len(meta_bytes).to_bytes(4, "little") + meta_bytes + bytes(body)
+
+
+def unpack_section(buf: memoryview) -> tuple[dict[str, Any], dict[str, memoryview]]:
+    """Inverse of pack_section; arrays are zero-copy views cast to their type."""
+    meta_len = int.from_bytes(buf[:4], "little")
+    meta = json.loads(bytes(buf[4 : 4 + meta_len]))
+    base = 4 + meta_len
+    arrays = {}
+    for name, (typecode, offset, length) in meta["arrays"].items():
+        view = buf[base + offset : base + offset + length]
+        arrays[name] = view if typecode == "B" else view.cast(typecode)
+    return meta, arrays
+
+
+def write_snapshot(
+    path: Path,
+    data_dir: Path,
+    practice_groups: list[tuple[str, str, list[dict[str, Any]]]],
+    capability_groups: list[tuple[str, list[dict[str, Any]]]],
+    sections: dict[str, bytes] | None = None,
+    read: Callable[[Path], bytes] | None = None,
+) -> dict[str, int]:
+    """Write a snapshot of the corpus to path.
+
+    practice_groups holds (source, pillar key, practices) tuples where source is
+    "framework" or a lens key; capability_groups holds (saga code, capabilities).
+    Group order is preserved and records are numbered globally in that order,
+    practices first, so extra sections (search index, ...) can refer to
+    practices by position. sections maps names to prebuilt section blobs;
+    read is passed on to source_fingerprint.
+    """
+    groups = []
+    blocks = array("I")
+    blobs = []
+    ids: dict[str, int] = {}
+    offset = 0
+    record = 0
+
+    tagged = [("practice", s, p, records) for s, p, records in practice_groups]
+    tagged += [("capability", s, "", records) for s, records in capability_groups]
+
+    for kind, source, pillar, records in tagged:
+        groups.append([kind, source, pillar, record, record + len(records)])
+        for start in range(0, len(records), BLOCK_SIZE):
+            block = _intern(records[start : start + BLOCK_SIZE])
+            for r in block:
+                if kind == "practice":
+                    key = r.get("id", "")
+                else:
+                    key = f"{r.get('sagaCode', '')}.{r.get('capabilityCode', '')}"
+                ids.setdefault(key, record)
+                record += 1
+            blob = marshal.dumps(block)
+            blocks.extend((record - len(block), offset, len(blob)))
+            blobs.append(blob)
+            offset += len(blob)
+
+    tail = {"blocks": blocks.tobytes(), "ids": marshal.dumps(ids)}
+    tail.update(sections or {})
+    layout = {}
+    for name, blob in tail.items():
+        offset += -offset % 4
+        layout[name] = [offset, len(blob)]
+        offset += len(blob)
+
+    header = {
+        "python": list(sys.version_info[:2]),
+        "marshal": marshal.version,
+        "fingerprint": source_fingerprint(data_dir, read),
+        "groups": groups,
+        "sections": layout,
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-len(header_bytes) % 4)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(VERSION.to_bytes(4, "little"))
+        f.write(len(header_bytes).to_bytes(4, "little"))
+        f.write(header_bytes)
+        written = 0
+        for blob in blobs:
+            f.write(blob)
+            written += len(blob)
+        for name, blob in tail.items():
+            f.write(b"\0" * (layout[name][0] - written))
+            f.write(blob)
+            written = layout[name][0] + len(blob)
+    os.replace(tmp, path)
+
+    return {
+        "groups": len(groups),
+        "records": record,
+        "bytes": path.stat().st_size,
+    }
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a corpus snapshot."""
+
+    def __init__(self, path: str | Path) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.nbytes = len(self._mmap)
+        buf = memoryview(self._mmap)
+        if bytes(buf[: len(MAGIC)]) != MAGIC:
+            raise ValueError(f"Not a WAF snapshot: {path}")
+        pos = len(MAGIC)
+        version = int.from_bytes(buf[pos : pos + 4], "little")
+        header_len = int.from_bytes(buf[pos + 4 : pos + 8], "little")
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}: {path}")
+        pos += 8
+        self.header = json.loads(bytes(buf[pos : pos + header_len]))
+        if (
+            self.header["python"] != list(sys.version_info[:2])
+            or self.header["marshal"] != marshal.version
+        ):
+            raise ValueError(f"Snapshot written by another Python version: {path}")
+        self._base = pos + header_len
+        self._buf = buf
+        blocks = self.section("blocks").cast("I")
+        self._block_starts = blocks[0::3]
+        self._block_spans = blocks
+        self._blocks: dict[int, list[dict[str, Any]]] = {}
+        self._ids: dict[str, int] | None = None
+
+    def is_fresh(self, data_dir: str | Path) -> bool:
+        return is_fresh(self.header["fingerprint"], data_dir)
+
+    def section(self, name: str) -> memoryview | None:
+        """Return the raw bytes of a named section, or None if absent."""
+        if name not in self.header["sections"]:
+            return None
+        offset, length = self.header["sections"][name]
+        start = self._base + offset
+        return self._buf[start : start + length]
+
+    def _block(self, index: int) -> list[dict[str, Any]]:
+        if index not in self._blocks:
+            _, offset, length = self._block_spans[index * 3 : index * 3 + 3]
+            start = self._base + offset
+            self._blocks[index] = marshal.loads(self._buf[start : start + length])
+        return self._blocks[index]
+
+    def record(self, index: int) -> dict[str, Any]:
+        """Return the record with global index, decoding only its block."""
+        block = bisect.bisect_right(self._block_starts, index) - 1
+        return self._block(block)[index - self._block_starts[block]]
+
+    def _iter_records(self, start: int, end: int) -> Iterator[dict[str, Any]]:
+        block = bisect.bisect_right(self._block_starts, start) - 1
+        while start < end:
+            first = self._block_starts[block]
+            records = self._block(block)
+            yield from records[start - first : end - first]
+            start = first + len(records)
+            block += 1
+
+    def _records(self, start: int, end: int) -> list[dict[str, Any]]:
+        return list(self._iter_records(start, end))
+
+    def ranges(
+        self, kind: str, sources: list[str] | None = None, pillar: str | None = None
+    ) -> list[range]:
+        """Global record ranges for kind, filtered by sources (in order) and pillar."""
+        groups = [g for g in self.header["groups"] if g[0] == kind]
+        if sources is not None:
+            groups = [g for s in sources for g in groups if g[1] == s]
+        return [range(g[3], g[4]) for g in groups if not pillar or g[2] == pillar]
+
+    def practices(
+        self, sources: list[str] | None = None, pillar: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Return practices for the given sources (in order) and pillar key."""
+        practices = []
+        for r in self.ranges("practice", sources, pillar):
+            practices.extend(self._records(r.start, r.stop))
+        return practices
+
+    def iter_practices(
+        self, sources: list[str] | None = None, pillar: str | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """Like practices(), but decodes one block at a time as it is consumed."""
+        for r in self.ranges("practice", sources, pillar):
+            yield from self._iter_records(r.start, r.stop)
+
+    def capabilities(self, saga: str | None = None) -> list[dict[str, Any]]:
+        """Return DevOps capabilities, optionally for a single saga code."""
+        capabilities = []
+        for r in self.ranges("capability", [saga] if saga else None):
+            capabilities.extend(self._records(r.start, r.stop))
+        return capabilities
+
+    def index(self, record_id: str, kind: str = "practice") -> int | None:
+        """Return the global index of the record of kind with record_id."""
+        if self._ids is None:
+            self._ids = marshal.loads(self.section("ids"))
+        index = self._ids.get(record_id)
+        if index is None or not any(index in r for r in self.ranges(kind)):
+            return None
+        return index
+
+    def find(self, record_id: str, kind: str = "practice") -> dict[str, Any] | None:
+        """Return the record of kind with record_id, decoding only its block."""
+        index = self.index(record_id, kind)
+        return None if index is None else self.record(index)
+
+
+def open_snapshot(path: str | Path, data_dir: str | Path) -> Snapshot | None:
+    """Open the snapshot at path if it exists and matches data_dir, else None."""
+    if os.environ.get("WAF_QUERY_NO_SNAPSHOT") or not os.path.exists(path):
+        return None
+    try:
+        snapshot = Snapshot(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    return snapshot if snapshot.is_fresh(data_dir) else None
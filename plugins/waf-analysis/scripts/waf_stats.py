@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Corpus-wide statistics aggregated at generation time.
+
+generate_data.py counts the corpus once and stores the counts as the "stats"
+section of the corpus snapshot (and in waf.db); waf_query.py builds the same
+structure in memory when no fresh snapshot is available. Counts are kept per
+combination of facet values, as rows of:
+
+    practices   [lens, pillar, risk, practices, practices with relatedIds]
+    areas       [lens, pillar, risk, area, practices]
+    devops      [saga code, saga, capabilities, indicators, anti-patterns,
+                 metrics]
+
+Lens, pillar, risk and area use the index filter values (see waf_facets).
+`waf_query.py stats` sums the rows matching its filters, so its cost depends
+on the number of distinct combinations, not on the number of records.
+"""
+
+from typing import Any
+
+from waf_facets import facet_values
+from waf_snapshot import pack_section, unpack_section
+
+# Cross-tab column order; any other risk value follows these
+RISKS = ("HIGH", "MEDIUM", "LOW")
+
+
+def aggregate(
+    practice_groups: list[tuple[str, str, list[dict[str, Any]]]],
+    capability_groups: list[tuple[str, list[dict[str, Any]]]],
+) -> dict[str, Any]:
+    """Count (source, pillar key, practices) and (saga code, capabilities) groups."""
+    practices: dict[tuple[str, str, str], list[int]] = {}
+    areas: dict[tuple[str, str, str, str], int] = {}
+    for source, pillar, group in practice_groups:
+        for p in group:
+            values = facet_values(source, pillar, p)
+            risk = values["risk"][0] if values["risk"] else ""
+            counts = practices.setdefault((source, pillar, risk), [0, 0])
+            counts[0] += 1
+            counts[1] += bool(p.get("relatedIds"))
+            for area in values["area"]:
+                key = (source, pillar, risk, area)
+                areas[key] = areas.get(key, 0) + 1
+
+    devops = []
+    for code, capabilities in capability_groups:
+        devops.append(
+            [
+                code,
+                capabilities[0]["saga"] if capabilities else code,
+                len(capabilities),
+                sum(len(c.get("indicators", [])) for c in capabilities),
+                sum(len(c.get("antiPatterns", [])) for c in capabilities),
+                sum(len(c.get("metrics", [])) for c in capabilities),
+            ]
+        )
+
+    return {
+        "practices": [[*key, *counts] for key, counts in practices.items()],
+        "areas": [[*key, count] for key, count in areas.items()],
+        "devops": devops,
+    }
+
+
+def build_stats(
+    practice_groups: list[tuple[str, str, list[dict[str, Any]]]],
+    capability_groups: list[tuple[str, list[dict[str, Any]]]],
+) -> bytes:
+    """Build a packed stats section (see aggregate)."""
+    return pack_section(aggregate(practice_groups, capability_groups), {})
+
+
+def unpack_stats(buf: bytes | memoryview) -> dict[str, Any]:
+    """Inverse of build_stats."""
+    stats, _ = unpack_section(memoryview(buf))
+    del stats["arrays"]
+    return stats
+
+
+def summarize(
+    stats: dict[str, Any],
+    pillars: list[str] | None = None,
+    lenses: list[str] | None = None,
+    risks: list[str] | None = None,
+    sagas: list[str] | None = None,
+) -> dict[str, Any]:
+    """Sum the counts matching the filters (None or empty: no filter).
+
+    Returns totals, a pillar x lens cross-tab with per-risk counts (rows in
+    the order of the aggregated groups), practice counts per area (most
+    frequent first) and per-saga DevOps counts.
+    """
+
+    def wanted(value: str, allowed: list[str] | None) -> bool:
+        return not allowed or value in allowed
+
+    present = [row[2] for row in stats["practices"] if wanted(row[2], risks)]
+    columns = [*RISKS, *sorted(set(present) - set(RISKS))]
+    cells: dict[tuple[str, str], dict[str, Any]] = {}
+    total = related = 0
+    by_risk = dict.fromkeys(columns, 0)
+    for lens, pillar, risk, count, with_related in stats["practices"]:
+        if wanted(lens, lenses) and wanted(pillar, pillars) and wanted(risk, risks):
+            cell = cells.setdefault(
+                (pillar, lens),
+                {"risk": dict.fromkeys(columns, 0), "practices": 0, "withRelated": 0},
+            )
+            cell["risk"][risk] += count
+            cell["practices"] += count
+            cell["withRelated"] += with_related
+            by_risk[risk] += count
+            total += count
+            related += with_related
+
+    crosstab = [{"pillar": pillar, "lens": lens, **cell} for (pillar, lens), cell in cells.items()]
+
+    areas: dict[str, int] = {}
+    for lens, pillar, risk, area, count in stats["areas"]:
+        if wanted(lens, lenses) and wanted(pillar, pillars) and wanted(risk, risks):
+            areas[area] = areas.get(area, 0) + count
+
+    devops = [
+        {
+            "sagaCode": code,
+            "saga": saga,
+            "capabilities": capabilities,
+            "indicators": indicators,
+            "antiPatterns": anti_patterns,
+            "metrics": metrics,
+        }
+        for code, saga, capabilities, indicators, anti_patterns, metrics in stats["devops"]
+        if wanted(code, sagas)
+    ]
+
+    return {
+        "practices": total,
+        "withRelated": related,
+        "risk": by_risk,
+        "crosstab": crosstab,
+        "areas": dict(sorted(areas.items(), key=lambda item: (-item[1], item[0]))),
+        "devops": devops,
+    }
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Per-phase timing spans for waf_query.py.
+
+`waf_query.py --timings ...` (or WAF_QUERY_TRACE=1) records where a query
+spends its time and prints one JSON line to stderr when it finishes:
+
+    {"trace": {"command": "search", "total_ms": 41.2, "peak_rss_kb": 31744,
+               "spans": [{"name": "load.snapshot", "start_ms": 0.8, "ms": 0.3,
+                          "depth": 1, "bytes": 4529152}, ...]}}
+
+Spans are listed in the order they started; depth is their nesting level and
+start_ms is measured from the start of the trace. Loaders add the bytes they
+read and the records they parsed or scanned, filters the documents they
+selected, renderers the rows they printed. Rows are produced lazily while
+they are printed, so per-row work (snippets, record lookups) is part of the
+render span.
+
+Library callers wrap queries in tracing() and read the result from it:
+
+    with waf_trace.tracing() as trace:
+        waf_cli.query_search("encryption")
+    trace.report()
+
+The daemon records a trace for every request sent with --timings and returns
+it with the result. When no trace is active, span() hands out a shared no-op
+context, so instrumentation costs one function call.
+
+This module is imported on every cold start, so it avoids contextlib, and
+typing is only imported by type checkers.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+
+
+class _Span:
+    """Context manager timing one span of a trace."""
+
+    __slots__ = ("trace", "record", "start")
+
+    def __init__(self, trace: "Trace", record: dict[str, Any]) -> None:
+        self.trace = trace
+        self.record = record
+
+    def __enter__(self) -> dict[str, Any]:
+        self.start = time.perf_counter()
+        self.record["start_ms"] = round((self.start - self.trace.origin) * 1000, 3)
+        self.trace.depth += 1
+        return self.record
+
+    def __exit__(self, *exc: Any) -> None:
+        self.trace.depth -= 1
+        self.record["ms"] = round((time.perf_counter() - self.start) * 1000, 3)
+
+
+class _NoSpan:
+    """Span used while nothing is traced; attributes set on it are dropped."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> dict[str, Any]:
+        return {}
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Trace:
+    """Spans recorded since the trace started."""
+
+    def __init__(self, origin: float | None = None) -> None:
+        self.origin = time.perf_counter() if origin is None else origin
+        self.spans: list[dict[str, Any]] = []
+        self.depth = 0
+
+    def span(self, name: str, **attrs: Any) -> _Span:
+        """Time a block; the dict it yields takes extra attributes (counts, bytes)."""
+        record = {"name": name, "start_ms": 0.0, "ms": 0.0, "depth": self.depth, **attrs}
+        self.spans.append(record)
+        return _Span(self, record)
+
+    def add(self, name: str, start: float, end: float, **attrs: Any) -> None:
+        """Record a span measured elsewhere (perf_counter start and end)."""
+        self.spans.append(
+            {
+                "name": name,
+                "start_ms": round((start - self.origin) * 1000, 3),
+                "ms": round((end - start) * 1000, 3),
+                "depth": self.depth,
+                **attrs,
+            }
+        )
+
+    def report(self, **fields: Any) -> dict[str, Any]:
+        """The trace as a JSON-ready dict: fields, total time, peak RSS, spans."""
+        return {
+            **fields,
+            "total_ms": round((time.perf_counter() - self.origin) * 1000, 3),
+            "peak_rss_kb": peak_rss_kb(),
+            "spans": self.spans,
+        }
+
+
+_active: Trace | None = None
+
+
+def active() -> Trace | None:
+    """The trace being recorded, if any."""
+    return _active
+
+
+def span(name: str, **attrs: Any) -> "_Span | _NoSpan":
+    """Time a block in the active trace; a no-op when nothing is traced."""
+    if _active is None:
+        return _NO_SPAN
+    return _active.span(name, **attrs)
+
+
+class tracing:
+    """Record a trace for the duration of a with block.
+
+    Yields the Trace; the previously active trace (if any) is restored on
+    exit, so traces do not leak between daemon requests.
+    """
+
+    def __init__(self, origin: float | None = None) -> None:
+        self.trace = Trace(origin)
+
+    def __enter__(self) -> Trace:
+        global _active
+        self.previous, _active = _active, self.trace
+        return self.trace
+
+    def __exit__(self, *exc: Any) -> None:
+        global _active
+        _active = self.previous
+
+
+def enabled_by_env() -> bool:
+    """Whether WAF_QUERY_TRACE asks for a trace."""
+    return os.environ.get("WAF_QUERY_TRACE", "") not in ("", "0")
+
+
+def peak_rss_kb() -> int | None:
+    """Peak resident set size of this process in KB (None if unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def process_start() -> float | None:
+    """perf_counter() value at which this process started, where the OS says.
+
+    Linux reports the start time in clock ticks since boot (10 ms with the
+    usual 100 Hz), on the boot-time clock perf_counter is compared against.
+    """
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        since_start = time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+    return time.perf_counter() - max(since_start, 0.0)
+
+
+def emit(report: dict[str, Any], stream: Any = None) -> None:
+    """Write a trace report to stderr as one JSON line."""
+    import json
+
+    stream = sys.stderr if stream is None else stream
+    stream.write(json.dumps({"trace": report}) + "\n")
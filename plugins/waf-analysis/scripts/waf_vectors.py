@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Offline semantic vectors for WAF practices (TF-IDF + truncated SVD).
+
+generate_data.py embeds every practice with latent semantic analysis and
+writes two memory-mappable NumPy arrays next to the snapshot:
+
+    vectors.npy      float32 (practices x DIMS), L2-normalised, row N is the
+                     snapshot's practice N
+    projection.npy   float32 (terms x DIMS), row T is term T of the search
+                     index dictionary, scaled by its IDF
+
+A practice's text (the search fields, weighted by FIELD_WEIGHTS) becomes a
+sublinear TF-IDF vector; a truncated SVD of that matrix maps it to DIMS
+dimensions where practices that use related vocabulary end up close even
+when they share few exact words. Free text is folded into the same space
+by summing its terms' projection rows. Similarity is cosine, i.e. one
+matrix-vector product over the memory-mapped vectors, so a query stays in
+the milliseconds for tens of thousands of practices.
+
+The SVD is a seeded randomized SVD. Up to DENSE_LIMIT cells the TF-IDF
+matrix is held densely for BLAS products; beyond that it stays sparse, so
+building needs memory proportional to the non-zeros rather than practices x
+terms.
+Everything is computed locally; nothing is fetched. NumPy is only needed by
+this module, which generate_data.py and the similar/semantic subcommands
+import on use.
+"""
+
+import math
+import os
+import zlib
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from waf_search import FIELD_WEIGHTS, _field_text, tokenize
+
+DIMS = 128
+OVERSAMPLE = 10
+POWER_ITERATIONS = 4
+SEED = 0
+# Largest practices x terms matrix built densely (float32 cells)
+DENSE_LIMIT = 1 << 24
+
+VECTORS_FILE = "vectors.npy"
+PROJECTION_FILE = "projection.npy"
+
+
+def _term_counts(practice: dict[str, Any]) -> dict[str, float]:
+    counts: dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(_field_text(practice, field)):
+            counts[token] = counts.get(token, 0.0) + weight
+    return counts
+
+
+def _sparse_tfidf(
+    practices: list[dict[str, Any]],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Row-normalised TF-IDF matrix in CSR form: (indptr, indices, data, idf, rows)."""
+    doc_counts = [_term_counts(p) for p in practices]
+    vocabulary = sorted({term for counts in doc_counts for term in counts})
+    term_index = {term: i for i, term in enumerate(vocabulary)}
+
+    df = np.zeros(len(vocabulary))
+    indptr, indices, data = [0], [], []
+    for counts in doc_counts:
+        for term, count in counts.items():
+            df[term_index[term]] += 1
+            indices.append(term_index[term])
+            data.append(1.0 + math.log(count))
+        indptr.append(len(indices))
+
+    idf = np.log((1 + len(practices)) / (1 + df)) + 1.0
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    data = np.asarray(data) * idf[indices]
+    rows = np.repeat(np.arange(len(practices)), np.diff(indptr))
+    norms = np.sqrt(np.bincount(rows, weights=data**2, minlength=len(practices)))
+    data /= np.maximum(norms, 1e-12)[rows]
+    return indptr, indices, data, idf, rows
+
+
+def _randomized_svd(
+    shape: tuple[int, int], matmul: Callable, rmatmul: Callable, k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Top-k singular values and right singular vectors of a sparse matrix.
+
+    matmul(X) computes A @ X and rmatmul(Y) computes A.T @ Y.
+    """
+    rng = np.random.default_rng(SEED)
+    sample = min(k + OVERSAMPLE, min(shape))
+    q, _ = np.linalg.qr(matmul(rng.standard_normal((shape[1], sample))))
+    for _ in range(POWER_ITERATIONS):
+        z, _ = np.linalg.qr(rmatmul(q))
+        q, _ = np.linalg.qr(matmul(z))
+    _, s, vt = np.linalg.svd(rmatmul(q).T, full_matrices=False)
+    return s[:k], vt[:k].T
+
+
+def build_vectors(
+    practices: list[dict[str, Any]], dims: int = DIMS
+) -> tuple[np.ndarray, np.ndarray]:
+    """Embed practices; returns (vectors, projection) as float32 arrays."""
+    indptr, indices, data, idf, rows = _sparse_tfidf(practices)
+    shape = (len(practices), len(idf))
+
+    if shape[0] * shape[1] <= DENSE_LIMIT:
+        # Small enough to hold densely: BLAS beats any sparse product
+        dense = np.zeros(shape, dtype=np.float32)
+        dense[rows, indices] = data
+
+        def matmul(x: np.ndarray) -> np.ndarray:
+            return dense @ x.astype(np.float32)
+
+        def rmatmul(y: np.ndarray) -> np.ndarray:
+            return dense.T @ y.astype(np.float32)
+
+    else:
+        # A @ X sums contributions per row (CSR order); A.T @ Y per column,
+        # so the non-zeros are also kept in column order. reduceat over the
+        # sorted runs is much faster than scattering with np.add.at.
+        by_column = np.argsort(indices, kind="stable")
+        columns = indices[by_column]
+        row_starts = indptr[:-1][np.diff(indptr) > 0]
+        column_starts = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+
+        def matmul(x: np.ndarray) -> np.ndarray:
+            out = np.zeros((shape[0], x.shape[1]))
+            out[rows[row_starts]] = np.add.reduceat(data[:, None] * x[indices], row_starts)
+            return out
+
+        def rmatmul(y: np.ndarray) -> np.ndarray:
+            out = np.zeros((shape[1], y.shape[1]))
+            contributions = data[by_column, None] * y[rows[by_column]]
+            out[columns[column_starts]] = np.add.reduceat(contributions, column_starts)
+            return out
+
+    k = max(1, min(dims, min(shape) - 1))
+    _, v = _randomized_svd(shape, matmul, rmatmul, k)
+    vectors = matmul(v)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    projection = v * idf[:, None]
+    return vectors.astype(np.float32), projection.astype(np.float32)
+
+
+def write_vectors(build_dir: Path, practices: list[dict[str, Any]]) -> dict[str, Any]:
+    """Write vectors.npy and projection.npy; returns the snapshot section meta."""
+    vectors, projection = build_vectors(practices)
+    build_dir.mkdir(parents=True, exist_ok=True)
+    files = {}
+    for name, matrix in ((VECTORS_FILE, vectors), (PROJECTION_FILE, projection)):
+        path = build_dir / name
+        tmp = path.with_suffix(".tmp.npy")
+        np.save(tmp, matrix)
+        os.replace(tmp, path)
+        files[name] = file_digest(path)
+    return {
+        "docs": vectors.shape[0],
+        "terms": projection.shape[0],
+        "dims": vectors.shape[1],
+        "files": files,
+    }
+
+
+def file_digest(path: Path) -> list[int]:
+    """[size, CRC-32] of a file: recorded in the snapshot instead of mtimes,
+    so identical vectors give a byte-identical snapshot."""
+    data = path.read_bytes()
+    return [len(data), zlib.crc32(data)]
+
+
+class VectorIndex:
+    """Cosine top-k over memory-mapped practice vectors."""
+
+    def __init__(self, build_dir: Path, meta: dict[str, Any]) -> None:
+        for name, digest in meta["files"].items():
+            if file_digest(build_dir / name) != digest:
+                raise ValueError(f"{name} does not match the snapshot")
+        self.meta = meta
+        self.vectors = np.load(build_dir / VECTORS_FILE, mmap_mode="r")
+        self.projection = np.load(build_dir / PROJECTION_FILE, mmap_mode="r")
+
+    def embed(self, text: str, term_index: Callable[[str], int | None]) -> np.ndarray | None:
+        """Fold text into the vector space; None if it has no indexed terms."""
+        counts: dict[int, int] = {}
+        for token in tokenize(text):
+            index = term_index(token)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        if not counts:
+            return None
+        rows = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        vector = weights @ self.projection[rows]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def nearest(
+        self,
+        vector: np.ndarray,
+        k: int,
+        exclude: int | None = None,
+        mask: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        """The k most similar documents to vector, as (doc, cosine) best first.
+
+        mask (bool per document) restricts the candidates.
+        """
+        scores = self.vectors @ vector.astype(np.float32)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(int(doc), float(scores[doc])) for doc in top]
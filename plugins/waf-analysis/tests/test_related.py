@@ -0,0 +1,46 @@
+import waf_cli
+from waf_graph import RelatedGraph, build_graph
+
+
+def related(practices, start, depth=1):
+    """via of every node reached from practices[start], by ID."""
+    from waf_graph import via_prefixes
+
+    graph = RelatedGraph(build_graph(practices))
+    ids = [p["id"] for p in practices]
+    return {
+        ids[n.doc]: via_prefixes(n.flags, ids[n.parent], ids[n.doc])
+        for n in graph.bfs(start, depth)
+        if n.parent is not None
+    }
+
+
+def test_outbound_prefix_edge_is_via_the_neighbor_prefix():
+    practices = [
+        {"id": "SEC01-BP01", "relatedIds": ["OPS02"]},
+        {"id": "OPS02-BP01", "relatedIds": []},
+    ]
+    assert related(practices, 0) == {"OPS02-BP01": "OPS02"}
+
+
+def test_inbound_prefix_edge_is_via_the_matched_prefix():
+    practices = [
+        {"id": "SEC01-BP01", "relatedIds": []},
+        {"id": "FSISEC06-BP03", "relatedIds": ["SEC01"]},
+    ]
+    assert related(practices, 0) == {"FSISEC06-BP03": "SEC01"}
+
+
+def test_direct_reference_has_no_via():
+    practices = [
+        {"id": "SEC01-BP01", "relatedIds": ["SEC01-BP02"]},
+        {"id": "SEC01-BP02", "relatedIds": []},
+    ]
+    assert related(practices, 0) == {"SEC01-BP02": None}
+
+
+def test_related_in_corpus_names_the_matched_prefix():
+    nodes = waf_cli.query_related("SEC01-BP01")["nodes"]
+    lens_node = next(n for n in nodes if n["id"] == "FSISEC06-BP03")
+    assert lens_node["direction"] == "in"
+    assert lens_node["via"] == "SEC01"